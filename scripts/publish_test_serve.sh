@@ -2,11 +2,13 @@
 set -euo pipefail
 
 # publish_test_serve.sh
-# Version: SOP_BUILD_PUBLISH_TEST_SERVE_v1.0
-# Built: 2025-12-13 America/New_York
+# Version: SOP_BUILD_PUBLISH_TEST_SERVE_v1.1
+# Built: 2026-10-17 America/New_York
 #
 # Purpose:
 #   Serve publish_test/docs on port 8080 for local browser testing.
+#   Uses src/python/serve_outputs.py: .br/.gz siblings, strong ETags / 304s,
+#   immutable caching for fingerprinted assets, stats at /__stats.
 #
 # Usage:
 #   bash scripts/publish_test_serve.sh
@@ -23,6 +25,4 @@ if [ ! -d "$DOCS" ]; then
   exit 2
 fi
 
-echo "Serving: $DOCS"
-echo "URL: http://localhost:8080/"
-python -m http.server 8080 --directory "$DOCS"
+python "$ROOT/src/python/serve_outputs.py" --root "$DOCS" --port 8080
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Scaling benchmark for the per-SOP Python chain on synthetic decks
+(gen_synthetic_deck.py), so we have a regression baseline before onboarding
+bigger decks.
+
+For each --sizes entry (default 100 / 1k / 10k / 50k frames):
+  1. generate <work>/<n>/inputs/Synth<n>_ENH_UPD.csv (+ placeholder images)
+  2. run each stage as its own subprocess, exactly as the CLI is used:
+       enh_upd_to_ready   ENH_UPD -> READY
+       csv_to_story       READY -> story.json (plain, plus --stream)
+       validate_story     --check-files --graph
+       build_player       story.json -> *_player.html
+  3. record wall time and the child's own peak RSS (os.wait4 rusage; None on
+     platforms without it), exit code and output bytes
+
+Results go to outputs/bench/bench_<MMDDYY_HHMM>.json. With --baseline the
+run is compared stage by stage against an earlier results file and the
+time/RSS ratios are printed.
+
+Usage:
+  python src/python/bench_pipeline.py
+  python src/python/bench_pipeline.py --sizes 100 1000 --repeat 3 \
+      --baseline outputs/bench/bench_101726_0915.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import gen_synthetic_deck
+
+NY_TZ = ZoneInfo("America/New_York")
+VERSION = "v1_20261017"
+
+HERE = Path(__file__).resolve().parent
+REPO_ROOT = HERE.parents[1]
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Time the SOP pipeline stages on synthetic decks")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Frame counts to test")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    p.add_argument("--branching", type=float, default=0.3)
+    p.add_argument("--narr-words", type=int, default=60)
+    p.add_argument("--multiline", type=float, default=0.25)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--work-dir", default="outputs/bench/work", help="Scratch folder (deleted per size unless --keep)")
+    p.add_argument("--out", default=None, help="Results JSON (default: outputs/bench/bench_<stamp>.json)")
+    p.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    p.add_argument("--keep", action="store_true", help="Keep generated decks and outputs")
+    return p.parse_args()
+
+
+def run_measured(cmd: List[str], cwd: Path) -> Dict[str, Any]:
+    """Run one command; return wall seconds, the child's peak RSS (KiB) and exit code."""
+    env = dict(os.environ, SOP_BUILD_EVENTS="off")  # keep synthetic runs out of the build history
+    peak_kb: Optional[int] = None
+    # stderr goes to a temp file, not a pipe: nothing reads a pipe during wait4(),
+    # so a child writing more than one pipe buffer of warnings would block forever.
+    with tempfile.TemporaryFile() as errf:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=str(cwd), env=env, stdout=subprocess.DEVNULL, stderr=errf)
+        if hasattr(os, "wait4"):
+            _, status, ru = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - t0
+            code = os.waitstatus_to_exitcode(status)
+            proc.returncode = code
+            peak_kb = ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss  # bytes on macOS
+        else:  # Windows: no per-child rusage
+            code = proc.wait()
+            wall = time.perf_counter() - t0
+        errf.seek(0)
+        err = errf.read().decode("utf-8", "replace")
+    return {"wall_s": round(wall, 4), "peak_rss_kb": peak_kb, "exit": code, "stderr": err.strip()[-500:]}
+
+
+def stage_commands(d: Path, sop: str) -> List[Dict[str, Any]]:
+    py = sys.executable
+    enh = d / "inputs" / f"{sop}_ENH_UPD.csv"
+    ready = d / "build_in" / f"{sop}_mk_tw_in_READY.csv"
+    story = d / "outputs" / "story" / sop / "story.json"
+    story_stream = d / "outputs" / "story" / sop / "story_stream.json"
+    player = d / "outputs" / "players" / f"{sop}_player.html"
+    return [
+        {"stage": "enh_upd_to_ready", "out": ready,
+         "cmd": [py, str(HERE / "enh_upd_to_ready.py"), "--csv", str(enh), "--out", str(ready)]},
+        {"stage": "csv_to_story", "out": story,
+         "cmd": [py, str(HERE / "csv_to_story.py"), "--csv", str(ready), "--sop-id", sop, "--out", str(story)]},
+        {"stage": "csv_to_story_stream", "out": story_stream,
+         "cmd": [py, str(HERE / "csv_to_story.py"), "--csv", str(ready), "--sop-id", sop,
+                 "--out", str(story_stream), "--stream"]},
+        {"stage": "validate_story", "out": None,
+         "cmd": [py, str(HERE / "validate_story_v1a.py"), "--story", str(story),
+                 "--repo-root", str(player.parent), "--check-files", "--graph"]},
+        {"stage": "build_player", "out": player,
+         "cmd": [py, str(HERE / "build_player.py"), "--story", str(story), "--out", str(player),
+                 "--template", str(REPO_ROOT / "src" / "templates" / "sop_player.html")]},
+    ]
+
+
+def bench_size(n: int, args: argparse.Namespace, work: Path) -> Dict[str, Any]:
+    sop = f"Synth{n}"
+    d = work / str(n)
+    if d.exists():
+        shutil.rmtree(d)
+    (d / "outputs" / "players").mkdir(parents=True)
+    (d / "outputs" / "faq").mkdir(parents=True)
+    (d / "outputs" / "faq" / f"PPS_{sop}_faq.html").write_text("<html></html>", encoding="utf-8")
+
+    enh = d / "inputs" / f"{sop}_ENH_UPD.csv"
+    t0 = time.perf_counter()
+    rows = gen_synthetic_deck.write_deck(enh, n, sop, args.branching, args.narr_words, args.multiline,
+                                         args.seed, images=d / "outputs" / "images" / sop)
+    gen_s = time.perf_counter() - t0
+
+    result: Dict[str, Any] = {
+        "frames": rows,
+        "input_bytes": enh.stat().st_size,
+        "generate_s": round(gen_s, 4),
+        "stages": {},
+    }
+    for st in stage_commands(d, sop):
+        if st["out"] is not None:
+            Path(st["out"]).parent.mkdir(parents=True, exist_ok=True)
+        runs = [run_measured(st["cmd"], REPO_ROOT) for _ in range(max(1, args.repeat))]
+        best = min(runs, key=lambda r: r["wall_s"])
+        rss = [r["peak_rss_kb"] for r in runs if r["peak_rss_kb"] is not None]
+        rec = {
+            "wall_s": best["wall_s"],
+            "wall_s_runs": [r["wall_s"] for r in runs],
+            "peak_rss_kb": max(rss) if rss else None,
+            "exit": best["exit"],
+            "out_bytes": Path(st["out"]).stat().st_size if st["out"] and Path(st["out"]).exists() else None,
+        }
+        if best["exit"] != 0:
+            rec["stderr"] = best["stderr"]
+        result["stages"][st["stage"]] = rec
+        rss_txt = f"{rec['peak_rss_kb'] / 1024:8.1f} MiB" if rec["peak_rss_kb"] is not None else "     n/a"
+        print(f"  {n:>7} {st['stage']:<20} {rec['wall_s']:>9.3f}s {rss_txt}  exit={rec['exit']}")
+
+    if not args.keep:
+        shutil.rmtree(d, ignore_errors=True)
+    return result
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    lines = [f"{'frames':>7} {'stage':<20} {'time x':>7} {'rss x':>7}"]
+    for n, cur in current["sizes"].items():
+        base = baseline.get("sizes", {}).get(n)
+        if not base:
+            continue
+        for stage, rec in cur["stages"].items():
+            b = base["stages"].get(stage)
+            if not b:
+                continue
+            t = rec["wall_s"] / b["wall_s"] if b.get("wall_s") else None
+            r = (rec["peak_rss_kb"] / b["peak_rss_kb"]) if rec.get("peak_rss_kb") and b.get("peak_rss_kb") else None
+            t_txt = f"{t:7.2f}" if t is not None else "    n/a"
+            r_txt = f"{r:7.2f}" if r is not None else "    n/a"
+            lines.append(f"{n:>7} {stage:<20} {t_txt} {r_txt}")
+    return lines
+
+
+def main():
+    args = parse_args()
+    work = Path(args.work_dir)
+    if not work.is_absolute():
+        work = REPO_ROOT / work
+    stamp = datetime.now(NY_TZ).strftime("%m%d%y_%H%M")
+    out = Path(args.out) if args.out else REPO_ROOT / "outputs" / "bench" / f"bench_{stamp}.json"
+
+    results: Dict[str, Any] = {
+        "bench_version": VERSION,
+        "timestamp": datetime.now(NY_TZ).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "branching": args.branching,
+            "narr_words": args.narr_words,
+            "multiline": args.multiline,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "sizes": {},
+    }
+    print(f"{'frames':>9} {'stage':<20} {'wall':>10} {'peak RSS':>12}")
+    for n in args.sizes:
+        results["sizes"][str(n)] = bench_size(n, args, work)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults: {out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("")
+        print("\n".join(compare(results, baseline)))
+
+    failed = [(n, s) for n, r in results["sizes"].items() for s, rec in r["stages"].items() if rec["exit"] != 0]
+    if failed:
+        print(f"\n{len(failed)} stage run(s) failed: " + ", ".join(f"{n}:{s}" for n, s in failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+build_catalog.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+One small catalog.json for every built SOP, so an index page can list and
+filter the SOPs from a single request instead of fetching each story.
+
+Scans docs/outputs/story/*/story.json and writes docs/outputs/catalog.json:
+
+  {"catalog_version": "...", "count": 7,
+   "facets": {"entity": {"PALCO": 3, ...}, "function": {...}, "subentity": {...}},
+   "sops": [{"sop_id": "LineEnt", "entity": "SE", "function": "Distro",
+             "subentity": "Sales", "frames": 47, "decisions": 9, "endings": 1,
+             "start_code": "S000", "start_image": "images/LineEnt/S000.png",
+             "player": "players/LineEnt_player.html",
+             "story": "story/LineEnt/story.json",
+             "faq": {"href": "faq/LineEnt_FAQ.html", "label": "FAQ & Tips"},
+             "quiz": null, "hash": "3f9c2a71be04d1e8"}, ...]}
+
+- entity / function / subentity: the most common non-empty value across the
+  frames' meta (a few frames often carry a stray header value). Values that
+  differ only in case or spacing ("PALCO" / "Palco") are one facet bucket,
+  and every SOP in it gets the bucket's most common spelling.
+- decisions: frames with 2+ choices; endings: frames with none.
+- start_image, faq, quiz, player and story are relative to the catalog file
+  (docs/outputs), i.e. the story's "../images/..." links resolved from the
+  players folder. faq/quiz are null when no frame links one.
+- hash: sha256 prefix of the story.json bytes; a page can use it to tell
+  which SOPs changed since its last visit.
+- Incremental: per-story (size, mtime_ns, hash) is kept in
+  outputs/pipeline_state/catalog_state.json next to the entry built from it.
+  Records are keyed by absolute story path, so one state file serves
+  docs/outputs and publish_test alike. Only stories whose stat moved are
+  re-read, and a story whose bytes did not change keeps its entry.
+  catalog.json is rewritten only when its content changes (no timestamps in
+  it), so an unchanged tree leaves it untouched.
+- --output-profile compact writes minified JSON plus .gz/.br siblings
+  (precompress.py), as csv_to_story does.
+
+sop_pipeline.py build / build-all refresh the catalog after the SOPs are
+built (--no-catalog to skip).
+
+Usage:
+  python src/python/build_catalog.py
+  python src/python/build_catalog.py --outputs publish_test/docs/outputs --output-profile compact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import build_events
+import precompress
+import story_format
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+CATALOG_NAME = "catalog.json"
+STATE_NAME = "catalog_state.json"
+HASH_LEN = 16
+FACET_KEYS = ("entity", "function", "subentity")
+# Story links are written relative to the players folder.
+PLAYERS_DIR = "players"
+COMPACT_SEPARATORS = (",", ":")
+
+
+def _story_hash(p: Path) -> str:
+    return hashlib.sha256(p.read_bytes()).hexdigest()[:HASH_LEN]
+
+
+def _is_local(url: str) -> bool:
+    return bool(url) and not re.match(r"^([a-z][a-z0-9+.-]*:|/|#)", url, re.I)
+
+
+def outputs_href(url: Any) -> Optional[str]:
+    """A story link (relative to players/) as a path relative to docs/outputs."""
+    if not isinstance(url, str) or not url.strip():
+        return None
+    u = url.strip().replace("\\", "/")
+    if not _is_local(u):
+        return u
+    return posixpath.normpath(posixpath.join(PLAYERS_DIR, u))
+
+
+def _most_common(values: List[str]) -> str:
+    vals = [v for v in values if v]
+    return Counter(vals).most_common(1)[0][0] if vals else ""
+
+
+def _link(frames: List[Dict[str, Any]], prefix: str) -> Optional[Dict[str, str]]:
+    """Most common (Loc, File, Label) across frames for FAQ_* / Quiz_*."""
+    seen = []
+    for fr in frames:
+        loc = str(fr.get(f"{prefix}_Loc") or "").strip()
+        fname = str(fr.get(f"{prefix}_File") or "").strip()
+        if loc and fname:
+            seen.append((loc, fname, str(fr.get(f"{prefix}_Label") or "").strip()))
+    if not seen:
+        return None
+    loc, fname, label = Counter(seen).most_common(1)[0][0]
+    return {"href": outputs_href(loc.rstrip("/") + "/" + fname), "label": label}
+
+
+def catalog_entry(story: Dict[str, Any], story_rel: str, sop_dir_name: str, digest: str,
+                  outputs_dir: Path) -> Dict[str, Any]:
+    """One catalog entry from a loaded story."""
+    frames = [f for f in (story.get("frames") or []) if isinstance(f, dict)]
+    sop_id = str(story.get("sop_id") or sop_dir_name)
+    start_code = str(story.get("start_code") or (frames[0].get("frame_code") if frames else "") or "")
+    start = next((f for f in frames if f.get("frame_code") == start_code), frames[0] if frames else {})
+
+    metas = [f.get("meta") if isinstance(f.get("meta"), dict) else {} for f in frames]
+    entry: Dict[str, Any] = {"sop_id": sop_id}
+    for k in FACET_KEYS:
+        entry[k] = _most_common([str(m.get(k) or "").strip() for m in metas])
+
+    n_choices = [len(f.get("choices") or []) for f in frames]
+    player = f"{PLAYERS_DIR}/{sop_id}_player.html"
+    entry.update({
+        "frames": len(frames),
+        "decisions": sum(1 for n in n_choices if n >= 2),
+        "endings": sum(1 for n in n_choices if n == 0),
+        "start_code": start_code,
+        "start_image": outputs_href(start.get("image")),
+        "player": player if (outputs_dir / player).is_file() else None,
+        "story": story_rel,
+        "faq": _link(frames, "FAQ"),
+        "quiz": _link(frames, "Quiz"),
+        "hash": digest,
+    })
+    return entry
+
+
+def _facet_key(v: str) -> str:
+    return " ".join(v.split()).casefold()
+
+
+def fold_facet_values(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Copies of `entries` whose facet values use one spelling per case-folded
+    value: the most common one (ties: the first in sort order).
+    """
+    out = [dict(e) for e in entries]
+    for k in FACET_KEYS:
+        spellings: Dict[str, Counter] = {}
+        for e in out:
+            v = e.get(k) or ""
+            spellings.setdefault(_facet_key(v), Counter())[v] += 1
+        label = {f: min(c, key=lambda v: (-c[v], v)) for f, c in spellings.items()}
+        for e in out:
+            e[k] = label[_facet_key(e.get(k) or "")]
+    return out
+
+
+def facets(entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Per facet, {value: SOP count}; expects fold_facet_values() entries."""
+    out: Dict[str, Dict[str, int]] = {}
+    for k in FACET_KEYS:
+        c = Counter(e.get(k) or "" for e in entries)
+        out[k] = {v: c[v] for v in sorted(c, key=lambda s: s.lower())}
+    return out
+
+
+def _load_state(p: Path) -> Dict[str, Any]:
+    try:
+        state = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == VERSION else {}
+
+
+def _write_if_changed(p: Path, text: str) -> bool:
+    data = text.encode("utf-8")
+    try:
+        if p.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, p)
+    return True
+
+
+def update_catalog(outputs_dir: Path, state_path: Optional[Path] = None, compact: bool = False,
+                   out_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Refresh catalog.json under `outputs_dir`. Returns a summary:
+      {"out", "sops", "read", "reused", "changed" (SOP ids whose hash moved or
+       that were added/removed), "written", "errors"}
+    """
+    out_path = out_path or outputs_dir / CATALOG_NAME
+    state_path = state_path or REPO_ROOT / "outputs" / "pipeline_state" / STATE_NAME
+    old = _load_state(state_path).get("stories") or {}
+    new: Dict[str, Any] = {}
+    entries: List[Dict[str, Any]] = []
+    read = reused = 0
+    changed: List[str] = []
+    errors: List[str] = []
+
+    for story_path in sorted(outputs_dir.glob("story/*/story.json")):
+        rel = story_path.relative_to(outputs_dir).as_posix()
+        key = str(story_path.resolve())  # one state file can serve several outputs trees
+        st = story_path.stat()
+        prev = old.get(key)
+        player_rel = f"{PLAYERS_DIR}/{story_path.parent.name}_player.html"
+        has_player = (outputs_dir / player_rel).is_file()
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns \
+                and prev.get("has_player") == has_player:
+            rec = prev
+            reused += 1
+        else:
+            digest = _story_hash(story_path)
+            if prev and prev["hash"] == digest and prev.get("has_player") == has_player:
+                rec = dict(prev, size=st.st_size, mtime_ns=st.st_mtime_ns)
+                reused += 1
+            else:
+                try:
+                    story = story_format.expand_story(json.loads(story_path.read_text(encoding="utf-8")))
+                except ValueError as e:
+                    errors.append(f"{rel}: {e}")
+                    continue
+                entry = catalog_entry(story, rel, story_path.parent.name, digest, outputs_dir)
+                rec = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest,
+                       "has_player": has_player, "entry": entry}
+                read += 1
+                changed.append(entry["sop_id"])
+        new[key] = rec
+        entries.append(rec["entry"])
+
+    root = str(outputs_dir.resolve()) + os.sep
+    for key in old.keys() - new.keys():
+        if key.startswith(root):
+            changed.append(old[key]["entry"]["sop_id"])
+    # Keep other trees' records so alternating --outputs does not force full re-reads.
+    new.update({k: v for k, v in old.items() if not k.startswith(root)})
+
+    entries = fold_facet_values(sorted(entries, key=lambda e: e["sop_id"].lower()))
+    catalog = {"catalog_version": VERSION, "count": len(entries), "facets": facets(entries), "sops": entries}
+    if compact:
+        text = json.dumps(catalog, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    else:
+        text = json.dumps(catalog, ensure_ascii=False, indent=2) + "\n"
+    written = _write_if_changed(out_path, text)
+    if compact and (written or not all(os.path.exists(p) for p in precompress.sibling_paths(str(out_path)).values())):
+        precompress.write_precompressed(str(out_path))
+    _write_if_changed(state_path, json.dumps({"version": VERSION, "stories": new}, ensure_ascii=False) + "\n")
+
+    return {"out": out_path, "sops": len(entries), "read": read, "reused": reused,
+            "changed": sorted(set(changed)), "written": written, "errors": errors}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build docs/outputs/catalog.json from every story.json")
+    ap.add_argument("--outputs", default=str(REPO_ROOT / "docs" / "outputs"),
+                    help="Outputs folder holding story/<SOP>/story.json (default: docs/outputs)")
+    ap.add_argument("--out", default=None, help="Catalog path (default: <outputs>/catalog.json)")
+    ap.add_argument("--state", default=None,
+                    help="Incremental state file (default: outputs/pipeline_state/catalog_state.json)")
+    ap.add_argument("--output-profile", choices=("pretty", "compact"), default="pretty",
+                    help="compact = minified catalog plus .gz/.br siblings")
+    args = ap.parse_args()
+
+    outputs_dir = Path(args.outputs)
+    if not outputs_dir.is_dir():
+        print(f"ERROR: missing {outputs_dir}", file=sys.stderr)
+        return 2
+
+    with build_events.stage_event("catalog", "build_catalog", VERSION) as ev:
+        t0 = time.perf_counter()
+        res = update_catalog(outputs_dir, Path(args.state) if args.state else None,
+                             args.output_profile == "compact", Path(args.out) if args.out else None)
+        for e in res["errors"]:
+            print(f"WARN: skipped {e}")
+        state = "written" if res["written"] else "unchanged"
+        print(f"[OK] {res['out']} {state}: {res['sops']} SOP(s), {res['read']} read, {res['reused']} reused "
+              f"in {time.perf_counter() - t0:.3f}s")
+        if res["changed"]:
+            print(f"     changed: {', '.join(res['changed'])}")
+        ev.update(out=res["out"], output_bytes=build_events.file_bytes(res["out"]),
+                  detail=f"read {res['read']}, reused {res['reused']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
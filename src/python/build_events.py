@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+build_events.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Structured build events. Every stage (CLI run or sop_pipeline.py stage)
+appends ONE JSON line to logs/events/events_<YYYY-MM>.jsonl:
+
+  {"ts": "2026-10-17T09:15:02-04:00", "run_id": "101726_0915_ab12cd",
+   "sop_id": "LineEnt", "stage": "player", "tool": "build_player",
+   "tool_version": "...", "status": "ok", "duration_s": 0.031,
+   "rows": null, "frames": 30, "output_bytes": 149824,
+   "out": "docs/outputs/players/LineEnt_player.html", "detail": ""}
+
+The free-text logs the tools already write are unchanged; build_history.py
+indexes both into SQLite.
+
+- Stage names match sop_pipeline.py: ready, validate_env, images, story,
+  validate_story, player (plus catalog and search_index, which are not
+  per-SOP: sop_id null).
+- run_id: sop_pipeline.py passes one id to every stage of a run; a CLI run
+  uses $SOP_BUILD_RUN_ID when set (so a shell script can group its steps),
+  else a fresh id.
+- Events directory: $SOP_BUILD_EVENTS_DIR, else <repo>/logs/events.
+  SOP_BUILD_EVENTS=off disables writing (bench_pipeline.py sets it).
+- Lines are written with a single O_APPEND write, so parallel build-all
+  workers can share a file.
+"""
+
+import contextlib
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+_PROCESS_RUN_ID: Optional[str] = None
+
+
+def new_run_id() -> str:
+    return datetime.now(NY_TZ).strftime("%m%d%y_%H%M") + "_" + secrets.token_hex(3)
+
+
+def current_run_id() -> str:
+    """$SOP_BUILD_RUN_ID if set, else one id per process."""
+    global _PROCESS_RUN_ID
+    env = os.environ.get("SOP_BUILD_RUN_ID")
+    if env:
+        return env
+    if _PROCESS_RUN_ID is None:
+        _PROCESS_RUN_ID = new_run_id()
+    return _PROCESS_RUN_ID
+
+
+def enabled() -> bool:
+    return os.environ.get("SOP_BUILD_EVENTS", "").lower() not in ("off", "0", "no", "false")
+
+
+def events_dir(log_dir: Optional[Path] = None) -> Path:
+    env = os.environ.get("SOP_BUILD_EVENTS_DIR")
+    if env:
+        return Path(env)
+    return (log_dir or REPO_ROOT / "logs") / "events"
+
+
+def emit(stage: str, sop_id: Optional[str], status: str, duration_s: float, *,
+         tool: str = "", tool_version: str = "", run_id: Optional[str] = None,
+         log_dir: Optional[Path] = None, **fields: Any) -> Optional[Dict[str, Any]]:
+    """Append one event line. Extra keyword fields (rows, frames, output_bytes, out, detail, ...) are kept."""
+    if not enabled():
+        return None
+    now = datetime.now(NY_TZ)
+    ev: Dict[str, Any] = {
+        "ts": now.isoformat(timespec="seconds"),
+        "run_id": run_id or current_run_id(),
+        "sop_id": sop_id,
+        "stage": stage,
+        "tool": tool,
+        "tool_version": tool_version,
+        "status": status,
+        "duration_s": round(duration_s, 4),
+        "rows": None,
+        "frames": None,
+        "output_bytes": None,
+        "out": None,
+        "detail": "",
+    }
+    ev.update({k: (str(v) if isinstance(v, Path) else v) for k, v in fields.items()})
+
+    d = events_dir(log_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(ev, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(str(d / f"events_{now:%Y-%m}.jsonl"), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return ev
+
+
+def file_bytes(*paths: Any) -> Optional[int]:
+    """Total size of the paths that exist (None when none do)."""
+    sizes = [os.path.getsize(p) for p in paths if p and os.path.isfile(p)]
+    return sum(sizes) if sizes else None
+
+
+def sop_from_filename(path: Any) -> str:
+    """Best-effort SOP id from names like LineEnt_Raw_..._ENH_UPD.csv / PPS_TechMobile_mk_tw_in_READY_....csv."""
+    stem = Path(str(path)).stem
+    if stem.startswith("PPS_"):
+        stem = stem[len("PPS_"):]
+    return stem.split("_", 1)[0]
+
+
+@contextlib.contextmanager
+def stage_event(stage: str, tool: str, tool_version: str = "", sop_id: Optional[str] = None,
+                log_dir: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Wrap a CLI main(): times the body and emits one event when it ends.
+    The body fills the yielded dict (sop_id, rows, frames, out, output_bytes,
+    detail, status). An exception or non-zero SystemExit marks it "failed".
+    """
+    info: Dict[str, Any] = {"sop_id": sop_id}
+    t0 = time.perf_counter()
+    status = "ok"
+    try:
+        yield info
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = "failed"
+            info.setdefault("detail", str(e.code) if not isinstance(e.code, int) else f"exit {e.code}")
+        raise
+    except BaseException as e:
+        status = "failed"
+        info.setdefault("detail", str(e) or e.__class__.__name__)
+        raise
+    finally:
+        status = info.pop("status", None) or status
+        sop = info.pop("sop_id", None)
+        emit(stage, sop, status, time.perf_counter() - t0, tool=tool, tool_version=tool_version,
+             log_dir=log_dir, **info)
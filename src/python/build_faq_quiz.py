@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+"""
+build_faq_quiz.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Compile the FAQ / quiz markdown in inputs/Faq_QuizDocs into the published
+pages under docs/outputs/faq and docs/outputs/quiz, with one shared template
+(src/templates/sop_faq_quiz.html), instead of converting each .md by hand.
+
+Sources: inputs/Faq_QuizDocs/*_faq.md and *_quiz.md (suffix in any case).
+
+  *_faq.md   "# Title", "## Subtitle", a preamble (the **SOP:** line), then
+             one "### Question" section per entry -> <details> blocks.
+  *_quiz.md  "### Q<n>. Title" sections, each a question paragraph plus
+             "A." - "D." option lines, and an "### Answer Key" section of
+             "- Q<n>: <letter>" lines -> an interactive quiz page (two
+             attempts per question, score, CSV attempt log) AND an item bank
+             docs/outputs/quiz/<name>.json:
+               {"bank_version", "sop_id", "title", "source", "source_hash",
+                "items": [{"id": "q1", "number": 1, "title", "question",
+                           "options": {"A": ..., "D": ...}, "answer": "B"}]}
+             A question without exactly A-D, or missing from the answer
+             key, fails that source (the others still compile).
+
+- Page names follow the published copy of the same name in any case
+  (PPS_BlanketOrder_Quiz.md -> quiz/PPS_BlanketOrder_quiz.html); a new
+  source gets its stem with the _faq / _quiz suffix lower-cased.
+- Generated pages carry <meta name="generator" content="build_faq_quiz">.
+  An existing page without it is a hand-made page: it is kept (and listed)
+  unless --overwrite-hand-made. The item bank is written either way.
+- Cached by source hash: outputs/pipeline_state/faq_quiz_state.json keeps,
+  per outputs tree and source file name, the source hash, the template/tool
+  fingerprint and the hash of every file written. A source is recompiled
+  only when one of those moved or an output was changed or removed; the rest
+  compile in parallel (--workers). Outputs of a source that was removed are
+  deleted (only while they still hold what this tool wrote).
+- Cross-check: every FAQ_File / Quiz_File that docs/outputs/story/*/story.json
+  links (via FAQ_Loc / Quiz_Loc, resolved as the player does from players/)
+  must exist with that exact case (the web server is case-sensitive).
+  Missing links, case-only mismatches and compiled pages no story links are
+  reported.
+
+sop_pipeline.py build / build-all run it ahead of the catalog and search
+index (--no-faq-quiz to skip).
+
+Usage:
+  python src/python/build_faq_quiz.py
+  python src/python/build_faq_quiz.py --overwrite-hand-made
+  python src/python/build_faq_quiz.py --outputs publish_test/docs/outputs --workers 1
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import build_catalog
+import build_events
+import story_format
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+KINDS = ("faq", "quiz")
+STATE_NAME = "faq_quiz_state.json"
+GENERATOR = "build_faq_quiz"
+DEFAULT_TEMPLATE = REPO_ROOT / "src" / "templates" / "sop_faq_quiz.html"
+DEFAULT_DOCS = REPO_ROOT / "inputs" / "Faq_QuizDocs"
+OPTION_LETTERS = ("A", "B", "C", "D")
+HASH_LEN = 16
+# Story frame field prefix per kind: FAQ_Loc / FAQ_File, Quiz_Loc / Quiz_File.
+LINK_PREFIXES = {"faq": "FAQ", "quiz": "Quiz"}
+
+
+# -----------------------
+# Markdown (the subset the FAQ / quiz sources use)
+# -----------------------
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_HR_RE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+_BULLET_RE = re.compile(r"^\s*[-*+]\s+(.*)$")
+_NUMBERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_QUOTE_RE = re.compile(r"^\s{0,3}>\s?(.*)$")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+_EM_RE = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_SAFE_URL_RE = re.compile(r"^(https?:|mailto:|[^:]*$)", re.I)
+
+
+def inline(text: str) -> str:
+    """One line of markdown -> HTML: `code`, **bold**, *em*, [text](url). Everything else is escaped."""
+    codes: List[str] = []
+
+    def keep_code(m: "re.Match[str]") -> str:
+        codes.append(f"<code>{m.group(1)}</code>")
+        return f"\x00{len(codes) - 1}\x00"
+
+    s = _CODE_RE.sub(keep_code, html.escape(text.strip(), quote=False))
+    s = _BOLD_RE.sub(r"<strong>\1</strong>", s)
+    s = _EM_RE.sub(r"<em>\1</em>", s)
+
+    def link(m: "re.Match[str]") -> str:
+        url = html.unescape(m.group(2))
+        if not _SAFE_URL_RE.match(url):
+            return m.group(0)
+        return f'<a href="{html.escape(url)}">{m.group(1)}</a>'
+
+    s = _LINK_RE.sub(link, s)
+    return re.sub("\x00(\\d+)\x00", lambda m: codes[int(m.group(1))], s)
+
+
+def plain(text: str) -> str:
+    """Markdown inline markup stripped (item bank text)."""
+    s = _LINK_RE.sub(r"\1", text)
+    s = _CODE_RE.sub(r"\1", s)
+    s = _BOLD_RE.sub(r"\1", s)
+    s = _EM_RE.sub(r"\1", s)
+    return " ".join(s.split())
+
+
+def _paragraph(lines: List[str]) -> str:
+    # A line ending in two spaces is a hard break, as in the sources' option / meta lines.
+    parts = []
+    for i, ln in enumerate(lines):
+        brk = "<br>" if ln.endswith("  ") and i < len(lines) - 1 else ""
+        parts.append(inline(ln) + brk)
+    return "<p>" + "\n".join(parts) + "</p>"
+
+
+def render_markdown(text: str) -> str:
+    """Block-level markdown -> HTML: headings, paragraphs, -/1. lists, > quotes, --- rules."""
+    out: List[str] = []
+    para: List[str] = []
+    items: List[str] = []
+    list_tag = ""
+    lines = text.splitlines()
+
+    def flush() -> None:
+        nonlocal list_tag
+        if para:
+            out.append(_paragraph(para))
+            para.clear()
+        if items:
+            out.append(f"<{list_tag}>" + "".join(f"<li>{inline(i)}</li>" for i in items) + f"</{list_tag}>")
+            items.clear()
+            list_tag = ""
+
+    i = 0
+    while i < len(lines):
+        ln = lines[i].rstrip("\n")
+        if not ln.strip():
+            flush()
+        elif _QUOTE_RE.match(ln):
+            flush()
+            quoted = []
+            while i < len(lines) and _QUOTE_RE.match(lines[i]):
+                quoted.append(_QUOTE_RE.match(lines[i]).group(1))
+                i += 1
+            out.append("<blockquote>" + render_markdown("\n".join(quoted)) + "</blockquote>")
+            continue
+        elif _HR_RE.match(ln):
+            flush()
+            out.append("<hr>")
+        elif _HEADING_RE.match(ln):
+            flush()
+            m = _HEADING_RE.match(ln)
+            n = len(m.group(1))
+            out.append(f"<h{n}>{inline(m.group(2))}</h{n}>")
+        elif _BULLET_RE.match(ln) or _NUMBERED_RE.match(ln):
+            tag = "ul" if _BULLET_RE.match(ln) else "ol"
+            if para or (items and tag != list_tag):
+                flush()
+            list_tag = tag
+            items.append((_BULLET_RE.match(ln) or _NUMBERED_RE.match(ln)).group(1))
+        elif items and ln.startswith((" ", "\t")):
+            items[-1] += " " + ln.strip()  # continuation of the list item
+        else:
+            if items:
+                flush()
+            para.append(ln)
+        i += 1
+    flush()
+    return "\n".join(out)
+
+
+# -----------------------
+# FAQ / quiz documents
+# -----------------------
+
+def split_sections(text: str) -> Tuple[str, str, List[str], List[Tuple[str, List[str]]]]:
+    """(title, subtitle, preamble lines, [(### heading, body lines)]) of a FAQ / quiz source."""
+    title = subtitle = ""
+    preamble: List[str] = []
+    sections: List[Tuple[str, List[str]]] = []
+    for ln in text.splitlines():
+        m = _HEADING_RE.match(ln)
+        if m and len(m.group(1)) == 1 and not title and not sections:
+            title = m.group(2)
+        elif m and len(m.group(1)) == 2 and not subtitle and not sections:
+            subtitle = m.group(2)
+        elif m and len(m.group(1)) == 3:
+            sections.append((m.group(2), []))
+        elif sections:
+            sections[-1][1].append(ln)
+        else:
+            preamble.append(ln)
+    return title, subtitle, _trim_rules(preamble), [(h, _trim_rules(b)) for h, b in sections]
+
+
+def _trim_rules(lines: List[str]) -> List[str]:
+    # "---" between sections is a separator in the source, not content.
+    lines = list(lines)
+    while lines and (not lines[-1].strip() or _HR_RE.match(lines[-1])):
+        lines.pop()
+    while lines and (not lines[0].strip() or _HR_RE.match(lines[0])):
+        lines.pop(0)
+    return lines
+
+
+def source_kind(p: Path) -> Optional[str]:
+    stem = p.stem.lower()
+    return next((k for k in KINDS if stem.endswith("_" + k)), None)
+
+
+_QUESTION_RE = re.compile(r"^Q(\d+)[.):]\s*(.*)$", re.I)
+_OPTION_RE = re.compile(r"^\s*([A-D])[.)]\s+(.*?)\s*$")
+_KEY_RE = re.compile(r"^\s*[-*]?\s*Q(\d+)\s*[:=.-]\s*\**([A-D])\**\s*$", re.I)
+# Paper-form fields the page replaces with inputs.
+_FORM_LINE_RE = re.compile(r"^\*\*(Learner Name|Name|Email|Date):\*\*", re.I)
+
+
+def parse_quiz(text: str, name: str) -> Dict[str, Any]:
+    """Quiz source -> {"title", "subtitle", "preamble", "items", "extra"}; ValueError on a malformed quiz."""
+    title, subtitle, preamble, sections = split_sections(text)
+    items: List[Dict[str, Any]] = []
+    key: Dict[int, str] = {}
+    extra: List[Tuple[str, List[str]]] = []
+    for heading, body in sections:
+        q = _QUESTION_RE.match(heading)
+        if "answer key" in heading.lower():
+            for ln in body:
+                m = _KEY_RE.match(ln)
+                if m:
+                    key[int(m.group(1))] = m.group(2).upper()
+        elif q:
+            options: Dict[str, str] = {}
+            question: List[str] = []
+            for ln in body:
+                m = _OPTION_RE.match(ln)
+                if m and m.group(1) not in options:
+                    options[m.group(1)] = m.group(2)
+                elif ln.strip() and not options:
+                    question.append(ln.strip())
+            number = int(q.group(1))
+            if tuple(options) != OPTION_LETTERS:
+                raise ValueError(f"{name}: Q{number} has options {', '.join(options) or 'none'} (need A-D)")
+            items.append({"id": f"q{number}", "number": number, "title": q.group(2).strip(),
+                          "question": "\n".join(question), "options": options})
+        else:
+            extra.append((heading, body))
+    if not items:
+        raise ValueError(f"{name}: no '### Q<n>.' questions")
+    for it in items:
+        if it["number"] not in key:
+            raise ValueError(f"{name}: Q{it['number']} missing from the answer key")
+        it["answer"] = key[it["number"]]
+    preamble = [ln for ln in preamble if not _FORM_LINE_RE.match(ln.strip())]
+    return {"title": title, "subtitle": subtitle, "preamble": preamble, "items": items, "extra": extra}
+
+
+def item_bank(quiz: Dict[str, Any], name: str, source_hash: str) -> Dict[str, Any]:
+    return {
+        "bank_version": VERSION,
+        "sop_id": build_events.sop_from_filename(name),
+        "title": plain(quiz["title"]),
+        "source": name,
+        "source_hash": source_hash,
+        "items": [{"id": it["id"], "number": it["number"], "title": plain(it["title"]),
+                   "question": plain(it["question"]),
+                   "options": {k: plain(v) for k, v in it["options"].items()},
+                   "answer": it["answer"]} for it in quiz["items"]],
+    }
+
+
+def faq_content(sections: List[Tuple[str, List[str]]]) -> str:
+    return "\n".join(
+        f'<details{" open" if i == 0 else ""}>\n<summary>{inline(heading)}</summary>\n'
+        f'{render_markdown(chr(10).join(body))}\n</details>'
+        for i, (heading, body) in enumerate(sections))
+
+
+def quiz_content(quiz: Dict[str, Any]) -> str:
+    out = []
+    for it in quiz["items"]:
+        qid = it["id"]
+        opts = "\n".join(
+            f'<label><input type="radio" name="{qid}" value="{k}"> {k}. {inline(v)}</label>'
+            for k, v in it["options"].items())
+        question = "<br>\n".join(inline(ln) for ln in it["question"].splitlines())
+        title = f' <span class="q-title">{inline(it["title"])}</span>' if it["title"] else ""
+        out.append(
+            f'<div class="question" data-qid="{qid}">\n'
+            f'<p class="q-label"><strong>Q{it["number"]}.</strong>{title}</p>\n'
+            f'<p class="q-text">{question}</p>\n{opts}\n'
+            f'<div><button type="button" data-action="submit" data-qid="{qid}">Submit Answer</button> '
+            f'<button type="button" class="secondary" data-action="redo" data-qid="{qid}">Redo Question</button></div>\n'
+            f'<div class="feedback" id="feedback-{qid}"></div>\n</div>')
+    for heading, body in quiz["extra"]:
+        out.append(f"<h3>{inline(heading)}</h3>\n{render_markdown(chr(10).join(body))}")
+    return "\n".join(out)
+
+
+_PLACEHOLDER_RE = re.compile(r"\{\{([A-Z_]+)\}\}")
+# Template blocks kept on quiz pages only (learner info, score / CSV buttons).
+_QUIZ_ONLY_RE = re.compile(r"[ \t]*<!--QUIZ_ONLY-->\n(.*?)[ \t]*<!--/QUIZ_ONLY-->\n(\n?)", re.S)
+
+
+def _script_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False).replace("</", "<\\/")
+
+
+def compile_source(name: str, text: str, template: str, page_stem: str) -> Dict[str, str]:
+    """
+    One source -> {"page": html, "bank": json text (quizzes only)}. Pure (no I/O),
+    so it runs in a worker process. ValueError on a malformed quiz.
+    """
+    kind = source_kind(Path(name))
+    source_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:HASH_LEN]
+    title, subtitle, preamble, sections = split_sections(text)
+    out: Dict[str, str] = {}
+    quiz_data: Any = None
+    if kind == "quiz":
+        quiz = parse_quiz(text, name)
+        preamble = quiz["preamble"]
+        content = quiz_content(quiz)
+        bank = item_bank(quiz, name, source_hash)
+        out["bank"] = json.dumps(bank, ensure_ascii=False, indent=2) + "\n"
+        quiz_data = {"title": bank["title"], "stem": page_stem,
+                     "answers": {it["id"]: it["answer"] for it in bank["items"]},
+                     "questions": {it["id"]: it["question"] for it in bank["items"]}}
+    else:
+        content = faq_content(sections)
+    values = {
+        "PAGE_TITLE": html.escape(plain(title) or page_stem),
+        "HEADING": inline(title or page_stem),
+        "SUBTITLE": inline(subtitle),
+        "INTRO": render_markdown("\n".join(preamble)),
+        "CONTENT": content,
+        "KIND": kind or "",
+        "QUIZ_JSON": _script_json(quiz_data),
+        "GENERATOR": f"{GENERATOR} {VERSION}",
+        "SOURCE": html.escape(name),
+        "SOURCE_HASH": source_hash,
+    }
+    template = _QUIZ_ONLY_RE.sub(lambda m: m.group(1) + m.group(2) if kind == "quiz" else "", template)
+    out["page"] = _PLACEHOLDER_RE.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+    return out
+
+
+# -----------------------
+# Compile (cached, parallel)
+# -----------------------
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def _file_sha(p: Path) -> Optional[str]:
+    try:
+        return _sha(p.read_bytes())
+    except OSError:
+        return None
+
+
+def _write_if_changed(p: Path, text: str) -> bool:
+    data = text.encode("utf-8")
+    try:
+        if p.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, p)
+    return True
+
+
+def is_generated(p: Path) -> bool:
+    try:
+        with open(p, "rb") as f:
+            head = f.read(4096)
+    except OSError:
+        return False
+    return f'name="generator" content="{GENERATOR}'.encode() in head
+
+
+def page_name(src: Path, kind: str, outputs_dir: Path) -> str:
+    """Published name for `src`: an existing page of the same name in any case, else <stem>_<kind>.html."""
+    folder = outputs_dir / kind
+    if folder.is_dir():
+        for p in sorted(folder.glob("*.htm*")):
+            if p.stem.lower() == src.stem.lower():
+                return p.name
+    return src.stem[: -len(kind)] + kind + ".html"
+
+
+def sources(docs_dir: Path) -> Tuple[List[Tuple[Path, str]], List[str]]:
+    """([(source, kind)], names of .md files that are neither *_faq nor *_quiz)."""
+    found: List[Tuple[Path, str]] = []
+    other: List[str] = []
+    if docs_dir.is_dir():
+        for p in sorted(docs_dir.glob("*.md")):
+            kind = source_kind(p)
+            if kind:
+                found.append((p, kind))
+            else:
+                other.append(p.name)
+    return found, other
+
+
+def _load_state(p: Path) -> Dict[str, Any]:
+    try:
+        state = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == VERSION else {}
+
+
+def compile_all(docs_dir: Path, outputs_dir: Path, template: Path = DEFAULT_TEMPLATE,
+                state_path: Optional[Path] = None, workers: Optional[int] = None,
+                overwrite_hand_made: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Compile every FAQ / quiz source under `docs_dir` into `outputs_dir`/faq|quiz.
+    Returns {"sources", "compiled", "cached", "written" (paths), "kept"
+    (hand-made pages left alone), "removed", "errors", "ignored", "check"
+    (cross_check() of the result)}.
+    """
+    state_path = state_path or REPO_ROOT / "outputs" / "pipeline_state" / STATE_NAME
+    template_text = template.read_text(encoding="utf-8")
+    tool = _sha(template_text.encode("utf-8") + Path(__file__).read_bytes())
+    state = _load_state(state_path)
+    trees = state.get("trees") or {}
+    tree_key = str(outputs_dir.resolve())
+    old: Dict[str, Any] = trees.get(tree_key) or {}
+    new: Dict[str, Any] = {}
+
+    found, ignored = sources(docs_dir)
+    jobs = []
+    cached = 0
+    for src, kind in found:
+        data = src.read_bytes()
+        key = src.name
+        prev = old.get(key)
+        name = page_name(src, kind, outputs_dir)
+        page_rel = f"{kind}/{name}"
+        # A kept hand-made page stays cached only while it is there and may not be replaced.
+        page_ok = page_rel in prev["outputs"] or (not overwrite_hand_made and (outputs_dir / page_rel).exists()) \
+            if prev else False
+        if (not force and prev and prev["hash"] == _sha(data) and prev["tool"] == tool
+                and prev["page"] == page_rel and page_ok
+                and all(_file_sha(outputs_dir / rel) == h for rel, h in prev["outputs"].items())):
+            new[key] = prev
+            cached += 1
+            continue
+        jobs.append((src, kind, name, data.decode("utf-8-sig"), _sha(data)))
+
+    results: List[Any] = []
+    n_workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futs = [pool.submit(compile_source, src.name, text, template_text, Path(name).stem)
+                    for src, _, name, text, _ in jobs]
+            for fut in futs:
+                try:
+                    results.append(fut.result())
+                except ValueError as e:
+                    results.append(e)
+    else:
+        for src, _, name, text, _ in jobs:
+            try:
+                results.append(compile_source(src.name, text, template_text, Path(name).stem))
+            except ValueError as e:
+                results.append(e)
+
+    written: List[Path] = []
+    kept: List[str] = []
+    errors: List[str] = []
+    for (src, kind, name, _, digest), res in zip(jobs, results):
+        key = src.name
+        if isinstance(res, Exception):
+            errors.append(str(res))
+            if key in old:
+                new[key] = old[key]  # keep its outputs on record; the last good build stays published
+            continue
+        page = outputs_dir / kind / name
+        outputs: Dict[str, str] = {}
+        if page.exists() and not is_generated(page) and not overwrite_hand_made:
+            kept.append(f"{kind}/{name}")
+        else:
+            if _write_if_changed(page, res["page"]):
+                written.append(page)
+            outputs[f"{kind}/{name}"] = _sha(res["page"].encode("utf-8"))
+        if "bank" in res:
+            bank = page.with_suffix(".json")
+            if _write_if_changed(bank, res["bank"]):
+                written.append(bank)
+            outputs[f"{kind}/{bank.name}"] = _sha(res["bank"].encode("utf-8"))
+        new[key] = {"hash": digest, "tool": tool, "page": f"{kind}/{name}", "outputs": outputs}
+
+    removed: List[Path] = []
+    for key in old.keys() - new.keys():
+        for rel, h in old[key]["outputs"].items():
+            p = outputs_dir / rel
+            if _file_sha(p) == h:
+                p.unlink()
+                removed.append(p)
+
+    trees[tree_key] = new
+    _write_if_changed(state_path, json.dumps({"version": VERSION, "trees": trees}, ensure_ascii=False) + "\n")
+
+    return {"sources": len(found), "compiled": len(jobs) - len(errors), "cached": cached,
+            "written": written, "kept": kept, "removed": removed, "errors": errors, "ignored": ignored,
+            "check": cross_check(outputs_dir, [rec["page"] for rec in new.values()])}
+
+
+# -----------------------
+# Story cross-check
+# -----------------------
+
+def _exact_case(outputs_dir: Path, rel: str) -> Tuple[bool, Optional[str]]:
+    """(exists with exactly this case, the name in another case if only that exists)."""
+    p = outputs_dir / rel
+    try:
+        names = os.listdir(p.parent)
+    except OSError:
+        return False, None
+    if p.name in names:
+        return True, None
+    other = next((n for n in names if n.lower() == p.name.lower()), None)
+    return False, (str(Path(rel).parent / other).replace(os.sep, "/") if other else None)
+
+
+def player_href(loc: str, fname: str) -> str:
+    """The href the player builds for a FAQ / quiz button (sop_player.html normalizeHrefForOutputs)."""
+    loc = loc.strip().replace("\\", "/").rstrip("/")
+    fname = fname.strip().replace("\\", "/").lstrip("/")
+    if re.match(r"^https?://", loc, re.I):
+        return f"{loc}/{fname}"
+    if loc.startswith("./"):
+        loc = loc[2:]
+    if loc.startswith("../outputs/"):
+        loc = "../" + loc[len("../outputs/"):]
+    elif loc.startswith("outputs/"):
+        loc = "../" + loc[len("outputs/"):]
+    elif loc in ("../outputs", "outputs"):
+        loc = ".."
+    return f"{loc}/{fname}"
+
+
+def cross_check(outputs_dir: Path, compiled: List[str]) -> Dict[str, List[str]]:
+    """
+    Check story FAQ_File / Quiz_File links against `outputs_dir`:
+      {"missing": [...], "case": [...], "unlinked": [compiled pages no story links]}
+    """
+    missing: List[str] = []
+    case: List[str] = []
+    linked = set()
+    for story_path in sorted(outputs_dir.glob("story/*/story.json")):
+        try:
+            story = story_format.expand_story(json.loads(story_path.read_text(encoding="utf-8")))
+        except ValueError:
+            continue
+        sop = str(story.get("sop_id") or story_path.parent.name)
+        refs: Dict[str, List[str]] = {}
+        for fr in story.get("frames") or []:
+            if not isinstance(fr, dict):
+                continue
+            for prefix in LINK_PREFIXES.values():
+                fname = str(fr.get(f"{prefix}_File") or "").strip()
+                loc = str(fr.get(f"{prefix}_Loc") or "").strip()
+                if not (loc and fname):
+                    continue  # the player shows no button either
+                href = build_catalog.outputs_href(player_href(loc, fname))
+                if href and build_catalog._is_local(href):
+                    refs.setdefault(href, []).append(str(fr.get("frame_code") or "?"))
+        for href, codes in sorted(refs.items()):
+            linked.add(href.lower())
+            ok, other = _exact_case(outputs_dir, href)
+            if ok:
+                continue
+            where = f"{sop} ({len(codes)} frame(s), first {codes[0]})"
+            if other:
+                case.append(f"{where}: {href} differs only in case from {other}")
+            else:
+                missing.append(f"{where}: {href} not found")
+    unlinked = sorted(rel for rel in compiled if rel.lower() not in linked)
+    return {"missing": missing, "case": case, "unlinked": unlinked}
+
+
+def print_result(res: Dict[str, Any], label: str = "") -> None:
+    flag = "FAIL" if res["errors"] else "OK"
+    print(f"[{flag}] {label}{res['sources']} source(s): {res['compiled']} compiled, {res['cached']} cached, "
+          f"{len(res['written'])} file(s) written, {len(res['removed'])} removed")
+    for e in res["errors"]:
+        print(f"     ERROR: {e}")
+    for name in res["kept"]:
+        print(f"     kept hand-made {name} (--overwrite-hand-made to replace)")
+    for name in res["ignored"]:
+        print(f"     ignored {name} (not *_faq.md / *_quiz.md)")
+    check = res["check"]
+    for line in check["missing"] + check["case"]:
+        print(f"     WARN: {line}")
+    for rel in check["unlinked"]:
+        print(f"     note: {rel} is not linked from any story")
+
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compile FAQ / quiz markdown into docs/outputs/faq|quiz")
+    ap.add_argument("--docs", default=str(DEFAULT_DOCS), help="FAQ / quiz sources (default: inputs/Faq_QuizDocs)")
+    ap.add_argument("--outputs", default=str(REPO_ROOT / "docs" / "outputs"),
+                    help="Outputs folder holding faq/, quiz/ and story/ (default: docs/outputs)")
+    ap.add_argument("--template", default=str(DEFAULT_TEMPLATE), help="Page template (default: src/templates/sop_faq_quiz.html)")
+    ap.add_argument("--state", default=None,
+                    help="Incremental state file (default: outputs/pipeline_state/faq_quiz_state.json)")
+    ap.add_argument("--workers", type=int, default=None, help="Parallel compiles (default: CPU count; 1 = in-process)")
+    ap.add_argument("--overwrite-hand-made", action="store_true",
+                    help="Replace existing pages this tool did not generate")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and recompile every source")
+    args = ap.parse_args()
+
+    outputs_dir = Path(args.outputs)
+    if not outputs_dir.is_dir():
+        print(f"ERROR: missing {outputs_dir}", file=sys.stderr)
+        return 2
+
+    with build_events.stage_event("faq_quiz", "build_faq_quiz", VERSION) as ev:
+        t0 = time.perf_counter()
+        res = compile_all(Path(args.docs), outputs_dir, Path(args.template),
+                          Path(args.state) if args.state else None, args.workers,
+                          args.overwrite_hand_made, args.force)
+        print_result(res)
+        print(f"     in {time.perf_counter() - t0:.3f}s")
+        ev.update(out=outputs_dir, detail=f"compiled {res['compiled']}, cached {res['cached']}, "
+                                          f"errors {len(res['errors'])}")
+    return 1 if res["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+build_history.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Local SQLite history of every build step, from both
+  - the structured events in logs/events/*.jsonl (build_events.py), and
+  - the older free-text logs in logs/ (csv_to_story_<SOP>_<stamp>.log,
+    build_player_<SOP>_<stamp>.log, <SOP>_validate_<stamp>.log, including
+    odd names like "csv_to_story_Rental_122125_1249).log"),
+plus rotation of old logs into monthly zip archives under logs/archive/.
+Archived logs stay queryable: `index` reads the archives too, and every
+record has a stable key, so re-indexing never duplicates rows. Tools that
+emit events also still write their free-text log; such a legacy row is
+dropped when an event exists for the same stage and SOP within
+LEGACY_DUP_WINDOW_S seconds, so each build is counted once.
+
+Commands:
+  index                 load new/changed logs, events and archives into the DB
+  trend                 one metric per SOP over time, e.g.
+                          trend --stage player --metric duration_s --days 30
+  sql "SELECT ..."      run a query against the events table
+  rotate --days 30      index, then move logs older than N days into
+                        logs/archive/<YYYY-MM>.zip (events files by month)
+
+Legacy timestamps: the <MMDDYY_HHMM> file stamps are UTC, both in the older
+logs (Codespaces shell) and in the ones sop_pipeline.py names (_stamp() uses
+UTC). csv_to_story lines are UTC too; build_player lines are
+America/New_York. Files with no usable stamp (…_MMDDYY_HHMM.log) fall back to
+the file mtime.
+
+Usage:
+  python src/python/build_history.py index
+  python src/python/build_history.py trend --stage player --sop LineEnt --days 30
+  python src/python/build_history.py rotate --days 30
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import build_events
+
+NY_TZ = ZoneInfo("America/New_York")
+VERSION = "v1_20261017"
+
+REPO_ROOT = build_events.REPO_ROOT
+DEFAULT_DB = REPO_ROOT / "outputs" / "build_history.sqlite"
+DEFAULT_LOGS = REPO_ROOT / "logs"
+METRICS = ("duration_s", "rows", "frames", "output_bytes")
+# Legacy stamps are minute-precision (file names) or the start of the run,
+# events are stamped when the stage ends.
+LEGACY_DUP_WINDOW_S = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id           INTEGER PRIMARY KEY,
+    source_key   TEXT UNIQUE,
+    source       TEXT,          -- event | legacy
+    ts           TEXT,          -- ISO 8601 with offset
+    ts_utc       TEXT,          -- sortable UTC copy used by queries
+    run_id       TEXT,
+    sop_id       TEXT,
+    stage        TEXT,
+    tool         TEXT,
+    tool_version TEXT,
+    status       TEXT,
+    duration_s   REAL,
+    rows         INTEGER,
+    frames       INTEGER,
+    output_bytes INTEGER,
+    out          TEXT,
+    detail       TEXT
+);
+CREATE INDEX IF NOT EXISTS events_stage_sop_ts ON events(stage, sop_id, ts_utc);
+CREATE TABLE IF NOT EXISTS sources (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER,
+    mtime_ns INTEGER,
+    records  INTEGER
+);
+"""
+
+_DROP_LEGACY_DUPS = """
+DELETE FROM events WHERE source = 'legacy' AND EXISTS (
+    SELECT 1 FROM events e
+    WHERE e.source = 'event' AND e.stage = events.stage AND e.sop_id = events.sop_id
+      AND ABS(julianday(e.ts_utc) - julianday(events.ts_utc)) * 86400 <= ?)
+"""
+
+_STAMP_RE = re.compile(r"(\d{6})_(\d{4})")
+_BRACKET_TS_RE = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?: ([+-]\d{4}))?\]\s*(.*)$")
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(db_path))
+    con.executescript(SCHEMA)
+    return con
+
+
+# -----------------------
+# Parsing
+# -----------------------
+
+def _stamp_from_name(name: str) -> Optional[datetime]:
+    m = _STAMP_RE.search(name)
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(1) + m.group(2), "%m%d%y%H%M").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _bracket_ts(line: str, default_tz) -> Tuple[Optional[datetime], str]:
+    m = _BRACKET_TS_RE.match(line.strip())
+    if not m:
+        return None, line.strip()
+    ts = datetime.strptime(m.group(1), "%Y-%m-%d %H:%M:%S")
+    if m.group(2):
+        ts = datetime.strptime(m.group(1) + " " + m.group(2), "%Y-%m-%d %H:%M:%S %z")
+    else:
+        ts = ts.replace(tzinfo=default_tz)
+    return ts, m.group(3)
+
+
+def _sop_from_output(path: str, fallback: str) -> str:
+    p = Path(path.strip().replace("\\", "/"))
+    if p.name == "story.json":
+        return p.parent.name
+    if p.name.endswith("_player.html"):
+        return p.name[: -len("_player.html")]
+    return fallback
+
+
+def parse_legacy(name: str, text: str, mtime: datetime) -> Optional[Dict[str, Any]]:
+    """Turn one free-text log into an event dict (None if the format is unknown)."""
+    lines = [l for l in text.splitlines() if l.strip()]
+    stamp = _stamp_from_name(name) or mtime
+    ev: Dict[str, Any] = {"status": "ok", "ts": stamp}
+
+    if name.startswith("build_player_"):
+        fallback = re.sub(r"^build_player_(PPS_)?", "", name)
+        fallback = _STAMP_RE.split(fallback)[0].rstrip("_")
+        times = []
+        for line in lines:
+            ts, msg = _bracket_ts(line, NY_TZ)
+            if ts:
+                times.append(ts)
+            if msg.startswith("build_player.py "):
+                ev["tool_version"] = msg.split()[1]
+            m = re.match(r"Wrote: (.+) \((\d+) bytes\)", msg)
+            if m:
+                ev["out"] = m.group(1)
+                ev["output_bytes"] = int(m.group(2))
+        if not times:
+            return None
+        ev.update(stage="player", tool="build_player", ts=times[0],
+                  duration_s=(times[-1] - times[0]).total_seconds(),
+                  sop_id=_sop_from_output(ev.get("out", ""), fallback))
+        if not any("Done." in l for l in lines):
+            ev["status"] = "failed"
+        return ev
+
+    if name.startswith("csv_to_story_"):
+        for line in lines:
+            ts, msg = _bracket_ts(line, timezone.utc)
+            m = re.match(r"(\S+) Wrote (.+?) with (\d+) frames\. Start=(\S*)", msg)
+            if ts and m:
+                ev.update(stage="story", tool="csv_to_story", ts=ts, tool_version=m.group(1),
+                          out=m.group(2), frames=int(m.group(3)),
+                          sop_id=_sop_from_output(m.group(2), ""), detail=f"Start={m.group(4)}")
+                return ev
+        return None
+
+    if "_validate_" in name:
+        fields = {}
+        for line in lines:
+            k, sep, v = line.partition(":")
+            if sep:
+                fields[k.strip()] = v.strip()
+        if "Rows" not in fields:
+            return None
+        missing = "image file is missing" in text
+        ev.update(stage="validate_env", tool="validate_env_sop_build", sop_id=name.split("_validate_")[0],
+                  rows=int(fields["Rows"]) if fields["Rows"].isdigit() else None,
+                  status="warn" if missing or "empty Image_sub_url" in text else "ok",
+                  detail=f"Unique Codes: {fields.get('Unique Codes', '?')}")
+        return ev
+
+    return None
+
+
+# -----------------------
+# Indexing
+# -----------------------
+
+def _insert(con: sqlite3.Connection, key: str, source: str, ev: Dict[str, Any]) -> int:
+    ts = ev.get("ts")
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts is not None and ts.tzinfo is None:
+        ts = ts.replace(tzinfo=NY_TZ)
+    cur = con.execute(
+        """INSERT OR IGNORE INTO events (source_key, source, ts, ts_utc, run_id, sop_id, stage, tool,
+               tool_version, status, duration_s, rows, frames, output_bytes, out, detail)
+           VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+        (
+            key, source,
+            ts.isoformat() if ts else None,
+            ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if ts else None,
+            ev.get("run_id"), ev.get("sop_id"), ev.get("stage"), ev.get("tool"), ev.get("tool_version"),
+            ev.get("status"), ev.get("duration_s"), ev.get("rows"), ev.get("frames"),
+            ev.get("output_bytes"), ev.get("out"), ev.get("detail"),
+        ),
+    )
+    return cur.rowcount
+
+
+def _index_text(con: sqlite3.Connection, name: str, text: str, mtime: datetime) -> int:
+    added = 0
+    if name.endswith(".jsonl"):
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                continue
+            key = "event:" + hashlib.sha1(line.encode("utf-8")).hexdigest()
+            added += _insert(con, key, "event", ev)
+    elif name.endswith(".log"):
+        ev = parse_legacy(name, text, mtime)
+        if ev is not None:
+            added += _insert(con, "legacy:" + name, "legacy", ev)
+    return added
+
+
+def _sources(logs: Path) -> Iterator[Path]:
+    for p in sorted(logs.glob("*.log")):
+        yield p
+    for sub in ("events", "archive"):
+        d = logs / sub
+        if d.is_dir():
+            for p in sorted(d.iterdir()):
+                if p.suffix in (".jsonl", ".zip"):
+                    yield p
+
+
+def index_logs(con: sqlite3.Connection, logs: Path) -> Dict[str, int]:
+    """Load new or changed files (by size + mtime); returns counts."""
+    stats = {"files": 0, "skipped": 0, "added": 0, "duplicates": 0}
+    for p in _sources(logs):
+        st = p.stat()
+        row = con.execute("SELECT size, mtime_ns FROM sources WHERE path = ?", (str(p),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            stats["skipped"] += 1
+            continue
+        added = 0
+        if p.suffix == ".zip":
+            with zipfile.ZipFile(p) as zf:
+                for info in zf.infolist():
+                    mtime = datetime(*info.date_time, tzinfo=timezone.utc)
+                    text = zf.read(info).decode("utf-8", "replace")
+                    added += _index_text(con, Path(info.filename).name, text, mtime)
+        else:
+            mtime = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+            added += _index_text(con, p.name, p.read_text(encoding="utf-8", errors="replace"), mtime)
+        con.execute(
+            "INSERT OR REPLACE INTO sources (path, size, mtime_ns, records) VALUES (?,?,?,?)",
+            (str(p), st.st_size, st.st_mtime_ns, added),
+        )
+        stats["files"] += 1
+        stats["added"] += added
+    # Legacy logs are read before the events files, so drop their duplicates afterwards.
+    stats["duplicates"] = con.execute(_DROP_LEGACY_DUPS, (LEGACY_DUP_WINDOW_S,)).rowcount
+    con.commit()
+    return stats
+
+
+# -----------------------
+# Queries
+# -----------------------
+
+def trend(con: sqlite3.Connection, stage: str, metric: str = "duration_s", sop: Optional[str] = None,
+          days: Optional[int] = 30) -> List[Tuple[str, str, Any, str]]:
+    """(sop_id, ts, value, status) rows for one stage, oldest first."""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    # skipped/blocked stages did no work, so they would only drag the trend down
+    q = (f"SELECT sop_id, ts, {metric}, status FROM events WHERE stage = ? AND {metric} IS NOT NULL"
+         " AND status NOT IN ('skipped', 'blocked')")
+    args: List[Any] = [stage]
+    if sop:
+        q += " AND sop_id = ?"
+        args.append(sop)
+    if days:
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        q += " AND ts_utc >= ?"
+        args.append(since)
+    q += " ORDER BY sop_id, ts_utc"
+    return con.execute(q, args).fetchall()
+
+
+def format_trend(rows: List[Tuple[str, str, Any, str]], metric: str) -> str:
+    if not rows:
+        return "(no matching events)"
+    out = [f"{'SOP':<16} {'when':<25} {metric:>14}  status"]
+    per_sop: Dict[str, List[float]] = {}
+    for sop, ts, value, status in rows:
+        out.append(f"{sop or '?':<16} {ts:<25} {value:>14}  {status}")
+        per_sop.setdefault(sop or "?", []).append(float(value))
+    out.append("")
+    out.append(f"{'SOP':<16} {'n':>4} {'min':>12} {'avg':>12} {'max':>12}")
+    for sop, vals in sorted(per_sop.items()):
+        out.append(f"{sop:<16} {len(vals):>4} {min(vals):>12.4g} {sum(vals) / len(vals):>12.4g} {max(vals):>12.4g}")
+    return "\n".join(out)
+
+
+# -----------------------
+# Rotation
+# -----------------------
+
+def _file_month(p: Path) -> Tuple[str, datetime]:
+    m = re.match(r"events_(\d{4})-(\d{2})\.jsonl$", p.name)
+    if m:
+        when = datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc)
+        # the month is only complete once it has ended
+        nxt = (when + timedelta(days=32)).replace(day=1)
+        return f"{m.group(1)}-{m.group(2)}", nxt
+    when = _stamp_from_name(p.name) or datetime.fromtimestamp(p.stat().st_mtime, tz=timezone.utc)
+    return when.strftime("%Y-%m"), when
+
+
+def rotate(con: sqlite3.Connection, logs: Path, days: int, dry_run: bool = False) -> List[Tuple[Path, Path]]:
+    """
+    Index first, then move *.log and finished events_*.jsonl files older than
+    `days` into logs/archive/<YYYY-MM>.zip. Returns (file, archive) pairs.
+    """
+    index_logs(con, logs)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    candidates = list(logs.glob("*.log"))
+    if (logs / "events").is_dir():
+        candidates += list((logs / "events").glob("events_*.jsonl"))
+
+    moved = []
+    for p in sorted(candidates):
+        month, when = _file_month(p)
+        if when >= cutoff:
+            continue
+        archive = logs / "archive" / f"{month}.zip"
+        moved.append((p, archive))
+        if dry_run:
+            continue
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(archive, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+            arcname = ("events/" if p.parent.name == "events" else "") + p.name
+            if arcname not in zf.namelist():
+                zf.write(p, arcname)
+        p.unlink()
+    if moved and not dry_run:
+        index_logs(con, logs)  # record the archives so the next index skips them
+    return moved
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build history: index logs into SQLite, query trends, rotate logs")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="SQLite file (default: outputs/build_history.sqlite)")
+    ap.add_argument("--logs", default=str(DEFAULT_LOGS), help="Logs folder (default: logs)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("index", help="Load new/changed logs and events")
+
+    t = sub.add_parser("trend", help="One metric per SOP over time")
+    t.add_argument("--stage", required=True, help="ready | validate_env | images | story | validate_story | player")
+    t.add_argument("--metric", choices=METRICS, default="duration_s")
+    t.add_argument("--sop", default=None)
+    t.add_argument("--days", type=int, default=30, help="Look-back window; 0 = all")
+    t.add_argument("--no-index", action="store_true", help="Query without indexing first")
+
+    q = sub.add_parser("sql", help="Run a read-only SQL query")
+    q.add_argument("query")
+
+    r = sub.add_parser("rotate", help="Archive logs older than --days into logs/archive/<YYYY-MM>.zip")
+    r.add_argument("--days", type=int, default=30)
+    r.add_argument("--dry-run", action="store_true")
+
+    args = ap.parse_args(argv)
+    logs = Path(args.logs)
+    con = connect(Path(args.db))
+
+    if args.cmd == "index":
+        s = index_logs(con, logs)
+        total = con.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        print(f"Indexed {s['files']} file(s) (+{s['added']} records, {s['skipped']} unchanged, "
+              f"{s['duplicates']} legacy duplicate(s) dropped); {total} in history")
+    elif args.cmd == "trend":
+        if not args.no_index:
+            index_logs(con, logs)
+        print(format_trend(trend(con, args.stage, args.metric, args.sop, args.days or None), args.metric))
+    elif args.cmd == "sql":
+        con.execute("PRAGMA query_only = ON")
+        cur = con.execute(args.query)
+        cols = [d[0] for d in cur.description or []]
+        if cols:
+            print("\t".join(cols))
+        for row in cur:
+            print("\t".join("" if v is None else str(v) for v in row))
+    elif args.cmd == "rotate":
+        moved = rotate(con, logs, args.days, args.dry_run)
+        verb = "Would archive" if args.dry_run else "Archived"
+        for p, archive in moved:
+            print(f"{verb}: {p} -> {archive}")
+        print(f"{verb} {len(moved)} file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,28 +14,67 @@ Key compatibility fix (GitHub Pages):
     /outputs/quiz          -> ../quiz
 
 Version:
-  SOP_BUILD_build_player_v1.1
+  SOP_BUILD_build_player_v1.6
 Date:
-  2025-12-13 America/New_York
+  2026-10-17 America/New_York
 
 Notes:
   - Template placeholder matching is tolerant: supports multiple token styles.
+    The template is compiled once into a token list (cached per path/mtime) and
+    rendered in a single pass.
   - If the template has no obvious placeholder for story data, the script injects
     a <script>window.SOP_STORY=...</script> block just before </body>.
+    (v1.1 checked this after substitution, so templates with __STORY_JSON__
+    got the story inlined twice; the compiled check fixes that.)
+  - --output-profile compact inlines minified story JSON and writes .gz/.br
+    siblings of the player (see precompress.py).
+  - --preload-start-image fills the PRELOAD_LINKS slot with a preload link for
+    the start frame's image.
+  - --fingerprint-assets rewrites the inlined story's image URLs (and
+    --story-web) to content-named copies in docs/outputs/fp/ (see
+    fingerprint_assets.py), which serve_outputs.py marks immutable.
+  - --image-store points the inlined story's image URLs at the shared,
+    content-addressed store in docs/outputs/store/ (see image_store.py):
+    a slide used by several SOPs is one URL and one browser cache entry.
+    Stories already built with csv_to_story.py --image-store are left as
+    they are. Store names are already content hashes, so with both flags
+    --fingerprint-assets only renames --story-web.
+  - --lazy-narration inlines only the navigation skeleton (SKELETON_KEYS:
+    codes, titles, images, choices, decision questions, UAP link). Every other
+    frame field (narr1-3, FAQ_*/Quiz_*, meta, ...) goes into JSON shards of
+    --shard-frames frames each, written next to the player:
+      players/LineEnt_narr/0.3f9c2a71be.json   {"frames": {"S000": {...}}}
+    Shard names carry a content hash (cacheable as immutable); stale shards
+    are removed and manifest.json lists the current set. The player fetches
+    a shard the first time one of its frames is shown (and prefetches the
+    shards of the frames a click can reach next). Needs the player to be
+    served over http(s): file:// pages cannot fetch the shards.
+  - Interned stories (csv_to_story.py --intern) are expanded on read, so every
+    step above sees the plain layout, and re-interned (story_format.py) before
+    inlining; the template expands each frame on first use.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import re
 from dataclasses import dataclass
+from html import escape as html_escape
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
+import build_events
+import fingerprint_assets
+import image_store
+import precompress
+import sop_profile
+import story_format
+
 
 # -----------------------
 # Provenance / versioning
@@ -44,7 +83,19 @@ from zoneinfo import ZoneInfo
 NY_TZ = ZoneInfo("America/New_York")
 BUILD_DT = datetime.now(NY_TZ).strftime("%Y-%m-%d %H:%M %Z")
 BUILD_STAMP = datetime.now(NY_TZ).strftime("%Y%m%d_%H%M")
-BUILD_VERSION = "SOP_BUILD_build_player_v1.1"
+BUILD_VERSION = "SOP_BUILD_build_player_v1.6"
+
+OUTPUT_PROFILES = ("pretty", "compact")
+
+# Frame fields kept inline by --lazy-narration (what the first paint and the
+# navigation need); everything else is moved to the narration shards.
+SKELETON_KEYS = (
+    "frame_code", "title", "image", "image_opt", "image_srcset",
+    "decision_question", "choices", "uap_url", "uap_label",
+)
+LAZY_DIR_SUFFIX = "_narr"
+LAZY_MANIFEST = "manifest.json"
+DEFAULT_SHARD_FRAMES = 8
 
 
 # -----------------------
@@ -134,6 +185,8 @@ def _normalize_outputs_web_paths(story: Dict[str, Any], base_rel: str) -> Dict[s
             continue
         if "image" in fr:
             fr["image"] = fix(fr["image"])
+        if "image_opt" in fr:
+            fr["image_opt"] = fix(fr["image_opt"])
         if "FAQ_Loc" in fr:
             fr["FAQ_Loc"] = fix(fr["FAQ_Loc"])
         if "Quiz_Loc" in fr:
@@ -144,6 +197,28 @@ def _normalize_outputs_web_paths(story: Dict[str, Any], base_rel: str) -> Dict[s
     return story
 
 
+def _start_image_preload(story: Dict[str, Any]) -> str:
+    """
+    <link rel="preload"> for the start frame's slide (srcset-aware), so the
+    first image request starts while the inline story JSON is still parsing.
+    """
+    frames = story.get("frames") or []
+    start = story.get("start_code")
+    fr = next((f for f in frames if isinstance(f, dict) and f.get("frame_code") == start), None)
+    if fr is None and frames:
+        fr = frames[0]
+    if not isinstance(fr, dict):
+        return ""
+    href = fr.get("image_opt") or fr.get("image") or ""
+    if not isinstance(href, str) or not href:
+        return ""
+    attrs = f'rel="preload" as="image" href="{html_escape(href)}"'
+    srcset = fr.get("image_srcset") or ""
+    if isinstance(srcset, str) and srcset:
+        attrs += f' imagesrcset="{html_escape(srcset)}" imagesizes="(max-width: 1300px) 100vw, 1300px"'
+    return f"<link {attrs} />"
+
+
 def _default_title_from_story(story: Dict[str, Any], fallback: str) -> str:
     meta = story.get("meta") or {}
     fn = meta.get("function") or meta.get("Function") or ""
@@ -155,28 +230,206 @@ def _default_title_from_story(story: Dict[str, Any], fallback: str) -> str:
     return fallback
 
 
-def _replace_any(template: str, replacements: Dict[str, str]) -> str:
+# -----------------------
+# Lazy narration shards
+# -----------------------
+
+def lazy_dir_for(out_html: Path) -> Path:
+    """players/LineEnt_player.html -> players/LineEnt_narr/"""
+    name = out_html.name
+    stem = name[: -len("_player.html")] if name.endswith("_player.html") else out_html.stem
+    return out_html.parent / (stem + LAZY_DIR_SUFFIX)
+
+
+def split_lazy(story: Dict[str, Any], shard_frames: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
     """
-    Replace multiple placeholder styles:
-      {{KEY}}, __KEY__, %%KEY%%, <!--KEY-->
+    (skeleton story, shards). Shard i holds the non-skeleton fields of frames
+    [i*shard_frames, (i+1)*shard_frames) in story order, keyed by frame_code.
+    Empty fields are dropped from the shards (the player treats missing as "").
     """
-    out = template
-    for k, v in replacements.items():
-        out = out.replace(f"{{{{{k}}}}}", v)
-        out = out.replace(f"__{k}__", v)
-        out = out.replace(f"%%{k}%%", v)
-        out = out.replace(f"<!--{k}-->", v)
-    return out
+    n = max(1, int(shard_frames))
+    frames = story.get("frames") or []
+    skeleton = {k: v for k, v in story.items() if k != "frames"}
+    skel_frames: List[Any] = []
+    shards: List[Dict[str, Any]] = []
+    for i, fr in enumerate(frames):
+        if i % n == 0:
+            shards.append({"frames": {}})
+        if not isinstance(fr, dict):
+            skel_frames.append(fr)
+            continue
+        skel_frames.append({k: fr[k] for k in SKELETON_KEYS if k in fr})
+        detail = {k: v for k, v in fr.items() if k not in SKELETON_KEYS and v not in ("", None, {}, [])}
+        if detail:
+            shards[-1]["frames"][str(fr.get("frame_code", ""))] = detail
+    skeleton["frames"] = skel_frames
+    return skeleton, shards
 
 
-def _inject_story_if_needed(html: str, story_json_str: str) -> str:
+def write_shards(shards: List[Dict[str, Any]], shard_dir: Path, compact: bool) -> List[str]:
     """
-    If no placeholder replaced it, inject a script block before </body>.
+    Write content-named shard files (unchanged ones are left alone), drop
+    shards from earlier builds and refresh manifest.json. Returns the names.
     """
-    if "window.SOP_STORY" in html or "__STORY_JSON__" in html or "{{STORY_JSON}}" in html:
-        return html
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    names: List[str] = []
+    for i, shard in enumerate(shards):
+        if compact:
+            text = json.dumps(shard, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(shard, ensure_ascii=False, indent=1)
+        data = text.encode("utf-8")
+        h = hashlib.sha256(data).hexdigest()[: fingerprint_assets.HASH_LEN]
+        name = f"{i}.{h}.json"
+        p = shard_dir / name
+        if not p.is_file() or p.stat().st_size != len(data):
+            p.write_bytes(data)
+        if compact and not all(os.path.exists(x) for x in precompress.sibling_paths(str(p)).values()):
+            precompress.write_precompressed(str(p))
+        names.append(name)
+
+    keep = set(names) | {LAZY_MANIFEST}
+    keep |= {n + ext for n in names for ext in (".gz", ".br")}
+    for e in os.scandir(shard_dir):
+        if e.is_file() and e.name not in keep:
+            os.remove(e.path)
+    manifest = json.dumps({"shards": names}, indent=1) + "\n"
+    if not (shard_dir / LAZY_MANIFEST).is_file() or _read_text(shard_dir / LAZY_MANIFEST) != manifest:
+        _write_text(shard_dir / LAZY_MANIFEST, manifest)
+    return names
+
+
+# -----------------------
+# Compiled template engine
+# -----------------------
+
+# Every key build() supplies. Longest first so PAGE_TITLE wins over TITLE.
+TEMPLATE_KEYS = (
+    "PAGE_TITLE", "TITLE", "MODE", "IMAGE_WIDTH", "EXIT_HREF", "STORY_WEB",
+    "STORY_JSON", "BUILD_VERSION", "BUILD_DT", "BUILD_STAMP", "PRELOAD_LINKS",
+)
+
+_LIT, _KEY, _INJECT = 0, 1, 2
 
-    inject = (
+
+def _placeholder_re(keys) -> "re.Pattern[str]":
+    """
+    One regex for all four placeholder styles:
+      {{KEY}}, __KEY__, %%KEY%%, <!--KEY-->
+    """
+    alt = "|".join(re.escape(k) for k in sorted(keys, key=len, reverse=True))
+    return re.compile(
+        r"\{\{(" + alt + r")\}\}|__(" + alt + r")__|%%(" + alt + r")%%|<!--(" + alt + r")-->"
+    )
+
+
+_PLACEHOLDER_RE = _placeholder_re(TEMPLATE_KEYS)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    Template parsed once into (kind, text, raw) tokens:
+      _LIT    literal text
+      _KEY    placeholder; `text` is the key, `raw` the original spelling
+      _INJECT spot for the window.SOP_STORY block (before each </body>)
+    `head` is the doctype line the provenance comment goes after ("" = prepend).
+    `split_first_line` covers a doctype line that itself holds a placeholder.
+    """
+    tokens: Tuple[Tuple[int, str, str], ...]
+    head: str
+    needs_story_inject: bool
+    split_first_line: bool = False
+
+    def render(self, values: Dict[str, str], story_json_str: str) -> str:
+        inject = _story_inject_block(story_json_str) if self.needs_story_inject else ""
+        out: List[str] = [self.head, _provenance_comment()] if self.head else []
+        for kind, text, raw in self.tokens:
+            if kind == _LIT:
+                out.append(text)
+            elif kind == _KEY:
+                out.append(values.get(text, raw))
+            else:
+                out.append(inject)
+        html = "".join(out)
+        if self.head:
+            return html
+        if self.split_first_line:
+            lines = html.splitlines(True)
+            return lines[0] + _provenance_comment() + "".join(lines[1:])
+        return _provenance_comment() + html
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    # The story is inlined by a placeholder, or read from window.SOP_STORY;
+    # only when the template does neither do we inject a script block.
+    has_story_slot = "window.SOP_STORY" in template or any(
+        m.group(m.lastindex) == "STORY_JSON" for m in _PLACEHOLDER_RE.finditer(template)
+    )
+    needs_inject = not has_story_slot
+
+    head = ""
+    body = template
+    split_first_line = False
+    if "<!doctype html" in template.lower():
+        first = template.splitlines(True)[0]
+        if _PLACEHOLDER_RE.search(first):
+            split_first_line = True
+        else:
+            head, body = first, template[len(first):]
+
+    tokens: List[Tuple[int, str, str]] = []
+
+    def add_literal(text: str) -> None:
+        if not text:
+            return
+        if needs_inject and "</body>" in text:
+            pieces = text.split("</body>")
+            for n, piece in enumerate(pieces):
+                if n:
+                    tokens.append((_INJECT, "", ""))
+                    tokens.append((_LIT, "</body>", ""))
+                if piece:
+                    tokens.append((_LIT, piece, ""))
+        else:
+            tokens.append((_LIT, text, ""))
+
+    pos = 0
+    for m in _PLACEHOLDER_RE.finditer(body):
+        add_literal(body[pos:m.start()])
+        tokens.append((_KEY, m.group(m.lastindex), m.group(0)))
+        pos = m.end()
+    add_literal(body[pos:])
+
+    if needs_inject and not any(k == _INJECT for k, _, _ in tokens):
+        tokens.append((_INJECT, "", ""))
+
+    return CompiledTemplate(tuple(tokens), head, needs_inject, split_first_line)
+
+
+_TEMPLATE_CACHE: Dict[Tuple[str, int, int], CompiledTemplate] = {}
+
+
+def load_template(p: Path) -> CompiledTemplate:
+    """
+    Compile a template file once per (path, mtime, size); batch builds reuse it.
+    An edited template replaces its stale entry, so a long-running process
+    (sop_watch.py) keeps one compiled copy per path.
+    """
+    st = p.stat()
+    path = str(p.resolve())
+    key = (path, st.st_mtime_ns, st.st_size)
+    ct = _TEMPLATE_CACHE.get(key)
+    if ct is None:
+        ct = compile_template(_read_text(p))
+        for old in [k for k in _TEMPLATE_CACHE if k[0] == path]:
+            del _TEMPLATE_CACHE[old]
+        _TEMPLATE_CACHE[key] = ct
+    return ct
+
+
+def _story_inject_block(story_json_str: str) -> str:
+    return (
         "\n<!-- injected by build_player.py -->\n"
         "<script>\n"
         "  window.SOP_STORY = "
@@ -184,25 +437,16 @@ def _inject_story_if_needed(html: str, story_json_str: str) -> str:
         + ";\n"
         "</script>\n"
     )
-    if "</body>" in html:
-        return html.replace("</body>", inject + "</body>")
-    return html + inject
 
 
-def _inject_provenance_comment(html: str) -> str:
-    comment = (
+def _provenance_comment() -> str:
+    return (
         f"<!--\n"
         f"  Built by: build_player.py\n"
         f"  Version: {BUILD_VERSION}\n"
         f"  Built: {BUILD_DT}\n"
         f"-->\n"
     )
-    if "<!doctype html" in html.lower():
-        # Put after doctype line if possible
-        lines = html.splitlines(True)
-        if lines:
-            return lines[0] + comment + "".join(lines[1:])
-    return comment + html
 
 
 # -----------------------
@@ -220,6 +464,16 @@ class Args:
     template: Optional[Path]
     story_web: Optional[str]
     log: Optional[Path]
+    output_profile: str = "pretty"
+    preload_start_image: bool = False
+    fingerprint_assets: bool = False
+    image_store: bool = False
+    image_store_perceptual: bool = False
+    lazy_narration: bool = False
+    shard_frames: int = DEFAULT_SHARD_FRAMES
+    profile: bool = False
+    profile_out: Optional[str] = None
+    cprofile: bool = False
 
 
 def parse_args() -> Args:
@@ -235,6 +489,21 @@ def parse_args() -> Args:
     ap.add_argument("--template", default=None, help="Template HTML path. If omitted, uses src/templates/SOP_player.html.")
     ap.add_argument("--story-web", default=None, help="Optional: web path to story.json (if template expects it).")
     ap.add_argument("--log", default=None, help="Optional log file path.")
+    ap.add_argument("--output-profile", choices=OUTPUT_PROFILES, default="pretty",
+                    help="compact = minified inline story JSON plus .gz/.br siblings of the player HTML.")
+    ap.add_argument("--preload-start-image", action="store_true",
+                    help="Emit <link rel=preload> for the start frame's image (template needs a PRELOAD_LINKS slot).")
+    ap.add_argument("--fingerprint-assets", action="store_true",
+                    help="Point image/story URLs at content-named copies in outputs/fp/ (cacheable as immutable).")
+    ap.add_argument("--image-store", action="store_true",
+                    help="Point image URLs at the shared content-addressed store in outputs/store/ (image_store.py).")
+    ap.add_argument("--image-store-perceptual", action="store_true",
+                    help="With --image-store: reuse visually identical images too (needs Pillow).")
+    ap.add_argument("--lazy-narration", action="store_true",
+                    help="Inline only the navigation skeleton; narration/FAQ/quiz go to on-demand JSON shards.")
+    ap.add_argument("--shard-frames", type=int, default=DEFAULT_SHARD_FRAMES,
+                    help=f"Frames per narration shard with --lazy-narration (default: {DEFAULT_SHARD_FRAMES}; 1 = per frame).")
+    sop_profile.add_arguments(ap)
     ns = ap.parse_args()
 
     return Args(
@@ -247,12 +516,24 @@ def parse_args() -> Args:
         template=Path(ns.template) if ns.template else None,
         story_web=ns.story_web,
         log=Path(ns.log) if ns.log else None,
+        output_profile=ns.output_profile,
+        preload_start_image=bool(ns.preload_start_image),
+        fingerprint_assets=bool(ns.fingerprint_assets),
+        image_store=bool(ns.image_store),
+        image_store_perceptual=bool(ns.image_store_perceptual),
+        lazy_narration=bool(ns.lazy_narration),
+        shard_frames=int(ns.shard_frames),
+        profile=bool(ns.profile),
+        profile_out=ns.profile_out,
+        cprofile=bool(ns.cprofile),
     )
 
 
-def main() -> int:
-    a = parse_args()
-
+def build(a: Args) -> int:
+    """
+    Build one player from already-parsed Args. main() wraps this for the CLI;
+    sop_pipeline.py calls it in-process.
+    """
     if not a.story.exists():
         raise FileNotFoundError(f"story.json not found: {a.story}")
 
@@ -282,18 +563,60 @@ def main() -> int:
     _log(f"Template: {a.template}", a.log)
     _log(f"Out: {a.out}", a.log)
 
-    story = json.loads(_read_text(a.story))
+    with sop_profile.span("read"):
+        story = json.loads(_read_text(a.story))
+        interned = story_format.is_interned(story)
+        story = story_format.expand_story(story)
 
     # Normalize paths for GitHub Pages portability
-    base_rel = _detect_base_rel_for_outputs_players(a.out)
-    story = _normalize_outputs_web_paths(story, base_rel=base_rel)
+    with sop_profile.span("normalize"):
+        base_rel = _detect_base_rel_for_outputs_players(a.out)
+        story = _normalize_outputs_web_paths(story, base_rel=base_rel)
+
+    story_web = a.story_web or ""
+    if a.image_store:
+        with sop_profile.span("image_store"):
+            players_dir = a.out.parent.resolve()
+            store = image_store.store_story(story, image_store.ImageStore(
+                players_dir.parent / image_store.STORE_DIR_NAME, players_dir, a.image_store_perceptual))
+            store.save()
+        _log(f"Image store: {store.summary()} -> {store.store_dir}", a.log)
+    if a.fingerprint_assets:
+        with sop_profile.span("fingerprint"):
+            if a.image_store:
+                fpr = fingerprint_assets.Fingerprinter(a.out.parent.resolve())
+            else:
+                fpr = fingerprint_assets.fingerprint_story(story, a.out.parent.resolve())
+            story_web = fpr.url(story_web) if story_web else ""
+        _log(f"Fingerprinted: {len(fpr.mapping)} asset(s) -> {fpr.fp_dir}, {fpr.missing} not found", a.log)
 
     title = a.title or _default_title_from_story(story, fallback="SOP Player – EdxBuild")
 
-    template_html = _read_text(a.template)
-
-    # JSON for embedding (compact-ish but readable)
-    story_json_str = json.dumps(story, ensure_ascii=False)
+    if a.lazy_narration:
+        with sop_profile.span("shards"):
+            story, shards = split_lazy(story, a.shard_frames)
+            shard_dir = lazy_dir_for(a.out)
+            names = write_shards(shards, shard_dir, a.output_profile == "compact")
+            story["lazy"] = {
+                "base": shard_dir.name + "/",
+                "shards": names,
+                "frames_per_shard": max(1, a.shard_frames),
+            }
+        _log(f"Lazy narration: {len(names)} shard(s) -> {shard_dir}", a.log)
+
+    if interned:
+        with sop_profile.span("intern"):
+            story = story_format.intern_story(story)
+
+    with sop_profile.span("compile_template"):
+        template = load_template(a.template)
+
+    # JSON for embedding (compact-ish but readable; fully minified for the compact profile)
+    with sop_profile.span("serialize"):
+        if a.output_profile == "compact":
+            story_json_str = json.dumps(story, ensure_ascii=False, separators=(",", ":"))
+        else:
+            story_json_str = json.dumps(story, ensure_ascii=False)
 
     replacements = {
         "PAGE_TITLE": title,
@@ -301,27 +624,42 @@ def main() -> int:
         "MODE": a.mode,
         "IMAGE_WIDTH": str(a.image_width),
         "EXIT_HREF": a.exit_href,
-        "STORY_WEB": a.story_web or "",
+        "STORY_WEB": story_web,
         "STORY_JSON": story_json_str,
         "BUILD_VERSION": BUILD_VERSION,
         "BUILD_DT": BUILD_DT,
         "BUILD_STAMP": BUILD_STAMP,
+        "PRELOAD_LINKS": _start_image_preload(story) if a.preload_start_image else "",
     }
 
-    html = _replace_any(template_html, replacements)
-
-    # If template didn’t have a story placeholder, inject story as window.SOP_STORY.
-    # (Your template JS should read window.SOP_STORY; if it doesn’t yet, you can add that once.)
-    html = _inject_story_if_needed(html, story_json_str)
+    # One linear pass: placeholders, provenance comment, and (only if the
+    # template has no story slot) the window.SOP_STORY block.
+    with sop_profile.span("render"):
+        html = template.render(replacements, story_json_str)
 
-    # Always add provenance comment
-    html = _inject_provenance_comment(html)
-
-    _write_text(a.out, html)
+    with sop_profile.span("write"):
+        _write_text(a.out, html)
     _log(f"Wrote: {a.out} ({a.out.stat().st_size} bytes)", a.log)
+    sop_profile.count(frames=len(story.get("frames", [])), story_json_bytes=len(story_json_str.encode("utf-8")),
+                      output_bytes=a.out.stat().st_size)
+    if a.output_profile == "compact":
+        with sop_profile.span("precompress"):
+            sizes = precompress.write_precompressed(str(a.out))
+        _log(f"Precompressed: {precompress.format_sizes(sizes)}", a.log)
     _log("Done.", a.log)
     return 0
 
 
+def main() -> int:
+    a = parse_args()
+    sop_id = a.out.name[: -len("_player.html")] if a.out.name.endswith("_player.html") else a.out.stem
+    with sop_profile.session("build_player", BUILD_VERSION, a, str(a.log) if a.log else None), \
+            build_events.stage_event("player", "build_player", BUILD_VERSION, sop_id) as ev:
+        rc = build(a)
+        ev.update(out=a.out, output_bytes=build_events.file_bytes(
+            a.out, *(precompress.sibling_paths(str(a.out)).values() if a.output_profile == "compact" else ())))
+        return rc
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+build_search_index.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Build-time full-text search across every SOP, so a learner can ask "which
+SOP covers warranty GL?" without the browser downloading every story.json.
+
+Indexed documents:
+  - every frame of docs/outputs/story/*/story.json: title,
+    decision_question, narr1-3 (deep link: players/<SOP>_player.html#<code>)
+  - every section (markdown heading / HTML h1-h3, summary) of the FAQ and
+    quiz sources in inputs/Faq_QuizDocs. A .md wins over an .html of the
+    same name. Linked to the published page of the same name (any case) in
+    docs/outputs/faq|quiz; a source with no published page is skipped (and
+    listed). Published pages with no source are indexed from their HTML.
+
+Output, docs/outputs/search/:
+  index.json             {"version", "prefix_len": 2, "stopwords": [...],
+                          "sops": [...], "docs": [[sop, kind, ref, title, href]],
+                          "shards": {"wa": "wa.3f9c2a71be.json", ...}}
+  <prefix>.<hash>.json   {"warranty": [[doc, weight], ...], ...}
+                          every term starting with <prefix>, sorted
+  index.html             the search page (src/templates/sop_search.html)
+
+- Tokens: NFKD, accents stripped, lower case, runs of [a-z0-9], 2+ chars,
+  minus STOPWORDS. The page tokenizes queries the same way.
+- weight = sum of field weights over a term's occurrences in the document
+  (FIELD_WEIGHTS: title counts 3, decision question 2, narration/body 1).
+- A query fetches only the shards for its tokens' first two characters.
+  Every token matches as a prefix ("warr" finds "warranty"), and all tokens
+  must match (AND). Results are ranked by sum(weight * idf).
+- Shard names carry a content hash (immutable caching through
+  serve_outputs.py). Only changed shards are rewritten, and shards that are
+  no longer listed are removed.
+
+sop_pipeline.py build / build-all refresh it after the catalog
+(--no-search-index to skip).
+
+Usage:
+  python src/python/build_search_index.py
+  python src/python/build_search_index.py --outputs publish_test/docs/outputs --docs inputs/Faq_QuizDocs
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import build_events
+import story_format
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+SEARCH_DIR_NAME = "search"
+INDEX_NAME = "index.json"
+PAGE_NAME = "index.html"
+PREFIX_LEN = 2
+HASH_LEN = 10
+DEFAULT_TEMPLATE = REPO_ROOT / "src" / "templates" / "sop_search.html"
+
+FIELD_WEIGHTS = {
+    "title": 3, "decision_question": 2, "narr1": 1, "narr2": 1, "narr3": 1,
+    "heading": 3, "body": 1,
+}
+FRAME_FIELDS = ("title", "decision_question", "narr1", "narr2", "narr3")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how if in into is it its
+of on or so that the their then there these this to was were what when where which who
+will with you your
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Index / query tokens; sop_search.html mirrors this in JS."""
+    s = unicodedata.normalize("NFKD", text or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    return [t for t in _TOKEN_RE.findall(s) if len(t) >= 2 and t not in STOPWORDS]
+
+
+# -----------------------
+# Documents
+# -----------------------
+
+class Doc:
+    __slots__ = ("sop", "kind", "ref", "title", "href", "fields")
+
+    def __init__(self, sop: str, kind: str, ref: str, title: str, href: Optional[str],
+                 fields: List[Tuple[str, str]]):
+        self.sop, self.kind, self.ref, self.title, self.href, self.fields = sop, kind, ref, title, href, fields
+
+
+def frame_docs(outputs_dir: Path) -> List[Doc]:
+    docs: List[Doc] = []
+    for story_path in sorted(outputs_dir.glob("story/*/story.json")):
+        try:
+            story = story_format.expand_story(json.loads(story_path.read_text(encoding="utf-8")))
+        except ValueError:
+            continue
+        sop = str(story.get("sop_id") or story_path.parent.name)
+        player = f"players/{sop}_player.html"
+        for fr in story.get("frames") or []:
+            if not isinstance(fr, dict) or not fr.get("frame_code"):
+                continue
+            code = str(fr["frame_code"])
+            fields = [(f, str(fr.get(f) or "")) for f in FRAME_FIELDS if fr.get(f)]
+            docs.append(Doc(sop, "frame", code, str(fr.get("title") or code), f"{player}#{code}", fields))
+    return docs
+
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_MD_MARKUP_RE = re.compile(r"[*_`>]+|\[([^\]]*)\]\([^)]*\)")
+
+
+def _md_plain(line: str) -> str:
+    return _MD_MARKUP_RE.sub(lambda m: m.group(1) or " ", line).strip()
+
+
+def markdown_sections(text: str) -> List[Tuple[str, str]]:
+    """[(heading, body text)] per markdown heading; text before the first heading goes under ""."""
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    for line in text.splitlines():
+        m = _HEADING_RE.match(line.strip())
+        if m:
+            sections.append((_md_plain(m.group(2)), []))
+        elif line.strip() and line.strip() != "---":
+            sections[-1][1].append(_md_plain(line))
+    return [(h, " ".join(b)) for h, b in sections if h or b]
+
+
+class _HtmlSections(HTMLParser):
+    """Text of an HTML page, split at h1-h3 / summary; script and style are skipped."""
+
+    HEADS = {"h1", "h2", "h3", "summary"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[List[Any]] = [["", []]]
+        self._head: Optional[List[str]] = None
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "title"):
+            self._skip += 1
+        elif tag in self.HEADS:
+            self._head = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "title"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.HEADS and self._head is not None:
+            self.sections.append([" ".join(" ".join(self._head).split()), []])
+            self._head = None
+
+    def handle_data(self, data):
+        if self._skip or not data.strip():
+            return
+        (self._head if self._head is not None else self.sections[-1][1]).append(data.strip())
+
+
+def html_sections(text: str) -> List[Tuple[str, str]]:
+    p = _HtmlSections()
+    p.feed(text)
+    p.close()
+    return [(h, " ".join(b)) for h, b in p.sections if h or b]
+
+
+def _section_docs(p: Path, kind: str, href: str) -> List[Doc]:
+    sop = build_events.sop_from_filename(p.name)
+    text = p.read_text(encoding="utf-8", errors="replace")
+    sections = markdown_sections(text) if p.suffix.lower() == ".md" else html_sections(text)
+    return [Doc(sop, kind, f"{p.stem}#{n}", heading or p.stem, href, [("heading", heading), ("body", body)])
+            for n, (heading, body) in enumerate(sections)]
+
+
+def faq_quiz_docs(docs_dir: Path, outputs_dir: Path) -> Tuple[List[Doc], List[str]]:
+    """(documents, sources skipped because nothing is published for them)."""
+    pages: Dict[str, Tuple[Path, str]] = {}  # lower-case stem -> (published page, kind)
+    for kind in ("faq", "quiz"):
+        folder = outputs_dir / kind
+        if folder.is_dir():
+            for p in sorted(folder.glob("*.htm*")):
+                pages.setdefault(p.stem.lower(), (p, kind))
+
+    sources: Dict[str, Path] = {}
+    if docs_dir.is_dir():
+        for p in sorted(docs_dir.iterdir()):
+            if p.suffix.lower() not in (".md", ".html", ".htm"):
+                continue
+            key = p.stem.lower()
+            if key not in sources or p.suffix.lower() == ".md":
+                sources[key] = p
+
+    docs: List[Doc] = []
+    skipped: List[str] = []
+    for key, src in sorted(sources.items()):
+        if key not in pages:
+            skipped.append(src.name)
+            continue
+        page, kind = pages.pop(key)
+        docs.extend(_section_docs(src, kind, f"{kind}/{page.name}"))
+    # Published pages without a source in docs_dir are indexed from their HTML.
+    for page, kind in sorted(pages.values()):
+        docs.extend(_section_docs(page, kind, f"{kind}/{page.name}"))
+    return docs, skipped
+
+
+# -----------------------
+# Index
+# -----------------------
+
+def build_postings(docs: List[Doc]) -> Dict[str, List[List[int]]]:
+    postings: Dict[str, List[List[int]]] = defaultdict(list)
+    for i, d in enumerate(docs):
+        weights: Counter = Counter()
+        for field, text in d.fields:
+            w = FIELD_WEIGHTS[field]
+            for tok in tokenize(text):
+                weights[tok] += w
+        for tok, w in weights.items():
+            postings[tok].append([i, w])
+    return postings
+
+
+def _dump(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=False)
+
+
+def _write_if_changed(p: Path, text: str) -> bool:
+    data = text.encode("utf-8")
+    try:
+        if p.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, p)
+    return True
+
+
+def build_index(outputs_dir: Path, docs_dir: Path, template: Optional[Path] = DEFAULT_TEMPLATE) -> Dict[str, Any]:
+    """
+    (Re)build docs/outputs/search. Returns {"out", "docs", "terms", "shards",
+    "written" (files rewritten), "removed", "skipped" (unpublished sources)}.
+    """
+    out_dir = outputs_dir / SEARCH_DIR_NAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    docs = frame_docs(outputs_dir)
+    extra, skipped = faq_quiz_docs(docs_dir, outputs_dir)
+    docs += extra
+    postings = build_postings(docs)
+
+    by_prefix: Dict[str, Dict[str, List[List[int]]]] = defaultdict(dict)
+    for term in sorted(postings):
+        by_prefix[term[:PREFIX_LEN]][term] = postings[term]
+
+    written = 0
+    shards: Dict[str, str] = {}
+    for prefix in sorted(by_prefix):
+        text = _dump(by_prefix[prefix])
+        name = f"{prefix}.{hashlib.sha256(text.encode('utf-8')).hexdigest()[:HASH_LEN]}.json"
+        shards[prefix] = name
+        if not (out_dir / name).is_file():
+            _write_if_changed(out_dir / name, text)
+            written += 1
+
+    sops = sorted({d.sop for d in docs}, key=str.lower)
+    sop_idx = {s: i for i, s in enumerate(sops)}
+    index = {
+        "version": VERSION,
+        "prefix_len": PREFIX_LEN,
+        "stopwords": sorted(STOPWORDS),
+        "sops": sops,
+        "docs": [[sop_idx[d.sop], d.kind, d.ref, d.title, d.href] for d in docs],
+        "shards": shards,
+    }
+    written += _write_if_changed(out_dir / INDEX_NAME, _dump(index))
+    if template is not None and template.is_file():
+        written += _write_if_changed(out_dir / PAGE_NAME, template.read_text(encoding="utf-8"))
+
+    keep = set(shards.values()) | {INDEX_NAME, PAGE_NAME}
+    removed = 0
+    for e in os.scandir(out_dir):
+        if e.is_file() and e.name not in keep and e.name.endswith(".json"):
+            os.remove(e.path)
+            removed += 1
+
+    return {"out": out_dir, "docs": len(docs), "terms": len(postings), "shards": len(shards),
+            "written": written, "removed": removed, "skipped": skipped}
+
+
+def search(out_dir: Path, query: str, limit: int = 10) -> List[Tuple[float, List[Any]]]:
+    """Python twin of the page's query path (AND of prefix matches, idf-weighted)."""
+    index = json.loads((out_dir / INDEX_NAME).read_text(encoding="utf-8"))
+    n_docs = max(1, len(index["docs"]))
+    scores: Optional[Dict[int, float]] = None
+    for tok in dict.fromkeys(tokenize(query)):
+        name = index["shards"].get(tok[:PREFIX_LEN])
+        shard = json.loads((out_dir / name).read_text(encoding="utf-8")) if name else {}
+        hits: Dict[int, float] = defaultdict(float)
+        for term, plist in shard.items():
+            if term.startswith(tok):
+                idf = math.log(1 + n_docs / len(plist))
+                for doc, w in plist:
+                    hits[doc] += w * idf
+        scores = hits if scores is None else {d: s + hits[d] for d, s in scores.items() if d in hits}
+        if not scores:
+            return []
+    ranked = sorted((scores or {}).items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+    return [(round(s, 3), index["docs"][d]) for d, s in ranked]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build the sharded full-text search index for docs/outputs")
+    ap.add_argument("--outputs", default=str(REPO_ROOT / "docs" / "outputs"),
+                    help="Outputs folder holding story/<SOP>/story.json (default: docs/outputs)")
+    ap.add_argument("--docs", default=str(REPO_ROOT / "inputs" / "Faq_QuizDocs"),
+                    help="FAQ / quiz sources (default: inputs/Faq_QuizDocs)")
+    ap.add_argument("--template", default=str(DEFAULT_TEMPLATE), help="Search page template")
+    ap.add_argument("--query", default=None, help="After building, run this query and print the top hits")
+    args = ap.parse_args()
+
+    outputs_dir = Path(args.outputs)
+    if not outputs_dir.is_dir():
+        print(f"ERROR: missing {outputs_dir}", file=sys.stderr)
+        return 2
+
+    with build_events.stage_event("search_index", "build_search_index", VERSION) as ev:
+        t0 = time.perf_counter()
+        res = build_index(outputs_dir, Path(args.docs), Path(args.template) if args.template else None)
+        print(f"[OK] {res['out']}: {res['docs']} docs, {res['terms']} terms in {res['shards']} shard(s); "
+              f"{res['written']} file(s) written, {res['removed']} removed in {time.perf_counter() - t0:.3f}s")
+        if res["skipped"]:
+            print(f"     not published (skipped): {', '.join(res['skipped'])}")
+        ev.update(out=res["out"], rows=res["docs"], detail=f"{res['terms']} terms, {res['shards']} shards")
+
+    if args.query:
+        for score, (sop, kind, ref, title, href) in search(res["out"], args.query):
+            print(f"{score:8.3f}  {kind:<5} {ref:<24} {title[:50]:<50} {href}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 csv_to_story.py
-Version: v1c_subi_20251213_2315 (America/New_York)
+Version: v1f_20261017 (America/New_York)
 Owner: Subi
 
 What changed vs v1b:
@@ -9,12 +9,77 @@ What changed vs v1b:
   We now emit "../images/..." when the CSV provides "outputs/images/..." or "/outputs/images/...".
 - Normalize FAQ_Loc / Quiz_Loc so "outputs/faq" becomes "faq" (player will resolve to ../faq/...).
 - Added --version flag output (kept compatible with your CLI).
+
+What changed vs v1c:
+- Row -> frame logic moved into frame_from_row() so it can be reused.
+- --stream: frames are written as each CSV row is read; start_code is resolved
+  at the end and the header is written in front of the spooled frames.
+  Memory stays flat for any deck size; bytes are identical to the default mode.
+
+What changed vs v1d:
+- --output-profile compact: minified story.json plus story.json.gz (stdlib) and
+  story.json.br (only if the optional `brotli` package is installed). The run
+  reports raw (indent=2), minified and compressed byte counts. "pretty" stays
+  the default for human review.
+
+What changed vs v1e:
+- --image-variants <images>/opt/variants.json (from optimize_images.py) adds
+  "image_opt" (optimized PNG) and "image_srcset" (WebP widths) to each frame
+  whose slide was optimized. Without the flag frames are unchanged.
+
+What changed vs v1f:
+- --enh-upd <ENH_UPD csv/xlsx> (instead of --csv) fuses enh_upd_to_ready
+  into this run: rows go through enh_upd_to_ready.iter_ready_rows() and
+  straight into frame_from_row(), so the READY CSV is never written and
+  re-parsed on the way to story.json. --ready-out still writes it as an
+  audit copy (same bytes as enh_upd_to_ready.py). The story is identical to
+  the two-step build.
+
+What changed vs v1g:
+- --intern writes the interned layout (story_format.py): repeated strings
+  (boilerplate narration, labels, FAQ/quiz names, frame codes in choices)
+  stored once in a "strings" table and referenced by index, plus one shared
+  "meta". Every reader expands it back to the plain layout. Needs the whole
+  story in memory, so --stream is ignored with --intern.
+- --audio-manifest docs/outputs/audio/<SOP>.audio.json (from synth_audio.py)
+  adds "narr1_audio" / "narr3_audio" URLs after "narr3" for each frame whose
+  narration has a pre-synthesized file. Without the flag frames are unchanged.
+
+What changed vs v1h:
+- Frame text (title, decision_question, narr1-3, UAP/FAQ/Quiz labels, choice
+  labels) goes through text_normalize.fix_frame(): cp1252/latin-1 mojibake
+  repaired, "_x000B_" / vertical tabs turned into "\n" (narration) or " "
+  (the rest), NFC. --text-fix ascii also folds smart punctuation; --text-fix
+  off keeps the old behaviour (only "_x000B_" in titles). The per-frame
+  fixes go to the log, a one-line summary to stdout. With --enh-upd the
+  READY rows are cleaned by enh_upd_to_ready and reported the same way.
+
+What changed vs v1i:
+- --image-store docs/outputs/store puts each slide image (and its image_opt /
+  image_srcset files) in the content-addressed store (image_store.py) and
+  points the frame at it: "../images/PMA/S001.png" -> "../store/<hash>.png".
+  A slide shared by several SOPs is one URL. --image-store-perceptual also
+  reuses an object that looks the same (re-exported, unchanged slides).
+  Without the flag frames are unchanged.
 """
 
-import argparse, csv, json, os
+import argparse, csv, json, os, shutil
 from datetime import datetime, timezone
+from pathlib import Path
+
+import build_events
+import enh_upd_to_ready
+import image_store
+import precompress
+import sop_profile
+import story_format
+import synth_audio
+import text_normalize
 
-VERSION = "v1c_subi_20251213_2315"  # America/New_York label
+VERSION = "v1j_20261017"  # America/New_York label
+
+OUTPUT_PROFILES = ("pretty", "compact")
+COMPACT_SEPARATORS = (",", ":")
 
 def truthy(v):
     return str(v).strip().lower() in {"1", "y", "yes", "true", "start", "start_here"}
@@ -66,115 +131,375 @@ def normalize_image_path(image_full: str) -> str:
     # Already relative (../images/...) or something else; keep as-is
     return p
 
-def build_story(csv_path, sop_id):
+def load_image_variants(path):
+    """Read an optimize_images.py manifest (variants.json); None if no path."""
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _with_image_variants(frame, variants):
+    """
+    Add image_opt / image_srcset right after "image" when the manifest knows
+    this slide. Paths stay relative to the same folder as "image".
+    """
+    image = frame["image"]
+    leaf = image.rsplit("/", 1)[-1]
+    ent = (variants.get("images") or {}).get(leaf)
+    if not image or not ent:
+        return frame
+    base = image[:len(image) - len(leaf)]
+    out = {}
+    for k, v in frame.items():
+        out[k] = v
+        if k == "image":
+            out["image_opt"] = base + ent["png"]
+            out["image_srcset"] = ", ".join(f"{base}{w['src']} {w['w']}w" for w in ent["webp"])
+    return out
+
+def _with_audio(frame, audio):
+    """Add narr1_audio / narr3_audio right after "narr3" for narration that has a file."""
+    urls = {f"{f}_audio": synth_audio.audio_url(frame.get(f), audio) for f in synth_audio.FIELDS}
+    urls = {k: v for k, v in urls.items() if v}
+    if not urls:
+        return frame
+    out = {}
+    for k, v in frame.items():
+        out[k] = v
+        if k == "narr3":
+            out.update(urls)
+    return out
+
+def frame_from_row(row, sop_id, variants=None, audio=None, text_fix=text_normalize.DEFAULT_TEXT_FIX, fixes=None,
+                   store=None):
+    """
+    Turn one READY CSV row (dict) into a story frame dict.
+    `variants` is an optional optimize_images.py manifest, `audio` an optional
+    synth_audio.py manifest (synth_audio.load_manifest).
+    `text_fix` is a text_normalize mode; `fixes` an optional FixReport.
+    `store` is an optional image_store.ImageStore for the image references.
+    """
+    code = (row.get("Code") or "").strip()
+    if not code:
+        code = (row.get("SlideIndex") or "START").strip()
+
+    title = (row.get("Title") or code).strip()
+    if text_fix == "off":
+        title = title.replace("_x000B_", " ").strip()
+
+    with sop_profile.span("normalize"):
+        sop_path = _norm_slashes(row.get("SOP_path") or "").strip().strip("/")
+        img_leaf = _norm_slashes(row.get("Image_sub_url") or "").strip().lstrip("/")
+
+        image_full = ""
+        if img_leaf:
+            # If already looks like SOP/... keep absolute web style.
+            if img_leaf.startswith("SOP/") or img_leaf.startswith("/SOP/"):
+                image_full = "/" + img_leaf.lstrip("/")
+            elif sop_path:
+                image_full = "/" + sop_path + "/" + img_leaf
+            else:
+                image_full = "/" + img_leaf
+
+            while "//" in image_full:
+                image_full = image_full.replace("//", "/")
+
+        image_full = normalize_image_path(image_full)
+
+    q = (row.get("Deci_Question") or "").strip()
+    choices = []
+    for kcode, klabel in [("Next1_Code","Desc_Next1"), ("Next2_Code","Desc_Next2")]:
+        nxt = (row.get(kcode) or "").strip()
+        lbl = (row.get(klabel) or "").strip()
+        if nxt:
+            choices.append({"to": nxt, "label": lbl or nxt})
+
+    frame = {
+        "sop_id": sop_id,
+        "frame_code": code,
+        "title": title,
+        "image": image_full,
+        "decision_question": q,
+        "choices": choices,
+        "narr1": (row.get("Narr1") or "").strip(),
+        "narr2": (row.get("Narr2") or "").strip(),
+        "narr3": (row.get("Narr3") or "").strip(),
+        "uap_url": (row.get("UAP_URL") or "").strip(),
+        "uap_label": (row.get("UAP_Label") or "").strip(),
+
+        # Normalize these so player won’t create /outputs/outputs/...
+        "FAQ_Loc": normalize_asset_loc(row.get("FAQ_Loc") or ""),
+        "FAQ_File": (row.get("FAQ_File") or "").strip(),
+        "FAQ_Label": (row.get("FAQ_Label") or "").strip(),
+        "Quiz_Loc": normalize_asset_loc(row.get("Quiz_Loc") or ""),
+        "Quiz_File": (row.get("Quiz_File") or "").strip(),
+        "Quiz_Label": (row.get("Quiz_Label") or "").strip(),
+
+        "meta": {
+            "entity": (row.get("Entity") or "Palco").strip(),
+            "function": (row.get("Function") or "Service").strip(),
+            "subentity": (row.get("SubEntity") or "").strip()
+        }
+    }
+
+    if text_fix != "off":
+        with sop_profile.span("text_fix"):
+            text_normalize.fix_frame(frame, text_fix, fixes)
+    if variants:
+        frame = _with_image_variants(frame, variants)
+    if audio:
+        frame = _with_audio(frame, audio)
+    if store is not None:
+        with sop_profile.span("image_store"):
+            store.frame(frame)
+    return frame
+
+def iter_rows(csv_path):
+    """Yield READY CSV rows one at a time (never holds the whole file)."""
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        rows = csv.DictReader(f)
+        if sop_profile.active() is None:
+            yield from rows
+            return
+        # --profile: time each row fetch as a "read" span
+        while True:
+            with sop_profile.span("read"):
+                row = next(rows, None)
+            if row is None:
+                return
+            yield row
+
+def build_story(csv_path, sop_id, variants=None, rows=None, audio=None,
+                text_fix=text_normalize.DEFAULT_TEXT_FIX, fixes=None, store=None):
+    """`rows` overrides reading csv_path (e.g. enh_upd_to_ready.iter_ready_rows)."""
     frames = []
     start_code = None
 
-    with open(csv_path, newline='', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-
-        for i, row in enumerate(reader):
-            code = (row.get("Code") or "").strip()
-            if not code:
-                code = (row.get("SlideIndex") or "START").strip()
-
-            title = (row.get("Title") or code).strip()
-            title = title.replace("_x000B_", " ").strip()
-
-            sop_path = _norm_slashes(row.get("SOP_path") or "").strip().strip("/")
-            img_leaf = _norm_slashes(row.get("Image_sub_url") or "").strip().lstrip("/")
-
-            image_full = ""
-            if img_leaf:
-                # If already looks like SOP/... keep absolute web style.
-                if img_leaf.startswith("SOP/") or img_leaf.startswith("/SOP/"):
-                    image_full = "/" + img_leaf.lstrip("/")
-                elif sop_path:
-                    image_full = "/" + sop_path + "/" + img_leaf
-                else:
-                    image_full = "/" + img_leaf
-
-                while "//" in image_full:
-                    image_full = image_full.replace("//", "/")
-
-            image_full = normalize_image_path(image_full)
-
-            q = (row.get("Deci_Question") or "").strip()
-            choices = []
-            for kcode, klabel in [("Next1_Code","Desc_Next1"), ("Next2_Code","Desc_Next2")]:
-                nxt = (row.get(kcode) or "").strip()
-                lbl = (row.get(klabel) or "").strip()
-                if nxt:
-                    choices.append({"to": nxt, "label": lbl or nxt})
-
-            frame = {
-                "sop_id": sop_id,
-                "frame_code": code,
-                "title": title,
-                "image": image_full,
-                "decision_question": q,
-                "choices": choices,
-                "narr1": (row.get("Narr1") or "").strip(),
-                "narr2": (row.get("Narr2") or "").strip(),
-                "narr3": (row.get("Narr3") or "").strip(),
-                "uap_url": (row.get("UAP_URL") or "").strip(),
-                "uap_label": (row.get("UAP_Label") or "").strip(),
-
-                # Normalize these so player won’t create /outputs/outputs/...
-                "FAQ_Loc": normalize_asset_loc(row.get("FAQ_Loc") or ""),
-                "FAQ_File": (row.get("FAQ_File") or "").strip(),
-                "FAQ_Label": (row.get("FAQ_Label") or "").strip(),
-                "Quiz_Loc": normalize_asset_loc(row.get("Quiz_Loc") or ""),
-                "Quiz_File": (row.get("Quiz_File") or "").strip(),
-                "Quiz_Label": (row.get("Quiz_Label") or "").strip(),
-
-                "meta": {
-                    "entity": (row.get("Entity") or "Palco").strip(),
-                    "function": (row.get("Function") or "Service").strip(),
-                    "subentity": (row.get("SubEntity") or "").strip()
-                }
-            }
-
-            frames.append(frame)
-
-            if start_code is None and truthy(row.get("Start_Here","")):
-                start_code = code
+    for row in (iter_rows(csv_path) if rows is None else rows):
+        with sop_profile.span("build_frames"):
+            frame = frame_from_row(row, sop_id, variants, audio, text_fix, fixes, store)
+        frames.append(frame)
+
+        if start_code is None and truthy(row.get("Start_Here","")):
+            start_code = frame["frame_code"]
 
     if start_code is None and frames:
         start_code = frames[0]["frame_code"]
 
     return {"sop_id": sop_id, "start_code": start_code, "frames": frames}
 
+def _dump_frame(frame):
+    """One frame exactly as json.dump(story, indent=2) lays it out inside "frames"."""
+    body = json.dumps(frame, ensure_ascii=False, indent=2)
+    return "\n".join("    " + line for line in body.split("\n"))
+
+def _pretty_header(sop_id, start_code):
+    return ("{\n"
+            f'  "sop_id": {json.dumps(sop_id, ensure_ascii=False)},\n'
+            f'  "start_code": {json.dumps(start_code, ensure_ascii=False)},\n')
+
+def stream_story(rows, sop_id, out, compact=False, variants=None, audio=None,
+                 text_fix=text_normalize.DEFAULT_TEXT_FIX, fixes=None, store=None):
+    """
+    Streaming writer: frames go to a side file as each row is read, then the
+    header (with the resolved start_code) is written and the frames are copied
+    after it. Peak memory is one frame, and the bytes match json.dump(indent=2)
+    (or the compact separators when compact=True).
+    Returns {"frames": n, "start_code": ..., "pretty_bytes": size of the indent=2 form}.
+    """
+    start_code = None
+    first_code = None
+    n = 0
+    pretty_frames_bytes = 0
+    tmp = out + ".frames.tmp"
+
+    try:
+        with open(tmp, "w", encoding="utf-8") as tf:
+            for row in rows:
+                with sop_profile.span("build_frames"):
+                    frame = frame_from_row(row, sop_id, variants, audio, text_fix, fixes, store)
+                with sop_profile.span("serialize"):
+                    pretty = _dump_frame(frame)
+                    pretty_frames_bytes += len(pretty.encode("utf-8")) + (2 if n else 0)
+                    if compact:
+                        chunk = ("," if n else "") + json.dumps(frame, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+                    else:
+                        chunk = (",\n" if n else "") + pretty
+                with sop_profile.span("write"):
+                    tf.write(chunk)
+                n += 1
+                if first_code is None:
+                    first_code = frame["frame_code"]
+                if start_code is None and truthy(row.get("Start_Here","")):
+                    start_code = frame["frame_code"]
+
+        if start_code is None:
+            start_code = first_code
+
+        with sop_profile.span("write"), open(out, "w", encoding="utf-8") as f:
+            if compact:
+                f.write(json.dumps({"sop_id": sop_id, "start_code": start_code},
+                                   ensure_ascii=False, separators=COMPACT_SEPARATORS)[:-1])
+                f.write(',"frames":[')
+                with open(tmp, "r", encoding="utf-8") as tf:
+                    shutil.copyfileobj(tf, f)
+                f.write("]}")
+            elif n == 0:
+                f.write(_pretty_header(sop_id, start_code) + '  "frames": []\n}')
+            else:
+                f.write(_pretty_header(sop_id, start_code) + '  "frames": [\n')
+                with open(tmp, "r", encoding="utf-8") as tf:
+                    shutil.copyfileobj(tf, f)
+                f.write("\n  ]\n}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    header = _pretty_header(sop_id, start_code)
+    tail = '  "frames": []\n}' if n == 0 else '  "frames": [\n' + "\n  ]\n}"
+    pretty_bytes = len((header + tail).encode("utf-8")) + pretty_frames_bytes
+    return {"frames": n, "start_code": start_code, "pretty_bytes": pretty_bytes}
+
+def write_story(csv_path, sop_id, out, log=None, stream=False, output_profile="pretty",
+                image_variants=None, fused=False, ready_out=None, sheet=None, intern=False,
+                audio_manifest=None, text_fix=text_normalize.DEFAULT_TEXT_FIX, image_store_dir=None,
+                image_store_perceptual=False):
+    """
+    Build the story from a READY CSV and write it to `out` (plus optional log).
+    stream=True uses stream_story() (flat memory, identical bytes).
+    output_profile="compact" writes minified JSON plus .gz/.br siblings and
+    reports pretty/minified/compressed byte counts.
+    image_variants: optional path to an optimize_images.py variants.json.
+    fused=True: csv_path is an ENH_UPD CSV/xlsx (`sheet` picks the worksheet);
+    its READY rows are built in memory, and also written to `ready_out` if given.
+    intern=True writes the story_format interned layout (stream is ignored).
+    audio_manifest: optional path to a synth_audio.py <SOP>.audio.json.
+    text_fix: text_normalize mode ("repair", "ascii", "off"); the per-frame
+    fixes are written to the log.
+    image_store_dir: optional store folder (docs/outputs/store); image references
+    are rewritten into it, relative to the players folder next to it.
+    image_store_perceptual: the store also merges visually identical images.
+    Returns a summary dict {sop_id, start_code, frames, out, sizes,
+    text_fixes (fields fixed)}; used by main() and by in-process callers.
+    """
+    if output_profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile: {output_profile}")
+    compact = output_profile == "compact"
+    variants = load_image_variants(image_variants)
+    audio = synth_audio.load_manifest(audio_manifest)
+    fixes = text_normalize.FixReport()
+    store = (image_store.ImageStore(Path(image_store_dir), perceptual=image_store_perceptual)
+             if image_store_dir else None)
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    if fused:
+        rows = enh_upd_to_ready.iter_ready_rows(Path(csv_path), sheet, Path(ready_out) if ready_out else None,
+                                                text_fix, fixes)
+    else:
+        rows = iter_rows(csv_path)
+    if stream and not intern:
+        info = stream_story(rows, sop_id, out, compact=compact, variants=variants, audio=audio,
+                            text_fix=text_fix, fixes=fixes, store=store)
+        n_frames, start_code, pretty_bytes = info["frames"], info["start_code"], info["pretty_bytes"]
+    else:
+        story = build_story(csv_path, sop_id, variants, rows, audio, text_fix, fixes, store)
+        if intern:
+            with sop_profile.span("intern"):
+                story = story_format.intern_story(story)
+        with sop_profile.span("serialize"):
+            pretty = json.dumps(story, ensure_ascii=False, indent=2)
+            pretty_bytes = len(pretty.encode("utf-8"))
+            text = json.dumps(story, ensure_ascii=False, separators=COMPACT_SEPARATORS) if compact else pretty
+        with sop_profile.span("write"), open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+        n_frames, start_code = len(story.get("frames", [])), story.get("start_code")
+
+    sizes = {"raw": pretty_bytes}
+    if compact:
+        with sop_profile.span("precompress"):
+            packed = precompress.write_precompressed(out)
+        sizes["min"] = packed["raw"]
+        sizes["gz"] = packed["gz"]
+        sizes["br"] = packed["br"]
+
+    sop_profile.count(frames=n_frames, output_bytes=os.path.getsize(out), pretty_bytes=pretty_bytes)
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %z")
+    msg = f"[{ts}] {VERSION} Wrote {out} with {n_frames} frames. Start={start_code}"
+    if intern:
+        msg += f" Interned: {len(story.get('strings') or [])} strings."
+    if fused:
+        msg += f" (fused from {csv_path}" + (f", READY -> {ready_out})" if ready_out else ")")
+    if compact:
+        msg += f" Sizes: {precompress.format_sizes(sizes)}"
+    if text_fix != "off":
+        msg += f" Text fixes: {fixes.summary()}."
+    if store is not None:
+        store.save()
+        msg += f" Image store: {store.summary()}."
+    print(msg)
+
+    if log:
+        os.makedirs(os.path.dirname(log), exist_ok=True)
+        with open(log, "w", encoding="utf-8") as lf:
+            lf.write(msg + "\n")
+            for line in fixes.lines():
+                lf.write(f"  {line}\n")
+
+    return {"sop_id": sop_id, "start_code": start_code, "frames": n_frames, "out": out, "sizes": sizes,
+            "text_fixes": sum(len(f) for f in fixes.frames.values())}
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--version", action="store_true", help="Print version and exit")
-    ap.add_argument("--csv", required=False)
+    ap.add_argument("--csv", required=False, help="READY CSV")
+    ap.add_argument("--enh-upd", default=None,
+                    help="ENH_UPD CSV/xlsx instead of --csv: convert and build in one pass")
+    ap.add_argument("--ready-out", default=None, help="With --enh-upd: also write the READY CSV here (audit copy)")
+    ap.add_argument("--sheet", default=None, help="With an .xlsx --enh-upd: worksheet name")
     ap.add_argument("--sop-id", required=False)
     ap.add_argument("--out", required=False)
     ap.add_argument("--log", default=None)
+    ap.add_argument("--stream", action="store_true",
+                    help="Write frames as rows are read (bounded memory, same output bytes)")
+    ap.add_argument("--output-profile", choices=OUTPUT_PROFILES, default="pretty",
+                    help="pretty = indent=2 for review (default); compact = minified + .gz/.br siblings")
+    ap.add_argument("--image-variants", default=None,
+                    help="optimize_images.py variants.json; adds image_opt/image_srcset to frames")
+    ap.add_argument("--audio-manifest", default=None,
+                    help="synth_audio.py <SOP>.audio.json; adds narr1_audio/narr3_audio URLs to frames")
+    ap.add_argument("--intern", action="store_true",
+                    help="Interned layout: repeated strings in a shared table, one shared meta (story_format.py)")
+    ap.add_argument("--text-fix", choices=text_normalize.TEXT_FIX_MODES, default=text_normalize.DEFAULT_TEXT_FIX,
+                    help="Frame text clean-up (text_normalize.py): repair (default), ascii, off")
+    ap.add_argument("--image-store", default=None,
+                    help="Content-addressed image store (e.g. docs/outputs/store); frames reference it")
+    ap.add_argument("--image-store-perceptual", action="store_true",
+                    help="With --image-store: reuse visually identical images too (needs Pillow)")
+    sop_profile.add_arguments(ap)
     args = ap.parse_args()
 
     if args.version:
         print(f"csv_to_story.py {VERSION}")
         return
 
-    if not (args.csv and args.sop_id and args.out):
-        ap.error("--csv, --sop-id, and --out are required (unless --version).")
-
-    story = build_story(args.csv, args.sop_id)
-
-    os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(story, f, ensure_ascii=False, indent=2)
-
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %z")
-    msg = f"[{ts}] {VERSION} Wrote {args.out} with {len(story.get('frames', []))} frames. Start={story.get('start_code')}"
-    print(msg)
-
-    if args.log:
-        os.makedirs(os.path.dirname(args.log), exist_ok=True)
-        with open(args.log, "w", encoding="utf-8") as lf:
-            lf.write(msg + "\n")
+    if not ((args.csv or args.enh_upd) and args.sop_id and args.out):
+        ap.error("--csv (or --enh-upd), --sop-id, and --out are required (unless --version).")
+    if args.csv and args.enh_upd:
+        ap.error("use either --csv or --enh-upd, not both.")
+    if args.ready_out and not args.enh_upd:
+        ap.error("--ready-out needs --enh-upd.")
+    if args.image_store_perceptual and not args.image_store:
+        ap.error("--image-store-perceptual needs --image-store.")
+
+    with sop_profile.session("csv_to_story", VERSION, args, args.log), \
+            build_events.stage_event("story", "csv_to_story", VERSION, args.sop_id) as ev:
+        info = write_story(args.enh_upd or args.csv, args.sop_id, args.out, args.log, stream=args.stream,
+                           output_profile=args.output_profile, image_variants=args.image_variants,
+                           fused=bool(args.enh_upd), ready_out=args.ready_out, sheet=args.sheet,
+                           intern=args.intern, audio_manifest=args.audio_manifest, text_fix=args.text_fix,
+                           image_store_dir=args.image_store, image_store_perceptual=args.image_store_perceptual)
+        ev.update(frames=info["frames"], out=args.out,
+                  output_bytes=build_events.file_bytes(args.out, *precompress.sibling_paths(args.out).values()))
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 """
-enh_upd_to_ready.py  (v2 – with Narr1/Narr2/Narr3 build)
+enh_upd_to_ready.py  (v3 – with Narr1/Narr2/Narr3 build, direct .xlsx input)
 
 Purpose
 -------
 Convert an ENH_UPD narration CSV into a "READY" CSV for csv_to_story.py.
 
+- Reads .xlsx / .xlsm workbooks directly (openpyxl, read-only streaming,
+  cached formula values; --sheet picks the worksheet, default the active
+  one), so the manual CSV export step is optional. Numbers that are whole
+  (SlideIndex 3.0) are written as "3", like Excel's CSV export.
+- Processes the table column-wise (one list per column) instead of copying
+  a dict per row.
+- iter_ready_rows() yields the same READY rows one at a time, for
+  csv_to_story.py --enh-upd (ENH_UPD -> story.json in one pass, the READY
+  CSV optional).
+
 - Normalizes column names (e.g., " FAQ_File" -> "FAQ_File").
 - Ensures key columns exist:
     Start_Here, Entity, Function, SubEntity, Exclude,
@@ -19,23 +29,46 @@ Convert an ENH_UPD narration CSV into a "READY" CSV for csv_to_story.py.
   (only if Narr1 is currently blank; does not overwrite manual Narr1)
 - Copies Narr2_seed -> Narr2 and Narr3_seed -> Narr3 if those final
   columns are blank.
+- Cleans every cell with text_normalize.fix_text() (after Narr1-3 are
+  filled): mojibake repaired, "_x000B_" / vertical tabs turned into line
+  breaks (Narr columns) or spaces (the rest), NFC. --text-fix ascii also
+  folds smart punctuation, --text-fix off writes the cells as read. The
+  per-row fixes are printed.
 
 Usage
 -----
 python src/enh_upd_to_ready.py \
   --csv inputs/raw/LineEnt2_Raw_120925_1558_READYBASE_ENH_UPD.csv \
   --out outputs/build_in/LineEnt2_mk_tw_in_READY_251210_1015.csv
+
+python src/enh_upd_to_ready.py --csv inputs/raw/LineEnt2_ENH_UPD.xlsx --sheet ENH_UPD \
+  --out outputs/build_in/LineEnt2_mk_tw_in_READY.csv
 """
 
 import argparse
 import csv
+import os
+from datetime import date, datetime, time
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import build_events
+import sop_profile
+import text_normalize
+
+VERSION = "v3.1"
+
+XLSX_SUFFIXES = (".xlsx", ".xlsm")
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Convert ENH_UPD CSV -> READY CSV for csv_to_story.py")
-    p.add_argument("--csv", required=True, help="Input ENH_UPD CSV path")
+    p.add_argument("--csv", required=True, help="Input ENH_UPD CSV path (or .xlsx workbook)")
+    p.add_argument("--sheet", default=None, help="Worksheet name for .xlsx input (default: the active sheet)")
     p.add_argument("--out", required=True, help="Output READY CSV path")
+    p.add_argument("--text-fix", choices=text_normalize.TEXT_FIX_MODES, default=text_normalize.DEFAULT_TEXT_FIX,
+                   help="Cell clean-up: repair (default), ascii (repair + plain punctuation), off")
+    sop_profile.add_arguments(p)
     return p.parse_args()
 
 
@@ -89,127 +122,316 @@ def build_narr1(code: str, title_short: str, seed: str) -> str:
         return main
 
 
-def main() -> None:
-    args = parse_args()
-    in_path = Path(args.csv)
-    out_path = Path(args.out)
+# Columns we want to guarantee exist
+REQUIRED_EXTRA_COLS = [
+    "Start_Here",
+    "Entity",
+    "Function",
+    "SubEntity",
+    "Exclude",
+    "FAQ_Loc",
+    "FAQ_File",
+    "FAQ_Label",
+    "Quiz_Loc",
+    "Quiz_File",
+    "Quiz_Label",
+    "Narr1",
+    "Narr2",
+    "Narr3",
+]
+
+# Preferred column ordering (any extra columns get appended)
+CORE_ORDER = [
+    "Source_PPT", "SlideIndex", "SelectionTitle", "Title", "Code", "Title_short",
+    "Image_sub_url",
+    "Deci_Question", "Next1_Code", "Next2_Code",
+    "Desc_Next1", "Desc_Next2", "Desi_Ques",
+    "Narr1_seed", "Narr2_seed", "Narr3_seed",
+    "Narr1", "Narr2", "Narr3",
+    "UAP_Label", "UAP_URL",
+    "Start_Here",
+    "Entity", "Function", "SubEntity",
+    "Exclude",
+    "FAQ_Loc", "FAQ_File", "FAQ_Label",
+    "Quiz_Loc", "Quiz_File", "Quiz_Label",
+]
+
+
+def normalize_header(name: str) -> str:
+    """Strip & collapse spaces (" FAQ_File" -> "FAQ_File")."""
+    return " ".join((name or "").strip().split())
+
+
+def _iter_csv(in_path: Path) -> Iterator[List[str]]:
+    """Header row, then data rows as lists (blank lines skipped, like csv.DictReader)."""
+    with in_path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield header
+        for r in reader:
+            if r:
+                yield r
+
+
+def _cell_text(v: Any) -> str:
+    """Excel cell value -> the text a CSV export would have held."""
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    if isinstance(v, (datetime, date, time)):
+        return v.isoformat()
+    return str(v)
 
+
+def _iter_xlsx(in_path: Path, sheet: Optional[str] = None) -> Iterator[List[str]]:
+    """
+    Stream one worksheet with openpyxl in read-only mode (rows are never all
+    materialized as cell objects). Fully empty rows and the unnamed columns
+    past the last header cell are dropped.
+    """
+    try:
+        from openpyxl import load_workbook  # requirements.txt; only needed for .xlsx
+    except ImportError:
+        raise SystemExit("Reading .xlsx needs openpyxl (pip install -r requirements.txt), or export to CSV")
+
+    wb = load_workbook(str(in_path), read_only=True, data_only=True)
+    try:
+        if sheet and sheet not in wb.sheetnames:
+            raise SystemExit(f"Sheet {sheet!r} not found in {in_path} (have: {', '.join(wb.sheetnames)})")
+        ws = wb[sheet] if sheet else wb.active
+        it = ws.iter_rows(values_only=True)
+        first = next(it, None)
+        if first is None:
+            return
+        header = [_cell_text(v) for v in first]
+        while header and not header[-1].strip():
+            header.pop()
+        # Excel keeps the BOM-free header, but a pasted one may still carry it.
+        if header:
+            header[0] = header[0].lstrip("\ufeff")
+        yield header
+        width = len(header)
+        for values in it:
+            row = [_cell_text(v) for v in values[:width]]
+            if any(row):
+                yield row
+    finally:
+        wb.close()
+
+
+def iter_table(in_path: Path, sheet: Optional[str] = None) -> Iterator[List[str]]:
+    """Header row first, then data rows, from a CSV or an .xlsx worksheet."""
+    if in_path.suffix.lower() in XLSX_SUFFIXES:
+        return _iter_xlsx(in_path, sheet)
+    return _iter_csv(in_path)
+
+
+def read_table(in_path: Path, sheet: Optional[str] = None) -> Tuple[List[str], List[List[str]]]:
+    it = iter_table(in_path, sheet)
+    header = next(it, None) or []
+    return header, list(it)
+
+
+def ready_layout(header: List[str]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    (normalized name -> source column index, READY column order).
+    When two headers normalize to the same name the later column wins but
+    the first position is kept, as the old per-row dict copy did.
+    """
+    src: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        src[normalize_header(name)] = i
+    fieldnames = list(src) + [c for c in REQUIRED_EXTRA_COLS if c not in src]
+    extras = [c for c in fieldnames if c not in CORE_ORDER]
+    return src, [c for c in CORE_ORDER if c in fieldnames] + extras
+
+
+def _row_key(code: str, slide_index: str, n: int) -> str:
+    """Name of a row in text-fix reports: its Code, else SlideIndex, else the data row number."""
+    return code or slide_index or f"row {n}"
+
+
+def ready_row(values: List[str], src: Dict[str, int], text_fix: str = text_normalize.DEFAULT_TEXT_FIX,
+              fixes: Optional[text_normalize.FixReport] = None, n: int = 0) -> Dict[str, str]:
+    """
+    One ENH_UPD row -> its READY row dict. The row-at-a-time twin of the
+    column passes in convert(); iter_ready_rows() uses it. `n` (the data row
+    number) only names the row in `fixes` when it has no Code / SlideIndex.
+    """
+    row = {name: (values[i].strip() if i < len(values) else "") for name, i in src.items()}
+    for col in REQUIRED_EXTRA_COLS:
+        row.setdefault(col, "")
+    if not row["Start_Here"]:
+        row["Start_Here"] = "No"
+    if not row["Narr1"]:
+        row["Narr1"] = build_narr1(row.get("Code", ""), row.get("Title_short", ""), row.get("Narr1_seed", ""))
+    if not row["Narr2"]:
+        row["Narr2"] = row.get("Narr2_seed", "")
+    if not row["Narr3"]:
+        row["Narr3"] = row.get("Narr3_seed", "")
+    if text_fix != "off":
+        key = _row_key(row.get("Code", ""), row.get("SlideIndex", ""), n)
+        text_normalize.fix_fields(row, list(row), key, text_fix, fixes)
+    return row
+
+
+def iter_ready_rows(in_path: Path, sheet: Optional[str] = None,
+                    ready_out: Optional[Path] = None, text_fix: str = text_normalize.DEFAULT_TEXT_FIX,
+                    fixes: Optional[text_normalize.FixReport] = None) -> Iterator[Dict[str, str]]:
+    """
+    Stream READY row dicts straight from an ENH_UPD CSV / workbook, one row in
+    memory at a time (csv_to_story.py --enh-upd). With `ready_out` the same
+    rows are also written as the READY CSV, byte-identical to convert(); the
+    file only replaces an existing one once every row has been read.
+    Text fixes are recorded in `fixes` when given.
+    """
+    if not in_path.exists():
+        raise SystemExit(f"Input CSV not found: {in_path}")
+
+    it = iter_table(in_path, sheet)
+    src, final_fields = ready_layout(next(it, None) or [])
+
+    f = None
+    writer = None
+    tmp = None
+    if ready_out is not None:
+        ready_out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ready_out.with_name(ready_out.name + ".tmp")
+        f = tmp.open("w", encoding="utf-8", newline="")
+        writer = csv.writer(f)
+        writer.writerow(final_fields)
+
+    n = 0
+    done = False
+    try:
+        for values in it:
+            row = ready_row(values, src, text_fix, fixes, n + 1)
+            if writer is not None:
+                writer.writerow([row[c] for c in final_fields])
+            n += 1
+            yield row
+        if not n:
+            raise SystemExit(f"Input CSV appears empty: {in_path}")
+        done = True
+    finally:
+        if f is not None:
+            f.close()
+            if done:
+                os.replace(tmp, ready_out)
+            else:
+                tmp.unlink()
+
+
+def convert(in_path: Path, out_path: Path, sheet: Optional[str] = None,
+            text_fix: str = text_normalize.DEFAULT_TEXT_FIX,
+            fixes: Optional[text_normalize.FixReport] = None) -> int:
+    """
+    Convert one ENH_UPD CSV (or .xlsx workbook) into a READY CSV.
+
+    Returns the number of data rows written. Raises SystemExit on a missing or
+    empty input so the CLI behaviour is unchanged when called in-process.
+
+    Works column-wise: the header is normalized once, each output column is
+    one list, and Start_Here / Narr1-3 are filled with one pass per column.
+    Same output as the old per-row dict version: when two headers normalize
+    to the same name the later column wins, short rows read as blanks, and
+    cells past the header are dropped. Every cell then goes through
+    text_normalize.fix_text() (unless text_fix="off"); `fixes` collects what
+    changed.
+    """
     if not in_path.exists():
         raise SystemExit(f"Input CSV not found: {in_path}")
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Read input CSV
-    with in_path.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    with sop_profile.span("read"):
+        header, rows = read_table(in_path, sheet)
 
     if not rows:
         raise SystemExit(f"Input CSV appears empty: {in_path}")
 
-    # Normalize column names: strip & collapse spaces
-    orig_fieldnames = reader.fieldnames or []
-    norm_map = {}
-    for name in orig_fieldnames:
-        if name is None:
-            continue
-        clean = name.strip()
-        clean = " ".join(clean.split())
-        norm_map[name] = clean
-
-    norm_rows = []
-    for row in rows:
-        new_row = {}
-        for old_name, value in row.items():
-            if old_name is None:
-                continue
-            new_name = norm_map.get(old_name, old_name)
-            new_row[new_name] = value
-        norm_rows.append(new_row)
-
-    fieldnames = list(norm_rows[0].keys())
-
-    # Columns we want to guarantee exist
-    required_extra_cols = [
-        "Start_Here",
-        "Entity",
-        "Function",
-        "SubEntity",
-        "Exclude",
-        "FAQ_Loc",
-        "FAQ_File",
-        "FAQ_Label",
-        "Quiz_Loc",
-        "Quiz_File",
-        "Quiz_Label",
-        "Narr1",
-        "Narr2",
-        "Narr3",
-    ]
-
-    for col in required_extra_cols:
-        if col not in fieldnames:
-            fieldnames.append(col)
-            for row in norm_rows:
-                row[col] = ""
-
-    # Row-level cleanup and narration generation
-    for row in norm_rows:
-        # Trim whitespace for all fields
-        for k, v in list(row.items()):
-            if isinstance(v, str):
-                row[k] = v.strip()
+    with sop_profile.span("normalize"):
+        src, final_fields = ready_layout(header)
 
-        # Default Start_Here to "No" if blank
-        if not row.get("Start_Here"):
-            row["Start_Here"] = "No"
+        # Trim whitespace for all fields, one column at a time
+        cols: Dict[str, List[str]] = {}
+        for name, i in src.items():
+            cols[name] = [r[i].strip() if i < len(r) else "" for r in rows]
+        n = len(rows)
+        del rows
 
-        # Ensure FAQ/Quiz cols are at least empty strings
-        for col in ["FAQ_Loc", "FAQ_File", "FAQ_Label", "Quiz_Loc", "Quiz_File", "Quiz_Label"]:
-            if row.get(col) is None:
-                row[col] = ""
+        for col in REQUIRED_EXTRA_COLS:
+            if col not in cols:
+                cols[col] = [""] * n
+
+        blank = [""] * n
+
+        # Default Start_Here to "No" if blank
+        cols["Start_Here"] = [v or "No" for v in cols["Start_Here"]]
 
         # Build Narr1 if blank
-        if not row.get("Narr1"):
-            code = row.get("Code", "")
-            title_short = row.get("Title_short", "")
-            narr1_seed = row.get("Narr1_seed", "")
-            row["Narr1"] = build_narr1(code, title_short, narr1_seed)
-
-        # OPTIONAL: Copy seeds into Narr2 / Narr3 if you’ve created them
-        if not row.get("Narr2") and row.get("Narr2_seed"):
-            row["Narr2"] = row["Narr2_seed"].strip()
-        if not row.get("Narr3") and row.get("Narr3_seed"):
-            row["Narr3"] = row["Narr3_seed"].strip()
-
-    # Preferred column ordering (any extra columns get appended)
-    core_order = [
-        "Source_PPT", "SlideIndex", "SelectionTitle", "Title", "Code", "Title_short",
-        "Image_sub_url",
-        "Deci_Question", "Next1_Code", "Next2_Code",
-        "Desc_Next1", "Desc_Next2", "Desi_Ques",
-        "Narr1_seed", "Narr2_seed", "Narr3_seed",
-        "Narr1", "Narr2", "Narr3",
-        "UAP_Label", "UAP_URL",
-        "Start_Here",
-        "Entity", "Function", "SubEntity",
-        "Exclude",
-        "FAQ_Loc", "FAQ_File", "FAQ_Label",
-        "Quiz_Loc", "Quiz_File", "Quiz_Label",
-    ]
-
-    extras = [c for c in fieldnames if c not in core_order]
-    final_fields = [c for c in core_order if c in fieldnames] + extras
-
-    with out_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=final_fields)
-        writer.writeheader()
-        for row in norm_rows:
-            writer.writerow(row)
+        cols["Narr1"] = [
+            v or build_narr1(code, title_short, seed)
+            for v, code, title_short, seed in zip(
+                cols["Narr1"], cols.get("Code", blank), cols.get("Title_short", blank), cols.get("Narr1_seed", blank)
+            )
+        ]
+
+        # Copy seeds into Narr2 / Narr3 where those are blank
+        cols["Narr2"] = [v or seed for v, seed in zip(cols["Narr2"], cols.get("Narr2_seed", blank))]
+        cols["Narr3"] = [v or seed for v, seed in zip(cols["Narr3"], cols.get("Narr3_seed", blank))]
+
+    if text_fix != "off":
+        with sop_profile.span("text_fix"):
+            keys = [_row_key(code, idx, i + 1)
+                    for i, (code, idx) in enumerate(zip(cols.get("Code", blank), cols.get("SlideIndex", blank)))]
+            found = []
+            for j, name in enumerate(cols):
+                col = cols[name]
+                multiline = name in text_normalize.MULTILINE_FIELDS
+                for i, v in enumerate(col):
+                    fixed, kinds = text_normalize.fix_text(v, multiline, text_fix)
+                    if kinds:
+                        col[i] = fixed
+                        found.append((i, j, name, kinds))
+            # Row by row, as ready_row() reports them.
+            if fixes is not None:
+                for i, _, name, kinds in sorted(found):
+                    fixes.add(keys[i], name, kinds)
+
+    with sop_profile.span("write"), out_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(final_fields)
+        writer.writerows(zip(*(cols[c] for c in final_fields)))
+
+    sop_profile.count(rows=n, input_bytes=in_path.stat().st_size,
+                      output_bytes=out_path.stat().st_size)
+    return n
+
+
+def main() -> None:
+    args = parse_args()
+    in_path = Path(args.csv)
+    out_path = Path(args.out)
+
+    with sop_profile.session("enh_upd_to_ready", VERSION, args), \
+            build_events.stage_event("ready", "enh_upd_to_ready", VERSION,
+                                     build_events.sop_from_filename(in_path)) as ev:
+        fixes = text_normalize.FixReport()
+        rows = convert(in_path, out_path, args.sheet, args.text_fix, fixes)
+        ev.update(rows=rows, out=out_path, output_bytes=build_events.file_bytes(out_path))
 
     print(f"Input : {in_path}")
     print(f"Output: {out_path}")
-    print(f"Rows  : {len(norm_rows)}")
+    print(f"Rows  : {rows}")
+    print(f"Text  : {fixes.summary()}")
+    for line in fixes.lines():
+        print(f"        {line}")
     print("Done: ENH_UPD -> READY CSV with Narr1/2/3.")
 
 
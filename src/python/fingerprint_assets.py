@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+fingerprint_assets.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Content-fingerprinted asset URLs for long-lived browser caching.
+
+build_player.py --fingerprint-assets passes the story it is about to inline
+through fingerprint_story(). Every local image reference (image, image_opt,
+image_srcset entries) that resolves to a file is replaced by a copy named
+after its content:
+
+  ../images/LineEnt/S001.png  ->  ../fp/S001.3f9c2a71be.png
+
+- Copies live in one flat folder, docs/outputs/fp/ (the "fp" sibling of the
+  players folder). They are real copies, never hardlinks: a slide
+  re-exported in place must not change the bytes behind a hashed name that
+  browsers cache as immutable. The image folders themselves are not
+  touched, so the validators' folder fingerprints do not move.
+- The hash is the first 10 hex digits of sha256(content). An edited slide
+  gets a new name, and the old name stays valid for players still cached.
+- .gz/.br siblings of a source (precompress.py) are copied under the
+  fingerprinted name too (S001.<h>.json.gz).
+- serve_outputs.py sends names matching FINGERPRINT_RE with
+  Cache-Control: public, max-age=31536000, immutable.
+- story.json itself is unchanged. Only the copy inlined in the player is
+  rewritten.
+
+Usage (CLI, to inspect what a story would map to):
+  python src/python/fingerprint_assets.py --story docs/outputs/story/LineEnt/story.json \
+      --players-dir docs/outputs/players
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import story_format
+
+VERSION = "v1_20261017"
+
+FP_DIR_NAME = "fp"
+HASH_LEN = 10
+# name.<10 hex>.ext (optionally followed by .gz/.br)
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{%d}\.[A-Za-z0-9]+(\.(gz|br))?$" % HASH_LEN)
+
+_HASH_CACHE: Dict[Tuple[str, int, int], str] = {}
+
+
+def content_hash(p: Path) -> str:
+    """sha256 prefix of a file, cached per (path, size, mtime)."""
+    st = p.stat()
+    key = (str(p), st.st_size, st.st_mtime_ns)
+    h = _HASH_CACHE.get(key)
+    if h is None:
+        d = hashlib.sha256()
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                d.update(chunk)
+        h = _HASH_CACHE[key] = d.hexdigest()[:HASH_LEN]
+    return h
+
+
+def fingerprinted_name(p: Path, h: str) -> str:
+    return f"{p.stem}.{h}{p.suffix}"
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    """
+    Copy `src` to `dst` through a tmp file and os.replace(); an existing `dst`
+    is kept, unless it is still a hardlink of `src` (earlier builds linked them).
+    """
+    if dst.exists() and not os.path.samefile(src, dst):
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Per-process tmp name: parallel SOP builds may place the same content at once.
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def fingerprint_file(src: Path, fp_dir: Path) -> Path:
+    """Place a content-named copy of `src` (and its .gz/.br siblings) in fp_dir; return its path."""
+    dst = fp_dir / fingerprinted_name(src, content_hash(src))
+    copy_file(src, dst)
+    for ext in (".gz", ".br"):
+        sib = src.with_name(src.name + ext)
+        if sib.is_file() and sib.stat().st_mtime_ns >= src.stat().st_mtime_ns:
+            copy_file(sib, dst.with_name(dst.name + ext))
+    return dst
+
+
+def _is_local(url: str) -> bool:
+    return bool(url) and not re.match(r"^([a-z][a-z0-9+.-]*:|/|#)", url, re.I)
+
+
+class Fingerprinter:
+    """Rewrites URLs relative to `base_dir` (the players folder) to fp/ names."""
+
+    def __init__(self, base_dir: Path, fp_dir: Optional[Path] = None):
+        self.base_dir = base_dir
+        self.fp_dir = fp_dir or base_dir.parent / FP_DIR_NAME
+        self.mapping: Dict[str, str] = {}
+        self.missing = 0
+
+    def url(self, url: Any) -> Any:
+        if not isinstance(url, str) or not _is_local(url.strip()):
+            return url
+        u = url.strip()
+        if u in self.mapping:
+            return self.mapping[u]
+        src = (self.base_dir / u.replace("\\", "/")).resolve()
+        if not src.is_file():
+            self.missing += 1
+            return url
+        dst = fingerprint_file(src, self.fp_dir)
+        out = Path(os.path.relpath(dst, self.base_dir)).as_posix()
+        self.mapping[u] = out
+        return out
+
+    def srcset(self, srcset: Any) -> Any:
+        if not isinstance(srcset, str) or not srcset:
+            return srcset
+        parts = []
+        for item in srcset.split(","):
+            bits = item.strip().split(None, 1)
+            if bits:
+                parts.append(" ".join([self.url(bits[0])] + bits[1:]))
+        return ", ".join(parts)
+
+
+def fingerprint_story(story: Dict[str, Any], base_dir: Path, fp_dir: Optional[Path] = None) -> Fingerprinter:
+    """Rewrite the story's image URLs in place; returns the Fingerprinter (mapping, missing count)."""
+    fpr = Fingerprinter(base_dir, fp_dir)
+    for fr in story.get("frames") or []:
+        if not isinstance(fr, dict):
+            continue
+        for k in ("image", "image_opt"):
+            if k in fr:
+                fr[k] = fpr.url(fr[k])
+        if "image_srcset" in fr:
+            fr["image_srcset"] = fpr.srcset(fr["image_srcset"])
+    return fpr
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Show the fingerprinted URLs a story would get")
+    ap.add_argument("--story", required=True)
+    ap.add_argument("--players-dir", required=True, help="Folder the story's relative URLs resolve against")
+    args = ap.parse_args()
+    story = story_format.expand_story(json.loads(Path(args.story).read_text(encoding="utf-8")))
+    fpr = fingerprint_story(story, Path(args.players_dir).resolve())
+    for src, dst in fpr.mapping.items():
+        print(f"{src} -> {dst}")
+    print(f"{len(fpr.mapping)} asset(s) fingerprinted into {fpr.fp_dir}, {fpr.missing} reference(s) not found")
+
+
+if __name__ == "__main__":
+    main()
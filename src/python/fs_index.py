@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+fs_index.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+One in-memory index of the files under the output folders, so the validators
+answer "does this image / FAQ / quiz file exist?" with a set lookup instead of
+one stat call per reference.
+
+- FsIndex(roots) walks each root once with os.scandir (iterative, symlinked
+  folders followed once) and keeps every file and folder path in a set.
+- recursive=False indexes only the listed folders themselves (what the
+  validators use when no shared index is passed in).
+- Paths outside the indexed roots fall back to a normal os.path check, so a
+  caller can always pass an index without changing its results.
+- Optional persistence (cache_path): the listing of every folder is saved
+  with the folder's mtime_ns. On the next run a folder whose mtime is
+  unchanged reuses its saved listing, so a warm start costs one stat per
+  folder instead of a full re-read. refresh() does the same in-process.
+  Adding/removing/renaming a file changes its folder's mtime; editing a file
+  in place does not, which is fine because only existence is tracked.
+
+Used by validate_story_v1a.py, validate_env.py, validate_env_sop_build.py and
+sop_pipeline.py (one shared index per build-all run).
+
+Usage:
+  python src/python/fs_index.py docs/outputs [--cache outputs/pipeline_state/fs_index.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+VERSION = "v1_20261017"
+
+# abs folder -> (mtime_ns, file names, subfolder names)
+_Listing = Tuple[int, List[str], List[str]]
+
+
+def _key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _scan(d: str) -> Tuple[List[str], List[str]]:
+    files: List[str] = []
+    subdirs: List[str] = []
+    try:
+        with os.scandir(d) as it:
+            for e in it:
+                try:
+                    if e.is_dir():
+                        subdirs.append(e.name)
+                    elif e.is_file():
+                        files.append(e.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+
+class FsIndex:
+    """Set-backed existence index over one or more folder trees."""
+
+    def __init__(self, roots: Iterable[str], cache_path: Optional[str] = None, recursive: bool = True):
+        self.roots = sorted({_key(str(r)) for r in roots})
+        self.recursive = recursive
+        self.cache_path = str(cache_path) if cache_path else None
+        self._dirs: Dict[str, _Listing] = {}
+        self._files: Set[str] = set()
+        self._dirset: Set[str] = set()
+        self.stats = {"dirs": 0, "files": 0, "scanned": 0, "reused": 0, "seconds": 0.0}
+
+        prev: Dict[str, _Listing] = {}
+        if self.cache_path and os.path.isfile(self.cache_path):
+            prev = self._load_cache()
+        self._walk(prev)
+        if self.cache_path:
+            self.save()
+
+    # ---- building ----
+
+    def _load_cache(self) -> Dict[str, _Listing]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (doc.get("version") != VERSION or doc.get("roots") != self.roots
+                or doc.get("recursive", True) != self.recursive):
+            return {}
+        return {d: (v[0], v[1], v[2]) for d, v in doc.get("dirs", {}).items()}
+
+    def _walk(self, prev: Dict[str, _Listing]) -> None:
+        t0 = time.perf_counter()
+        dirs: Dict[str, _Listing] = {}
+        seen_real: Set[str] = set()
+        scanned = reused = 0
+        stack = list(reversed(self.roots))
+        while stack:
+            d = stack.pop()
+            try:
+                mtime = os.stat(d).st_mtime_ns
+            except OSError:
+                continue
+            real = os.path.realpath(d)
+            if real in seen_real:
+                continue  # symlink loop / second path to the same folder
+            seen_real.add(real)
+
+            cached = prev.get(d)
+            if cached is not None and cached[0] == mtime:
+                files, subdirs = cached[1], cached[2]
+                reused += 1
+            else:
+                files, subdirs = _scan(d)
+                scanned += 1
+            dirs[d] = (mtime, files, subdirs)
+            if self.recursive:
+                stack.extend(_key(os.path.join(d, s)) for s in reversed(subdirs))
+
+        self._dirs = dirs
+        self._dirset = set(dirs)
+        self._files = {_key(os.path.join(d, f)) for d, (_, files, _) in dirs.items() for f in files}
+        self.stats = {
+            "dirs": len(dirs),
+            "files": len(self._files),
+            "scanned": scanned,
+            "reused": reused,
+            "seconds": round(time.perf_counter() - t0, 4),
+        }
+
+    def refresh(self) -> None:
+        """Re-check folder mtimes and re-read only folders that changed."""
+        self._walk(self._dirs)
+        if self.cache_path:
+            self.save()
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.cache_path
+        if not path:
+            return
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        doc = {
+            "version": VERSION,
+            "roots": self.roots,
+            "recursive": self.recursive,
+            "dirs": {d: [m, files, subdirs] for d, (m, files, subdirs) in self._dirs.items()},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    # ---- lookups ----
+
+    def covers(self, path: str) -> bool:
+        k = _key(path)
+        if not self.recursive:
+            return os.path.dirname(k) in self._dirset or k in self._dirset
+        return any(k == r or k.startswith(r.rstrip(os.sep) + os.sep) for r in self.roots)
+
+    def is_file(self, path: str) -> bool:
+        if self.covers(path):
+            return _key(path) in self._files
+        return os.path.isfile(path)
+
+    def exists(self, path: str) -> bool:
+        if self.covers(path):
+            k = _key(path)
+            return k in self._files or k in self._dirset
+        return os.path.exists(path)
+
+    def names(self, folder: str, suffix: str = "") -> Set[str]:
+        """File names directly inside `folder` ending with `suffix` (case-sensitive, like glob)."""
+        k = _key(folder)
+        if self.covers(folder):
+            listing = self._dirs.get(k)
+            files = listing[1] if listing else []
+        else:
+            files = _scan(folder)[0]
+        return {n for n in files if n.endswith(suffix)}
+
+
+_SHARED: Dict[Tuple[Tuple[str, ...], Optional[str]], FsIndex] = {}
+
+
+def shared_index(roots: Iterable[str], cache_path: Optional[str] = None) -> FsIndex:
+    """
+    Process-wide index for `roots`. The first call walks the tree; later calls
+    refresh() it, which only re-reads folders whose mtime moved (e.g. the
+    story/player folders an earlier SOP just wrote).
+    """
+    key = (tuple(sorted({_key(str(r)) for r in roots})), str(cache_path) if cache_path else None)
+    idx = _SHARED.get(key)
+    if idx is None:
+        idx = _SHARED[key] = FsIndex(roots, cache_path)
+    else:
+        idx.refresh()
+    return idx
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build (and optionally persist) the output folder index")
+    ap.add_argument("roots", nargs="+", help="Folders to index (e.g. docs/outputs outputs)")
+    ap.add_argument("--cache", default=None, help="JSON file to persist folder listings with mtimes")
+    args = ap.parse_args()
+    idx = FsIndex(args.roots, args.cache)
+    s = idx.stats
+    print(f"Indexed {s['files']} files in {s['dirs']} folders "
+          f"({s['scanned']} read, {s['reused']} from cache) in {s['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
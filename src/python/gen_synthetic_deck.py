@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+gen_synthetic_deck.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Write a synthetic ENH_UPD CSV shaped like inputs/raw/*_READYBASE_ENH_UPD.csv
+(same columns, same code families, same decision layout) so the pipeline can
+be timed on decks far larger than the real ones.
+
+Deck layout (mirrors ISMSetup):
+  S00000 (Start_Here=Yes) -> blocks ... -> S999
+  decision block:  Dk -> Yk | Nk,  Yk -> S<n> -> S998t<k> -> Nk | S999,  Nk -> next block
+  linear block:    S<n> -> next block
+Content codes are zero-padded (S00012) so they never collide with the
+S998*/S999 terminal family.
+
+Knobs:
+  --frames     total rows (>= 3)
+  --branching  share of blocks that are decisions (0.0 - 1.0)
+  --narr-words words per Narr2_seed / Narr3_seed (Narr1_seed is ~1/4)
+  --multiline  share of narration cells that contain embedded newlines,
+               like the ISMSetup form-field lists
+  --seed       RNG seed; the same knobs always give the same bytes
+  --images     optional folder to fill with a 1x1 PNG per image reference
+               (hardlinked where possible) so --check-files style
+               validation can run
+
+Usage:
+  python src/python/gen_synthetic_deck.py --frames 10000 --out outputs/bench/Synth10k_ENH_UPD.csv
+"""
+
+import argparse
+import base64
+import csv
+import os
+import random
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+VERSION = "v1_20261017"
+
+ENH_UPD_HEADERS = [
+    "Source_PPT", "SlideIndex", "SelectionTitle", "Title", "Code", "Title_short",
+    "Image_sub_url", "Deci_Question", "Next1_Code", "Next2_Code", "Image_web",
+    "Narr1_seed", "Desc_Next1", "Desc_Next2", "Desi_Ques", "Narr2_seed", "Narr3_seed",
+    "UAP_Label", "UAP_URL", "Start_Here", "Entity", "Function", "SubEntity", "Exclude",
+    "FAQ_Loc", "FAQ_File", "FAQ_Label", "Quiz_Loc", "Quiz_File", "Quiz_Label",
+]
+
+# Smallest valid PNG (1x1 transparent); enough for existence checks.
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+_WORDS = (
+    "open the service order form select actions new specify this information partner "
+    "schedule technician contract rental counter labor rate template operation code "
+    "customer invoice payment agreement generator maintenance warehouse item quantity "
+    "review save close verify status approve record location billing unit task"
+).split()
+
+_FIELD_LINES = ["Partner", "Weekly Available Hours", "Location", "Work Code", "Rate", "Billing Code"]
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(max(1, n_words))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def _narration(rng: random.Random, n_words: int, multiline: bool) -> str:
+    if n_words <= 0:
+        return ""
+    if not multiline:
+        return _sentence(rng, n_words)
+    # ISMSetup-style: heading line, then "field / Specify ..." lines.
+    lines = [_sentence(rng, min(6, n_words))]
+    used = min(6, n_words)
+    while used < n_words:
+        take = min(n_words - used, rng.randint(4, 12))
+        lines.append(rng.choice(_FIELD_LINES))
+        lines.append("Specify " + _sentence(rng, take).lower())
+        used += take
+    return "\n".join(lines)
+
+
+def iter_deck(frames: int, sop_id: str = "Synth", branching: float = 0.3, narr_words: int = 60,
+              multiline: float = 0.25, seed: int = 1) -> Iterator[Dict[str, str]]:
+    """Yield ENH_UPD rows (dicts keyed by ENH_UPD_HEADERS), exactly `frames` of them."""
+    if frames < 3:
+        raise ValueError("frames must be >= 3 (start, one slide, S999)")
+    rng = random.Random(seed)
+    ppt = f"C:\\Users\\builder\\Documents\\Synthetic\\{sop_id}\\{sop_id}_synthetic.pptx"
+    slide = 0
+    content_n = 0
+    block_k = 0
+
+    def row(code: str, title_short: str, next1: str = "", next2: str = "", question: str = "",
+            desc1: str = "", desc2: str = "", start: bool = False) -> Dict[str, str]:
+        nonlocal slide
+        slide += 1
+        img = f"../images/{sop_id}/{code}.png"
+        title = f"{code}. {title_short}"
+        return {
+            "Source_PPT": ppt,
+            "SlideIndex": str(slide),
+            "SelectionTitle": title,
+            "Title": title,
+            "Code": code,
+            "Title_short": title_short,
+            "Image_sub_url": img,
+            "Deci_Question": question,
+            "Next1_Code": next1,
+            "Next2_Code": next2,
+            "Image_web": img,
+            "Narr1_seed": _sentence(rng, max(1, narr_words // 4)),
+            "Desc_Next1": desc1,
+            "Desc_Next2": desc2,
+            "Desi_Ques": question,
+            "Narr2_seed": _narration(rng, narr_words, rng.random() < multiline),
+            "Narr3_seed": _narration(rng, narr_words, rng.random() < multiline),
+            "UAP_Label": "",
+            "UAP_URL": "",
+            "Start_Here": "Yes" if start else "No",
+            "Entity": "PALCO",
+            "Function": "Service",
+            "SubEntity": sop_id,
+            "Exclude": "",
+            "FAQ_Loc": "../faq",
+            "FAQ_File": f"PPS_{sop_id}_faq.html",
+            "FAQ_Label": f"{sop_id}_FAQ's",
+            "Quiz_Loc": "",
+            "Quiz_File": "",
+            "Quiz_Label": "",
+        }
+
+    def next_content() -> str:
+        nonlocal content_n
+        content_n += 1
+        return f"S{content_n:05d}"
+
+    remaining = frames - 2  # start slide + S999
+
+    def plan() -> Tuple[str, str]:
+        """Pick the next block's kind and head code from the rows still to place."""
+        nonlocal block_k
+        if remaining <= 0:
+            return "end", "S999"
+        if remaining >= 5 and rng.random() < branching:
+            block_k += 1
+            return "decision", f"D{block_k}"
+        return "linear", next_content()
+
+    kind, cur = plan()
+    yield row("S00000", "Opening Slide", next1=cur, desc1="Begin", start=True)
+
+    while kind != "end":
+        if kind == "decision":
+            k = block_k
+            y, n, s, t = f"Y{k}", f"N{k}", next_content(), f"S998t{k}"
+            remaining -= 5
+            kind, after = plan()
+            yield row(cur, f"Decision {k}", next1=y, next2=n, question=f"Do you need step {k}?",
+                      desc1="Yes", desc2="No")
+            yield row(y, f"Yes to decision {k}", next1=s)
+            yield row(s, f"Steps for decision {k}", next1=t)
+            yield row(t, f"End of path {k}", next1=n, next2="S999", desc1="Continue", desc2="Finish")
+            yield row(n, f"No to decision {k}", next1=after)
+        else:
+            remaining -= 1
+            kind, after = plan()
+            yield row(cur, f"Process slide {cur}", next1=after)
+        cur = after
+
+    yield row("S999", "End of SOP")
+
+
+def write_deck(out: Path, frames: int, sop_id: str = "Synth", branching: float = 0.3, narr_words: int = 60,
+               multiline: float = 0.25, seed: int = 1, images: Optional[Path] = None) -> int:
+    """Write the CSV (utf-8-sig like the exports). Returns the row count."""
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tiny: Optional[Path] = None
+    if images is not None:
+        images.mkdir(parents=True, exist_ok=True)
+        tiny = images / ".tiny.png"
+        tiny.write_bytes(TINY_PNG)
+
+    n = 0
+    with out.open("w", encoding="utf-8-sig", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=ENH_UPD_HEADERS)
+        w.writeheader()
+        for r in iter_deck(frames, sop_id, branching, narr_words, multiline, seed):
+            w.writerow(r)
+            n += 1
+            if tiny is not None:
+                dst = images / f"{r['Code']}.png"
+                if not dst.exists():
+                    try:
+                        os.link(tiny, dst)
+                    except OSError:
+                        dst.write_bytes(TINY_PNG)
+    if tiny is not None:
+        tiny.unlink()
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic ENH_UPD CSV for scaling tests")
+    ap.add_argument("--frames", type=int, required=True)
+    ap.add_argument("--out", required=True, help="Output ENH_UPD CSV path")
+    ap.add_argument("--sop-id", default="Synth")
+    ap.add_argument("--branching", type=float, default=0.3, help="Share of blocks that are decisions (0-1)")
+    ap.add_argument("--narr-words", type=int, default=60, help="Words per Narr2/Narr3 seed")
+    ap.add_argument("--multiline", type=float, default=0.25, help="Share of narration cells with newlines (0-1)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--images", default=None, help="Optional folder to fill with placeholder PNGs")
+    args = ap.parse_args()
+
+    n = write_deck(Path(args.out), args.frames, args.sop_id, args.branching, args.narr_words,
+                   args.multiline, args.seed, Path(args.images) if args.images else None)
+    print(f"Wrote {n} rows -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+image_store.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+One content-addressed copy of every slide image, shared by all SOPs.
+
+Many slides are the same across SOPs (the S001 opening slide, the S002/S003
+intro slides) or across re-exports of a deck, yet each SOP keeps its own
+copy under docs/outputs/images/<SOP>/. The store keeps each content once:
+
+  docs/outputs/store/<sha256[:16]>.png
+
+- csv_to_story.py --image-store and build_player.py --image-store rewrite
+  image, image_opt and image_srcset references into the store:
+    ../images/PMA/S001.png  ->  ../store/8eb1292c2252f896.png
+  so the same slide in four SOPs is one URL, fetched and cached once.
+  Names are content hashes, so serve_outputs.py serves them as immutable.
+- Objects are copies, never hardlinks, of the image they came from: a slide
+  re-exported in place must not change an object that other SOPs share and
+  browsers cache as immutable. The image folders stay the source of truth
+  for validate_env and optimize_images.
+- --perceptual also folds "re-exported but visually unchanged" slides onto
+  an existing object. A 256-bit difference hash (dHash) on a 17x16
+  grayscale thumbnail finds candidates of the same size within
+  DHASH_DISTANCE bits. A candidate is only used when no pixel differs by
+  more than PIXEL_TOLERANCE in any channel. Slides that share a layout have
+  close hashes but different text, and the pixel check (after a 64x64
+  thumbnail pre-check) keeps them apart.
+  Needs Pillow.
+- outputs/pipeline_state/image_store_state.json caches per-file hashes (by
+  size and mtime), dHashes and perceptual matches. Saves merge with the file
+  on disk, so parallel SOP builds only risk a cache miss.
+- The CLI adds a whole images folder and lists the groups of byte-identical
+  files it found. --verify re-hashes every object and removes any whose
+  bytes do not match its name.
+
+Usage:
+  python src/python/image_store.py --images docs/outputs/images
+  python src/python/image_store.py --images docs/outputs/images --perceptual
+  python src/python/image_store.py --store docs/outputs/store --verify
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import build_events
+import fingerprint_assets
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+STORE_DIR_NAME = "store"
+STATE_NAME = "image_store_state.json"
+HASH_LEN = 16
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg")
+DHASH_SIZE = 16
+DHASH_DISTANCE = 12
+PIXEL_TOLERANCE = 8
+THUMB_SIZE = 64
+# <outputs>/store/<16 hex>.<ext>: an object name, wherever it appears in a URL.
+OBJECT_RE = re.compile(r"(^|/)%s/[0-9a-f]{%d}\.[A-Za-z0-9]+$" % (STORE_DIR_NAME, HASH_LEN))
+
+
+def _require_pillow():
+    try:
+        from PIL import Image, ImageChops
+    except ImportError:
+        raise SystemExit("Pillow is required for image_store.py --perceptual: pip install -r requirements.txt")
+    return Image, ImageChops
+
+
+def _is_local(url: str) -> bool:
+    return bool(url) and not re.match(r"^([a-z][a-z0-9+.-]*:|/|#)", url, re.I)
+
+
+def _load_state(p: Path) -> Dict[str, Any]:
+    try:
+        state = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == VERSION else {}
+
+
+class ImageStore:
+    """
+    Places images in `store_dir` and rewrites URLs relative to `base_dir`
+    (the players folder; default: the store's sibling "players") to point at
+    them. Counters: refs, added (new objects), matched (perceptual), missing.
+    """
+
+    def __init__(self, store_dir: Path, base_dir: Optional[Path] = None, perceptual: bool = False,
+                 tolerance: int = PIXEL_TOLERANCE, state_path: Optional[Path] = None):
+        self.store_dir = store_dir.resolve()
+        self.base_dir = (base_dir or store_dir.parent / "players").resolve()
+        self.perceptual = perceptual
+        self.tolerance = tolerance
+        self.state_path = state_path or REPO_ROOT / "outputs" / "pipeline_state" / STATE_NAME
+        state = _load_state(self.state_path)
+        self.files: Dict[str, List[Any]] = state.get("files") or {}
+        self.dhashes: Dict[str, List[Any]] = state.get("dhash") or {}
+        self.aliases: Dict[str, str] = state.get("aliases") or {}
+        self._dirty = False
+        self._objects: Optional[List[str]] = None
+        self._thumbs: Dict[str, bytes] = {}
+        self.mapping: Dict[str, str] = {}
+        self.used: Set[str] = set()
+        self.refs = self.added = self.matched = self.missing = 0
+
+    # -- hashing --
+
+    def file_hash(self, p: Path) -> str:
+        """sha256 prefix of a file, cached by (size, mtime)."""
+        st = p.stat()
+        key = str(p)
+        rec = self.files.get(key)
+        if rec and rec[0] == st.st_size and rec[1] == st.st_mtime_ns:
+            return rec[2]
+        d = hashlib.sha256()
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                d.update(chunk)
+        h = d.hexdigest()[:HASH_LEN]
+        self.files[key] = [st.st_size, st.st_mtime_ns, h]
+        self._dirty = True
+        return h
+
+    def dhash(self, p: Path, h: str) -> Tuple[int, int, int]:
+        """(width, height, 256-bit difference hash), cached by content hash."""
+        rec = self.dhashes.get(h)
+        if rec:
+            return rec[0], rec[1], int(rec[2], 16)
+        Image, _ = _require_pillow()
+        with Image.open(p) as im:
+            w, h_px = im.size
+            g = im.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BOX).tobytes()
+        bits = 0
+        for r in range(DHASH_SIZE):
+            row = g[r * (DHASH_SIZE + 1):(r + 1) * (DHASH_SIZE + 1)]
+            for c in range(DHASH_SIZE):
+                bits = (bits << 1) | (row[c] > row[c + 1])
+        self.dhashes[h] = [w, h_px, f"{bits:0{DHASH_SIZE * DHASH_SIZE // 4}x}"]
+        self._dirty = True
+        return w, h_px, bits
+
+    def _thumb(self, p: Path, h: str) -> bytes:
+        if h not in self._thumbs:
+            Image, _ = _require_pillow()
+            with Image.open(p) as im:
+                self._thumbs[h] = im.convert("L").resize((THUMB_SIZE, THUMB_SIZE), Image.BOX).tobytes()
+        return self._thumbs[h]
+
+    def _same_pixels(self, a: Path, ha: str, b: Path, hb: str) -> bool:
+        # Box-averaged gray levels cannot differ by more than the pixels do
+        # (+1 for rounding), so the thumbnails rule out most candidates cheaply.
+        ta, tb = self._thumb(a, ha), self._thumb(b, hb)
+        if max(abs(x - y) for x, y in zip(ta, tb)) > self.tolerance + 1:
+            return False
+        Image, ImageChops = _require_pillow()
+        with Image.open(a) as ia, Image.open(b) as ib:
+            if ia.size != ib.size:
+                return False
+            diff = ImageChops.difference(ia.convert("RGBA"), ib.convert("RGBA"))
+            return max(hi for _, hi in diff.getextrema()) <= self.tolerance
+
+    # -- objects --
+
+    def objects(self) -> List[str]:
+        if self._objects is None:
+            try:
+                self._objects = sorted(n for n in os.listdir(self.store_dir)
+                                       if OBJECT_RE.search(f"{STORE_DIR_NAME}/{n}"))
+            except OSError:
+                self._objects = []
+        return self._objects
+
+    def _match(self, src: Path, h: str) -> Optional[str]:
+        """An existing object that looks the same as `src` (perceptual mode), or None."""
+        alias = self.aliases.get(h)
+        if alias and (self.store_dir / alias).is_file():
+            return alias
+        w, hp, bits = self.dhash(src, h)
+        candidates = []
+        for name in self.objects():
+            if Path(name).suffix.lower() != src.suffix.lower():
+                continue
+            ow, oh, obits = self.dhash(self.store_dir / name, Path(name).stem)
+            dist = bin(bits ^ obits).count("1")
+            if (ow, oh) == (w, hp) and dist <= DHASH_DISTANCE:
+                candidates.append((dist, name))
+        for _, name in sorted(candidates):
+            if self._same_pixels(src, h, self.store_dir / name, Path(name).stem):
+                self.aliases[h] = name
+                self._dirty = True
+                return name
+        return None
+
+    def add(self, src: Path) -> Path:
+        """Store `src` (if its content is not there yet) and return its object path."""
+        h = self.file_hash(src)
+        name = h + src.suffix.lower()
+        dst = self.store_dir / name
+        if dst.is_file():
+            fingerprint_assets.copy_file(src, dst)  # only replaces a hardlink left by earlier builds
+        else:
+            match = self._match(src, h) if self.perceptual else None
+            if match:
+                self.matched += 1
+                return self.store_dir / match
+            fingerprint_assets.copy_file(src, dst)
+            self.added += 1
+            if self._objects is not None:
+                self._objects.append(name)
+                self._objects.sort()
+        return dst
+
+    # -- URLs --
+
+    def url(self, url: Any) -> Any:
+        if not isinstance(url, str) or not _is_local(url.strip()):
+            return url
+        u = url.strip()
+        if u in self.mapping:
+            self.refs += 1
+            return self.mapping[u]
+        src = (self.base_dir / u.replace("\\", "/")).resolve()
+        if src.suffix.lower() not in IMAGE_SUFFIXES or not src.is_file():
+            if src.suffix.lower() in IMAGE_SUFFIXES:
+                self.missing += 1
+            return url
+        dst = self.add(src)
+        out = Path(os.path.relpath(dst, self.base_dir)).as_posix()
+        self.mapping[u] = out
+        self.used.add(dst.name)
+        self.refs += 1
+        return out
+
+    def srcset(self, srcset: Any) -> Any:
+        if not isinstance(srcset, str) or not srcset:
+            return srcset
+        parts = []
+        for item in srcset.split(","):
+            bits = item.strip().split(None, 1)
+            if bits:
+                parts.append(" ".join([self.url(bits[0])] + bits[1:]))
+        return ", ".join(parts)
+
+    def frame(self, fr: Dict[str, Any]) -> Dict[str, Any]:
+        """Rewrite one frame's image references in place (and return it)."""
+        for k in ("image", "image_opt"):
+            if k in fr:
+                fr[k] = self.url(fr[k])
+        if "image_srcset" in fr:
+            fr["image_srcset"] = self.srcset(fr["image_srcset"])
+        return fr
+
+    def summary(self) -> str:
+        s = f"{self.refs} reference(s) -> {len(self.used)} object(s), {self.added} new"
+        if self.perceptual:
+            s += f", {self.matched} perceptual match(es)"
+        if self.missing:
+            s += f", {self.missing} not found"
+        return s
+
+    def save(self) -> None:
+        """Merge this run's cache entries into the state file (atomic, per-process tmp)."""
+        if not self._dirty:
+            return
+        disk = _load_state(self.state_path)
+        state = {"version": VERSION,
+                 "files": {**(disk.get("files") or {}), **self.files},
+                 "dhash": {**(disk.get("dhash") or {}), **self.dhashes},
+                 "aliases": {**(disk.get("aliases") or {}), **self.aliases}}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False) + "\n", encoding="utf-8")
+        os.replace(tmp, self.state_path)
+        self._dirty = False
+
+
+def store_story(story: Dict[str, Any], store: ImageStore) -> ImageStore:
+    """Rewrite every frame's image references into the store (in place)."""
+    for fr in story.get("frames") or []:
+        if isinstance(fr, dict):
+            store.frame(fr)
+    return store
+
+
+def image_files(images_root: Path) -> List[Path]:
+    return sorted(p for p in images_root.rglob("*")
+                  if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES and STORE_DIR_NAME not in p.parts)
+
+
+def add_tree(images_root: Path, store: ImageStore) -> Dict[str, Any]:
+    """
+    Put every image under `images_root` in the store. Returns
+      {"files", "bytes", "objects", "object_bytes", "groups"}
+    where "groups" lists the files (relative to images_root) sharing one object.
+    """
+    files = image_files(images_root)
+    objects: Dict[str, int] = {}
+    users: Dict[str, List[str]] = {}
+    total = 0
+    for p in files:
+        dst = store.add(p)
+        total += p.stat().st_size
+        objects[dst.name] = dst.stat().st_size
+        users.setdefault(dst.name, []).append(p.relative_to(images_root).as_posix())
+    return {"files": len(files), "bytes": total, "objects": len(objects),
+            "object_bytes": sum(objects.values()), "groups": [u for u in users.values() if len(u) > 1]}
+
+
+def verify(store: ImageStore) -> Tuple[int, List[str]]:
+    """Remove objects whose bytes no longer hash to their name; returns (objects checked, removed names)."""
+    bad = []
+    names = list(store.objects())
+    for name in names:
+        p = store.store_dir / name
+        d = hashlib.sha256(p.read_bytes()).hexdigest()[:HASH_LEN]
+        if d != Path(name).stem:
+            p.unlink()
+            bad.append(name)
+    store._objects = None
+    return len(names), bad
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Content-addressed slide image store (docs/outputs/store)")
+    ap.add_argument("--images", default=None, help="Images folder to add (e.g. docs/outputs/images)")
+    ap.add_argument("--store", default=str(REPO_ROOT / "docs" / "outputs" / STORE_DIR_NAME),
+                    help="Store folder (default: docs/outputs/store)")
+    ap.add_argument("--perceptual", action="store_true",
+                    help="Reuse an object that looks the same (dHash + pixel check; needs Pillow)")
+    ap.add_argument("--tolerance", type=int, default=PIXEL_TOLERANCE,
+                    help=f"Largest per-channel pixel difference for --perceptual (default: {PIXEL_TOLERANCE})")
+    ap.add_argument("--verify", action="store_true", help="Re-hash every object; remove mismatches")
+    ap.add_argument("--state", default=None,
+                    help="Cache file (default: outputs/pipeline_state/image_store_state.json)")
+    args = ap.parse_args()
+    if not (args.images or args.verify):
+        ap.error("give --images and/or --verify")
+
+    store = ImageStore(Path(args.store), perceptual=args.perceptual, tolerance=args.tolerance,
+                       state_path=Path(args.state) if args.state else None)
+    with build_events.stage_event("image_store", "image_store", VERSION) as ev:
+        t0 = time.perf_counter()
+        if args.verify:
+            checked, bad = verify(store)
+            print(f"[OK] verified {checked} object(s), removed {len(bad)}"
+                  + (f": {', '.join(bad)}" if bad else ""))
+        if args.images:
+            res = add_tree(Path(args.images), store)
+            saved = res["bytes"] - res["object_bytes"]
+            print(f"[OK] {res['files']} image(s), {res['bytes']} bytes -> {res['objects']} object(s), "
+                  f"{res['object_bytes']} bytes ({res['files'] - res['objects']} duplicate(s), {saved} bytes); "
+                  f"{store.added} new, {store.matched} perceptual match(es)")
+            for group in res["groups"]:
+                print("     same object: " + ", ".join(group))
+            ev.update(rows=res["files"], out=store.store_dir, output_bytes=res["object_bytes"],
+                      detail=f"{res['objects']} objects, {store.added} new")
+        store.save()
+        print(f"     in {time.perf_counter() - t0:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
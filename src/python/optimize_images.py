@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+optimize_images.py
+Version: v1_20261017 (America/New_York)
+
+Purpose
+-------
+Shrink the exported slide PNGs for one SOP and write WebP width variants the
+player can pick from with srcset.
+
+For every <images>/<name>.png:
+  - <out>/<name>.png           lossless-optimized PNG, or a palette-reduced PNG
+                               (--palette-colors, default 256) when smaller
+  - <out>/<name>_w<W>.webp     one per --widths entry (lossy or lossless,
+                               whichever is smaller in --webp-mode auto)
+  - <out>/variants.json        manifest read by csv_to_story.py --image-variants
+
+Encoded results are cached under --cache-dir keyed by the source image's
+SHA-256 plus the encode settings, so unchanged slides are never re-encoded.
+A variant in <out> is replaced (tmp file + os.replace) whenever its SHA-256
+differs from the cached encode; variants of slides that no longer exist are
+removed.
+
+Needs Pillow (see requirements.txt).
+
+Usage
+-----
+python src/python/optimize_images.py \
+  --images docs/outputs/images/TechMobile \
+  --widths 480 960 1600
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import build_events
+
+VERSION = "v1_20261017"
+
+MANIFEST_NAME = "variants.json"
+DEFAULT_WIDTHS = [480, 960, 1600]
+# Files this tool writes into <out>: <stem>.png and <stem>_w<W>.webp.
+VARIANT_RE = re.compile(r"(\.png|_w\d+\.webp)$", re.I)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Optimize slide PNGs and write WebP srcset variants")
+    p.add_argument("--images", required=True, help="SOP image folder (docs/outputs/images/<SOP>)")
+    p.add_argument("--out-dir", default=None, help="Variant folder (default: <images>/opt)")
+    p.add_argument("--widths", type=int, nargs="+", default=DEFAULT_WIDTHS, help="WebP widths in px")
+    p.add_argument("--palette-colors", type=int, default=256,
+                   help="Try a palette PNG with this many colors; 0 = lossless only")
+    p.add_argument("--webp-mode", choices=("auto", "lossy", "lossless"), default="auto")
+    p.add_argument("--webp-quality", type=int, default=80)
+    p.add_argument("--cache-dir", default="outputs/image_cache", help="Content-hash encode cache")
+    return p.parse_args()
+
+
+def _require_pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("Pillow is required for optimize_images.py: pip install -r requirements.txt")
+    return Image
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _encode_png(Image, img, palette_colors: int) -> bytes:
+    rgb = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    buf = io.BytesIO()
+    rgb.save(buf, "PNG", optimize=True)
+    best = buf.getvalue()
+
+    if palette_colors and rgb.mode == "RGB":
+        pal = rgb.quantize(colors=palette_colors, method=Image.Quantize.FASTOCTREE)
+        buf = io.BytesIO()
+        pal.save(buf, "PNG", optimize=True)
+        if len(buf.getvalue()) < len(best):
+            best = buf.getvalue()
+    return best
+
+
+def _encode_webp(img, mode: str, quality: int) -> bytes:
+    candidates = []
+    if mode in ("auto", "lossy"):
+        buf = io.BytesIO()
+        img.save(buf, "WEBP", quality=quality, method=4)
+        candidates.append(buf.getvalue())
+    if mode in ("auto", "lossless"):
+        buf = io.BytesIO()
+        img.save(buf, "WEBP", lossless=True, method=4)
+        candidates.append(buf.getvalue())
+    return min(candidates, key=len)
+
+
+def encode_variants(src_bytes: bytes, widths: List[int], palette_colors: int,
+                    webp_mode: str, webp_quality: int) -> Dict[str, bytes]:
+    """Return {"png": bytes, "w<W>": webp bytes, ...} for one source image."""
+    Image = _require_pillow()
+    img = Image.open(io.BytesIO(src_bytes))
+    img.load()
+
+    out = {"png": _encode_png(Image, img, palette_colors)}
+
+    base = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    src_w, src_h = base.size
+    for w in sorted({min(w, src_w) for w in widths}):
+        if w == src_w:
+            sized = base
+        else:
+            sized = base.resize((w, max(1, round(src_h * w / src_w))), Image.Resampling.LANCZOS)
+        out[f"w{w}"] = _encode_webp(sized, webp_mode, webp_quality)
+    return out
+
+
+def _file_sha256(p: Path) -> Optional[str]:
+    try:
+        return sha256_bytes(p.read_bytes())
+    except OSError:
+        return None
+
+
+def _settings_key(args_like: Dict) -> str:
+    return json.dumps(args_like, sort_keys=True)
+
+
+def optimize_dir(images: Path, out_dir: Optional[Path] = None, widths: Optional[List[int]] = None,
+                 palette_colors: int = 256, webp_mode: str = "auto", webp_quality: int = 80,
+                 cache_dir: Path = Path("outputs/image_cache")) -> Dict:
+    """
+    Optimize every PNG directly inside `images`. Returns the manifest dict
+    (also written to <out_dir>/variants.json) with a "totals" byte report,
+    plus "cache_hits" (not written, so the manifest stays deterministic).
+    """
+    if not images.is_dir():
+        raise SystemExit(f"Images directory not found: {images}")
+    out_dir = out_dir or images / "opt"
+    widths = widths or DEFAULT_WIDTHS
+    settings = {
+        "tool": VERSION,
+        "widths": sorted(widths),
+        "palette_colors": palette_colors,
+        "webp_mode": webp_mode,
+        "webp_quality": webp_quality,
+    }
+    settings_hash = sha256_bytes(_settings_key(settings).encode("utf-8"))[:12]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rel_out = os.path.relpath(out_dir, images).replace("\\", "/")
+
+    entries: Dict[str, Dict] = {}
+    written = set()
+    hits = 0
+    for src in sorted(p for p in images.iterdir() if p.is_file() and p.suffix.lower() == ".png"):
+        data = src.read_bytes()
+        digest = sha256_bytes(data)
+        slot = cache_dir / digest[:2] / f"{digest}_{settings_hash}"
+
+        if (slot / "index.json").is_file():
+            index = json.loads((slot / "index.json").read_text(encoding="utf-8"))
+            hits += 1
+        else:
+            variants = encode_variants(data, widths, palette_colors, webp_mode, webp_quality)
+            slot.mkdir(parents=True, exist_ok=True)
+            index = {}
+            for key, blob in variants.items():
+                fname = "opt.png" if key == "png" else f"{key}.webp"
+                (slot / fname).write_bytes(blob)
+                index[key] = {"file": fname, "bytes": len(blob), "sha256": sha256_bytes(blob)}
+            (slot / "index.json").write_text(json.dumps(index, indent=2), encoding="utf-8")
+
+        stem = src.stem
+        entry = {"sha256": digest, "src_bytes": len(data), "webp": []}
+        for key, info in sorted(index.items(), key=lambda kv: (kv[0] != "png", len(kv[0]), kv[0])):
+            name = f"{stem}.png" if key == "png" else f"{stem}_{key}.webp"
+            dst = out_dir / name
+            want = info.get("sha256") or _file_sha256(slot / info["file"])  # slots from before "sha256"
+            if _file_sha256(dst) != want:
+                tmp = dst.with_name(f"{name}.{os.getpid()}.tmp")
+                shutil.copyfile(slot / info["file"], tmp)
+                os.replace(tmp, dst)
+            written.add(name)
+            if key == "png":
+                entry["png"] = f"{rel_out}/{name}"
+                entry["png_bytes"] = info["bytes"]
+            else:
+                entry["webp"].append({"w": int(key[1:]), "src": f"{rel_out}/{name}", "bytes": info["bytes"]})
+        entries[src.name] = entry
+
+    for p in out_dir.iterdir() if out_dir.resolve() != images.resolve() else []:
+        if p.is_file() and VARIANT_RE.search(p.name) and p.name not in written:
+            p.unlink()  # a slide that was deleted or renamed
+
+    totals = {
+        "images": len(entries),
+        "src_bytes": sum(e["src_bytes"] for e in entries.values()),
+        "png_bytes": sum(e["png_bytes"] for e in entries.values()),
+    }
+    for w in sorted({v["w"] for e in entries.values() for v in e["webp"]}):
+        totals[f"webp_w{w}_bytes"] = sum(v["bytes"] for e in entries.values() for v in e["webp"] if v["w"] == w)
+
+    manifest = {"version": VERSION, "settings": settings, "images": entries, "totals": totals}
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return dict(manifest, cache_hits=hits)
+
+
+def format_report(images: Path, manifest: Dict) -> str:
+    totals = manifest["totals"]
+    src = totals["src_bytes"] or 1
+    lines = [
+        f"Images : {images} ({totals['images']} PNGs, {manifest.get('cache_hits', 0)} from cache)",
+        f"Source : {totals['src_bytes']:>10} bytes",
+        f"PNG opt: {totals['png_bytes']:>10} bytes ({100 * totals['png_bytes'] / src:5.1f}%)",
+    ]
+    for k, v in totals.items():
+        if k.startswith("webp_w"):
+            w = k[len("webp_w"):-len("_bytes")]
+            lines.append(f"WebP {w:>4}: {v:>8} bytes ({100 * v / src:5.1f}%)")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    args = parse_args()
+    images = Path(args.images)
+    with build_events.stage_event("images", "optimize_images", VERSION, images.name) as ev:
+        manifest = optimize_dir(
+            images,
+            Path(args.out_dir) if args.out_dir else None,
+            args.widths,
+            args.palette_colors,
+            args.webp_mode,
+            args.webp_quality,
+            Path(args.cache_dir),
+        )
+        totals = manifest["totals"]
+        ev.update(rows=totals["images"], out=Path(args.out_dir) if args.out_dir else images / "opt",
+                  output_bytes=sum(v for k, v in totals.items() if k.endswith("_bytes") and k != "src_bytes"),
+                  detail=f"{manifest.get('cache_hits', 0)} from cache")
+    print(format_report(images, manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+pptx_diff.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Slide-level change detection between two versions of a deck, so a one-slide
+edit only needs that slide's PNG re-exported and its frame rebuilt.
+
+Both .pptx files are opened as zip archives (no PowerPoint, no python-pptx):
+- Slide order comes from ppt/presentation.xml (sldIdLst), so SlideIndex
+  matches the PowerShell export.
+- Each slide gets a code the way src/powershell/exp_slide_n_csv.ps1 picks
+  it: the title placeholder's text, else the best-scoring text shape (same
+  scoring), cleaned the same way and matched against ^([SDYNM]\\d+)\\.
+  Slides without a code are keyed by a code-like lead token the exporter
+  leaves blank (S998a.), else their cleaned title, else "slide<N>".
+- A slide's fingerprint has three parts:
+    content  the slide XML, with relationship ids renumbered by first use
+             and p14:creationId dropped, so a re-save does not count as an
+             edit
+    media    sha256 of every part the slide references (images, media,
+             charts, embeddings), in order of first use; notes are ignored
+    layout   the slide layout XML
+- Slides are matched by code. The report lists added, removed and changed
+  codes (with which parts changed), plus moved slides (same content, new
+  index). A change to any slide master or theme is reported for the whole
+  deck, since every slide may render differently.
+
+Output:
+  a readable report on stdout, --json PATH for the full report, and --codes
+  to print only the codes to re-export (added + changed), one per line.
+
+Usage:
+  python src/python/pptx_diff.py OLD.pptx NEW.pptx
+  python src/python/pptx_diff.py OLD.pptx NEW.pptx --json logs/pptx_diff_Rental.json
+  python src/python/pptx_diff.py OLD.pptx NEW.pptx --codes
+"""
+
+import argparse
+import hashlib
+import json
+import posixpath
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+VERSION = "v1_20261017"
+
+NS = {
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+R_ID = "{%s}id" % NS["r"]
+
+# Same settings as exp_slide_n_csv.ps1
+ACCEPTED_CODE_PREFIXES = "SDYNM"
+TRIM_SUFFIX_RE = re.compile(r"(\s*[-\u2013\u2014]\s*Service\s+Request\s+Order\s*\(SRO\))$", re.I)
+SKIP_RE = re.compile(r"^\s*(Base\s+Created|Created\s+by|Prepared\s+by)\b", re.I)
+CODE_RE = re.compile(r"^\s*([%s]\d+)\.\s*(.+?)\s*$" % ACCEPTED_CODE_PREFIXES)  # [regex]::Match: case-sensitive
+LOOSE_CODE_RE = re.compile(r"^([%s]\d+[A-Za-z0-9]*)\." % ACCEPTED_CODE_PREFIXES)
+
+EMU_PER_PT = 12700
+_REL_ATTR_RE = re.compile(rb'(r:(?:id|embed|link|pict|dm|lo|qs|cs))="([^"]+)"')
+_CREATION_ID_RE = re.compile(rb"<p14:creationId\b[^>]*/>")
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# -----------------------
+# Package reading
+# -----------------------
+
+def _rels_path(part: str) -> str:
+    d, name = posixpath.split(part)
+    return posixpath.join(d, "_rels", name + ".rels")
+
+
+def _read_rels(z: zipfile.ZipFile, part: str) -> Dict[str, Dict[str, str]]:
+    """rId -> {type, target (package path, or the URL for external links), external}."""
+    try:
+        root = ET.fromstring(z.read(_rels_path(part)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname(part)
+    out = {}
+    for rel in root.findall("rel:Relationship", NS):
+        target = rel.get("Target", "")
+        external = rel.get("TargetMode") == "External"
+        if not external:
+            target = posixpath.normpath(posixpath.join(base, target)) if not target.startswith("/") else target[1:]
+        out[rel.get("Id", "")] = {"type": rel.get("Type", "").rsplit("/", 1)[-1], "target": target,
+                                  "external": "1" if external else ""}
+    return out
+
+
+def slide_parts(z: zipfile.ZipFile) -> List[str]:
+    """Slide part names in presentation order."""
+    pres = "ppt/presentation.xml"
+    rels = _read_rels(z, pres)
+    root = ET.fromstring(z.read(pres))
+    lst = root.find("p:sldIdLst", NS)
+    return [rels[s.get(R_ID)]["target"] for s in (lst if lst is not None else []) if s.get(R_ID) in rels]
+
+
+def _shape_text(sp: ET.Element) -> str:
+    """TextRange.Text: paragraphs joined by newlines (line breaks too)."""
+    paras = []
+    for p in sp.iterfind(".//p:txBody/a:p", NS):
+        bits = []
+        for el in p:
+            tag = el.tag.rsplit("}", 1)[-1]
+            if tag in ("r", "fld"):
+                t = el.find("a:t", NS)
+                bits.append(t.text or "" if t is not None else "")
+            elif tag == "br":
+                bits.append("\n")
+        paras.append("".join(bits))
+    return "\n".join(paras)
+
+
+def _title_candidate(slide: ET.Element) -> str:
+    """The text exp_slide_n_csv.ps1 Get-TitleCandidate would pick (TextClean)."""
+    tree = slide.find("p:cSld/p:spTree", NS)
+    shapes = tree.findall("p:sp", NS) if tree is not None else []
+
+    def ph_type(sp: ET.Element) -> Optional[str]:
+        ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+        return None if ph is None else ph.get("type", "body")
+
+    def clean(txt: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"\r|\n", " ", txt)).strip()
+
+    # 1) Strong preference: a true Title placeholder
+    for sp in shapes:
+        if ph_type(sp) in ("title", "ctrTitle"):
+            t = _shape_text(sp)
+            if t.strip():
+                return clean(t)
+            break
+
+    # 2) Otherwise, score all text shapes
+    best: Tuple[float, str] = (-1.0, "")
+    for sp in shapes:
+        txt = _shape_text(sp)
+        if not txt.strip() or SKIP_RE.search(txt):
+            continue
+        score = 0.0
+        kind = ph_type(sp)
+        if kind in ("title", "ctrTitle"):
+            score += 100
+        if kind == "subTitle":
+            score += 80
+        name = (sp.find("p:nvSpPr/p:cNvPr", NS).get("name", "")
+                if sp.find("p:nvSpPr/p:cNvPr", NS) is not None else "")
+        if name.lower().startswith("title"):
+            score += 50
+        rpr = sp.find(".//a:rPr[@sz]", NS)
+        font = int(rpr.get("sz")) / 100 if rpr is not None else 0  # inherited sizes read as 0
+        score += min(font, 72)
+        off = sp.find("p:spPr/a:xfrm/a:off", NS)
+        top = int(off.get("y", "0")) / EMU_PER_PT if off is not None else 99999
+        score += max(0, 400 - min(top, 400))
+        if score > best[0]:
+            best = (score, txt)
+    return clean(best[1])
+
+
+def parse_code(title: str) -> Tuple[str, str]:
+    """Title cleanup + Parse-CodeAndShort from exp_slide_n_csv.ps1 -> (Code, cleaned title)."""
+    t = re.sub("[\u00A0\u2007\u202F\u2009\u200A\u200B]", " ", title)
+    t = re.sub("[-\u2010\u2011\u2012\u2013\u2014\u2212]", "-", t)
+    t = TRIM_SUFFIX_RE.sub("", t)
+    t = re.sub("[\u201C\u201D]", '"', t)
+    t = re.sub(r"\s+", " ", t).strip()
+    m = CODE_RE.match(t)
+    return (m.group(1) if m else ""), t
+
+
+def _normalized_xml(data: bytes) -> Tuple[bytes, List[str]]:
+    """Drop creationId and renumber rIds by first use; return (xml, rIds in that order)."""
+    data = _CREATION_ID_RE.sub(b"", data)
+    order: Dict[bytes, int] = {}
+
+    def sub(m: "re.Match[bytes]") -> bytes:
+        rid = m.group(2)
+        if rid not in order:
+            order[rid] = len(order) + 1
+        return m.group(1) + b'="R%d"' % order[rid]
+
+    data = _REL_ATTR_RE.sub(sub, data)
+    return data, [r.decode("utf-8") for r in order]
+
+
+def read_deck(path: Path) -> Dict[str, Any]:
+    """Per-slide code, title and fingerprint parts, plus a master/theme hash."""
+    with zipfile.ZipFile(path) as z:
+        names = set(z.namelist())
+        part_hash: Dict[str, str] = {}
+
+        def h(part: str) -> str:
+            if part not in part_hash:
+                part_hash[part] = _sha(_CREATION_ID_RE.sub(b"", z.read(part))) if part in names else "missing"
+            return part_hash[part]
+
+        slides = []
+        for idx, part in enumerate(slide_parts(z), 1):
+            raw = z.read(part)
+            xml, rid_order = _normalized_xml(raw)
+            rels = _read_rels(z, part)
+            media = []
+            for rid in rid_order:
+                rel = rels.get(rid)
+                if rel is None:
+                    continue
+                media.append(f"{rel['type']}:{rel['target'] if rel['external'] else h(rel['target'])}")
+            layout = next((h(r["target"]) for r in rels.values() if r["type"] == "slideLayout"), "")
+            code, title = parse_code(_title_candidate(ET.fromstring(raw)))
+            slides.append({
+                "index": idx,
+                "part": part,
+                "code": code,
+                "title": title,
+                "content": _sha(xml),
+                "media": _sha("\n".join(media).encode("utf-8")),
+                "media_parts": len(media),
+                "layout": layout,
+            })
+
+        shared = sorted(n for n in names if re.match(r"ppt/(slideMasters|theme)/[^/]+\.xml$", n))
+        masters = _sha("".join(f"{n}:{h(n)}\n" for n in shared).encode("utf-8"))
+    return {"path": str(path), "slides": slides, "masters": masters}
+
+
+# -----------------------
+# Matching
+# -----------------------
+
+def _keyed(slides: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Key slides by code, else a code-like lead token the exporter leaves blank
+    (S998a., S3a.), else the title, else slide<N>. Repeats get "#2", "#3".
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    warnings = []
+    for s in slides:
+        loose = LOOSE_CODE_RE.match(s["title"])
+        base = s["code"] or (loose.group(1) if loose else "") or \
+            (f"title:{s['title']}" if s["title"] else f"slide{s['index']}")
+        key, n = base, 1
+        while key in out:
+            n += 1
+            key = f"{base}#{n}"
+        if n > 1:
+            warnings.append(f"duplicate key {base} at slide {s['index']} (matched as {key})")
+        s["key"] = key
+        out[key] = s
+    return out, warnings
+
+
+def diff_decks(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    a, warn_a = _keyed(old["slides"])
+    b, warn_b = _keyed(new["slides"])
+
+    def brief(s: Dict[str, Any]) -> Dict[str, Any]:
+        return {"key": s["key"], "code": s["code"], "index": s["index"], "title": s["title"]}
+
+    added = [brief(b[k]) for k in b if k not in a]
+    removed = [brief(a[k]) for k in a if k not in b]
+    changed, moved, unchanged = [], [], []
+    for k in b:
+        if k not in a:
+            continue
+        o, n = a[k], b[k]
+        parts = [p for p in ("content", "media", "layout") if o[p] != n[p]]
+        if parts:
+            changed.append(dict(brief(n), old_index=o["index"], parts=parts))
+        elif o["index"] != n["index"]:
+            moved.append(dict(brief(n), old_index=o["index"]))
+        else:
+            unchanged.append(k)
+
+    deck = []
+    if old["masters"] != new["masters"]:
+        deck.append("slide masters/themes changed: every slide may render differently")
+
+    reexport = [s["code"] or s["key"] for s in added + changed]
+    return {
+        "tool": "pptx_diff",
+        "version": VERSION,
+        "old": old["path"],
+        "new": new["path"],
+        "summary": {"old_slides": len(old["slides"]), "new_slides": len(new["slides"]),
+                    "added": len(added), "removed": len(removed), "changed": len(changed),
+                    "moved": len(moved), "unchanged": len(unchanged)},
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "moved": moved,
+        "unchanged": unchanged,
+        "deck": deck,
+        "warnings": [f"old: {w}" for w in warn_a] + [f"new: {w}" for w in warn_b],
+        "reexport": reexport,
+    }
+
+
+def format_report(rep: Dict[str, Any]) -> List[str]:
+    s = rep["summary"]
+    lines = [
+        f"OLD: {rep['old']} ({s['old_slides']} slides)",
+        f"NEW: {rep['new']} ({s['new_slides']} slides)",
+        f"added={s['added']} removed={s['removed']} changed={s['changed']} "
+        f"moved={s['moved']} unchanged={s['unchanged']}",
+    ]
+    for label, items in (("Added", rep["added"]), ("Removed", rep["removed"])):
+        if items:
+            lines.append(f"{label}:")
+            lines += [f"  - {x['key']:<10} slide {x['index']:>3}  {x['title'][:70]}" for x in items]
+    if rep["changed"]:
+        lines.append("Changed:")
+        lines += [f"  - {x['key']:<10} slide {x['old_index']:>3} -> {x['index']:<3} [{', '.join(x['parts'])}]  "
+                  f"{x['title'][:60]}" for x in rep["changed"]]
+    if rep["moved"]:
+        lines.append("Moved (same content):")
+        lines += [f"  - {x['key']:<10} slide {x['old_index']:>3} -> {x['index']}" for x in rep["moved"]]
+    for d in rep["deck"]:
+        lines.append(f"DECK: {d}")
+    for w in rep["warnings"]:
+        lines.append(f"WARN: {w}")
+    lines.append(f"Re-export: {' '.join(rep['reexport']) if rep['reexport'] else '(nothing)'}")
+    return lines
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Report added/removed/changed slides between two .pptx versions")
+    ap.add_argument("old", help="Earlier .pptx")
+    ap.add_argument("new", help="Later .pptx")
+    ap.add_argument("--json", default=None, help="Write the full report as JSON here")
+    ap.add_argument("--codes", action="store_true", help="Print only the codes to re-export (added + changed)")
+    args = ap.parse_args()
+
+    for p in (args.old, args.new):
+        if not zipfile.is_zipfile(p):
+            print(f"ERROR: not a .pptx (zip) file: {p}", file=sys.stderr)
+            return 2
+
+    rep = diff_decks(read_deck(Path(args.old)), read_deck(Path(args.new)))
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(rep, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.codes:
+        print("\n".join(rep["reexport"]))
+    else:
+        print("\n".join(format_report(rep)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+precompress.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Write precompressed siblings (<file>.gz, <file>.br) next to a built output so
+a static host can serve them directly.
+
+- gzip always works (stdlib). Output is deterministic (mtime=0) so unchanged
+  inputs give byte-identical .gz files.
+- Brotli is optional: install with `pip install brotli`. Without it, no .br
+  file is written and the size report shows br=None.
+
+Usage:
+  python src/python/precompress.py docs/outputs/story/TechMobile/story.json [...]
+"""
+
+import argparse
+import gzip
+import os
+from typing import Dict, Optional
+
+try:
+    import brotli  # optional
+    HAVE_BROTLI = True
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+    HAVE_BROTLI = False
+
+VERSION = "v1_20261017"
+
+
+def gzip_bytes(data: bytes, level: int = 9) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def brotli_bytes(data: bytes, quality: int = 11) -> Optional[bytes]:
+    if not HAVE_BROTLI:
+        return None
+    return brotli.compress(data, quality=quality)
+
+
+def sibling_paths(path: str) -> Dict[str, str]:
+    """Paths precompress() writes for `path` in this environment."""
+    out = {"gz": path + ".gz"}
+    if HAVE_BROTLI:
+        out["br"] = path + ".br"
+    return out
+
+
+def write_precompressed(path: str) -> Dict[str, Optional[int]]:
+    """
+    Write <path>.gz (and <path>.br when brotli is installed).
+    Returns byte counts: {"raw": ..., "gz": ..., "br": ... or None}.
+    A stale .br from an earlier run is removed when brotli is unavailable.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    sizes: Dict[str, Optional[int]] = {"raw": len(data)}
+
+    gz = gzip_bytes(data)
+    with open(path + ".gz", "wb") as f:
+        f.write(gz)
+    sizes["gz"] = len(gz)
+
+    br = brotli_bytes(data)
+    if br is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(br)
+        sizes["br"] = len(br)
+    else:
+        if os.path.exists(path + ".br"):
+            os.remove(path + ".br")
+        sizes["br"] = None
+
+    return sizes
+
+
+def format_sizes(sizes: Dict[str, Optional[int]]) -> str:
+    return " ".join(f"{k}={'n/a' if v is None else v}" for k, v in sizes.items())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write .gz/.br siblings for built outputs")
+    ap.add_argument("paths", nargs="+")
+    args = ap.parse_args()
+    for p in args.paths:
+        print(f"{p}: {format_sizes(write_precompressed(p))}")
+
+
+if __name__ == "__main__":
+    main()
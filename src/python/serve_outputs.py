@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+serve_outputs.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Local static server for docs/outputs that behaves like the production host,
+so cache behaviour can be tried and measured before publishing.
+
+- Content negotiation: when the client's Accept-Encoding allows it and a
+  fresh <file>.br / <file>.gz sibling exists (precompress.py, compact
+  profile), that sibling is sent with Content-Encoding and
+  Vary: Accept-Encoding. Nothing is compressed on the fly.
+- Strong ETags: "<sha256 prefix>" of the bytes actually sent (so each
+  encoding has its own ETag), cached per (path, size, mtime). A matching
+  If-None-Match gets 304 Not Modified with no body.
+- Cache-Control:
+    fingerprinted names (S001.3f9c2a71be.png, see fingerprint_assets.py)
+    and image store objects (store/8eb1292c2252f896.png, see image_store.py)
+        public, max-age=31536000, immutable
+    everything else
+        no-cache   (always revalidate; a repeat visit costs one 304)
+- GET /__stats returns the counters as JSON: requests by status, bytes sent,
+  bytes the identity encoding would have cost, and 304 / compressed hit
+  counts. The same summary is printed on Ctrl+C.
+
+Usage:
+  python src/python/serve_outputs.py                      # docs/outputs on :8080
+  python src/python/serve_outputs.py --root publish_test/docs --port 8080
+  curl -s http://127.0.0.1:8080/__stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import fingerprint_assets
+import image_store
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+STATS_PATH = "/__stats"
+
+# Preferred order when the client accepts several.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}; "*" is kept as its own key."""
+    out: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        bits = [b.strip() for b in part.split(";")]
+        if not bits[0]:
+            continue
+        q = 1.0
+        for b in bits[1:]:
+            if b.startswith("q="):
+                try:
+                    q = float(b[2:])
+                except ValueError:
+                    q = 0.0
+        out[bits[0].lower()] = q
+    return out
+
+
+def choose_representation(path: str, accept: Dict[str, float]) -> Tuple[str, Optional[str]]:
+    """(file to send, Content-Encoding or None). Stale siblings (older than the source) are ignored."""
+    try:
+        src_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+    for coding, ext in ENCODINGS:
+        q = accept.get(coding, accept.get("*", 0.0))
+        if q <= 0:
+            continue
+        try:
+            st = os.stat(path + ext)
+        except OSError:
+            continue
+        if st.st_mtime_ns >= src_mtime:
+            return path + ext, coding
+    return path, None
+
+
+class ETagCache:
+    """Strong ETag per file, recomputed only when size or mtime changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags: Dict[str, Tuple[int, int, str]] = {}
+
+    def get(self, path: str, st: os.stat_result) -> str:
+        with self._lock:
+            hit = self._tags.get(path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        tag = '"' + h.hexdigest()[:32] + '"'
+        with self._lock:
+            self._tags[path] = (st.st_size, st.st_mtime_ns, tag)
+        return tag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for t in header.split(","):
+        t = t.strip()
+        if t == "*" or t == etag or (t.startswith("W/") and t[2:] == etag):
+            return True
+    return False
+
+
+def cache_control(url_path: str) -> str:
+    if fingerprint_assets.FINGERPRINT_RE.search(url_path) or image_store.OBJECT_RE.search(url_path):
+        return IMMUTABLE
+    return REVALIDATE
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.by_status: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_identity = 0
+        self.not_modified = 0
+        self.encoded: Dict[str, int] = {}
+        self.immutable = 0
+
+    def record(self, status: int, sent: int, identity: int, coding: Optional[str], immutable: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+            self.bytes_sent += sent
+            self.bytes_identity += identity
+            if status == 304:
+                self.not_modified += 1
+            if coding and status == 200:
+                self.encoded[coding] = self.encoded.get(coding, 0) + 1
+            if immutable:
+                self.immutable += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            saved = self.bytes_identity - self.bytes_sent
+            return {
+                "requests": self.requests,
+                "by_status": dict(self.by_status),
+                "not_modified": self.not_modified,
+                "encoded": dict(self.encoded),
+                "immutable_responses": self.immutable,
+                "bytes_sent": self.bytes_sent,
+                "bytes_identity": self.bytes_identity,
+                "bytes_saved": saved,
+                "saved_pct": round(100.0 * saved / self.bytes_identity, 1) if self.bytes_identity else 0.0,
+            }
+
+
+class OutputsHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real host
+    etags: ETagCache
+    stats: Stats
+    quiet: bool = False
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _serve(self, head: bool) -> None:
+        url_path = unquote(urlsplit(self.path).path)
+        if url_path == STATS_PATH:
+            body = json.dumps(self.stats.snapshot(), indent=2).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not os.path.isfile(index):
+                # Directory listing / trailing-slash redirect as before.
+                return super().do_HEAD() if head else super().do_GET()
+            if not url_path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path, url_path = index, url_path + "index.html"
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            self.stats.record(404, 0, 0, None, False)
+            return
+
+        rep, coding = choose_representation(path, accepted_encodings(self.headers.get("Accept-Encoding")))
+        st = os.stat(rep)
+        identity = st.st_size if rep == path else os.stat(path).st_size
+        etag = self.etags.get(rep, st)
+        cc = cache_control(url_path)
+
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._common_headers(etag, cc)
+            self.end_headers()
+            self.stats.record(304, 0, identity, coding, cc == IMMUTABLE)
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(st.st_size))
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        self._common_headers(etag, cc)
+        self.end_headers()
+        if not head:
+            with open(rep, "rb") as f:
+                self.copyfile(f, self.wfile)
+        self.stats.record(200, 0 if head else st.st_size, 0 if head else identity, coding, cc == IMMUTABLE)
+
+    def _common_headers(self, etag: str, cc: str) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cc)
+        self.send_header("Vary", "Accept-Encoding")
+
+
+def make_server(root: Path, host: str, port: int, quiet: bool = False) -> ThreadingHTTPServer:
+    handler = type("Handler", (OutputsHandler,), {"etags": ETagCache(), "stats": Stats(), "quiet": quiet})
+    httpd = ThreadingHTTPServer((host, port), partial(handler, directory=str(root)))
+    httpd.daemon_threads = True
+    httpd.stats = handler.stats  # type: ignore[attr-defined]
+    return httpd
+
+
+def format_stats(s: Dict[str, object]) -> List[str]:
+    return [
+        f"requests: {s['requests']}  by status: {s['by_status']}",
+        f"304 not modified: {s['not_modified']}  compressed: {s['encoded']}  immutable: {s['immutable_responses']}",
+        f"bytes sent: {s['bytes_sent']}  identity would be: {s['bytes_identity']}  saved: {s['saved_pct']}%",
+    ]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Serve docs/outputs with br/gz negotiation, ETags and immutable fingerprinted assets")
+    ap.add_argument("--root", default=str(REPO_ROOT / "docs" / "outputs"), help="Folder to serve (default: docs/outputs)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--quiet", action="store_true", help="No per-request access log")
+    args = ap.parse_args()
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"ERROR: missing {root}", file=sys.stderr)
+        return 2
+    httpd = make_server(root, args.host, args.port, args.quiet)
+    print(f"Serving: {root}")
+    print(f"URL: http://{args.host}:{args.port}/   stats: http://{args.host}:{args.port}{STATS_PATH}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        httpd.server_close()
+        print("\n".join(format_stats(httpd.stats.snapshot())))  # type: ignore[attr-defined]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
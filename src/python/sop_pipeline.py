@@ -0,0 +1,867 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sop_pipeline.py
+
+Purpose:
+  Run the per-SOP build chain in ONE interpreter, as a small dependency graph:
+
+    ENH_UPD --ready--> READY CSV --validate_env
+                           |
+                           +--story--> story.json --validate_story--> player --> *_player.html
+
+  Every stage calls the existing tool in-process (enh_upd_to_ready.convert,
+  validate_env_sop_build.validate, csv_to_story.write_story,
+  validate_story_v1a.validate_story, build_player.build).
+
+  Each stage is fingerprinted from:
+    - the bytes of its input files (CSV, story.json, template)
+    - a listing of any input folders it checks (e.g. the SOP images dir)
+    - the tool's VERSION / BUILD_VERSION plus a hash of the tool source
+    - the stage parameters (CLI args)
+  A stage whose fingerprint matches the last successful run, and whose outputs
+  are still byte-identical to what that run wrote, is skipped.
+
+  State lives in outputs/pipeline_state/<SOP_ID>.json (one file per SOP).
+
+  --optimize-images adds an "images" stage (optimize_images.py) ahead of
+  "story"; its variants.json then feeds csv_to_story --image-variants.
+
+  --tts <backend> adds an "audio" stage (synth_audio.py) ahead of "story": it
+  synthesizes every frame's narr1/narr3 into docs/outputs/audio/ (cached by
+  text + voice settings) and writes <SOP>.audio.json, which feeds
+  csv_to_story --audio-manifest.
+
+  --text-fix (repair | ascii | off) is passed to every stage that reads
+  narration text: ready, story and audio (text_normalize.py).
+
+  --image-store makes "story" and "player" point slide images at the shared,
+  content-addressed <outputs>/store (image_store.py; csv_to_story and
+  build_player --image-store). The SOP images folder then becomes an input
+  of "story". --image-store-perceptual also merges visually identical slides.
+
+  --fused drops the "ready" stage: "story" reads the ENH_UPD CSV directly
+  (csv_to_story --enh-upd) and writes the READY CSV as a side output, which
+  validate_env then checks. story.json is identical either way.
+
+  build-all reads the SOP registry (config/sop_registry.json) and fans the
+  per-SOP chain out across a process pool. One failed SOP never aborts the
+  others; a per-SOP status/timing summary is printed at the end.
+
+  After the SOPs are built, build / build-all refresh docs/outputs/catalog.json
+  (build_catalog.py; incremental, only changed stories are re-read) for every
+  outputs tree the built stories live in. --no-catalog skips it. Ahead of it,
+  the FAQ / quiz markdown in inputs/Faq_QuizDocs is compiled into
+  <outputs>/faq|quiz (build_faq_quiz.py; cached by source hash, story links
+  cross-checked); --no-faq-quiz skips it. The search
+  index (build_search_index.py, docs/outputs/search) is rebuilt next;
+  --no-search-index skips it.
+
+  Both validators resolve image/FAQ/quiz references against one shared
+  fs_index.FsIndex of docs/outputs per process (one scandir walk, then only
+  folders whose mtime moved are re-read) instead of stat-ing every reference.
+
+Note:
+  The env check uses validate_env_sop_build.py (the image/Code check whose logs
+  are in logs/*_validate_*.log). validate_env.py's header list targets the old
+  mk_tw_in CSV layout and rejects ENH_UPD-derived READY files.
+
+Version:
+  SOP_BUILD_pipeline_v1.1
+Date:
+  2026-10-17 America/New_York
+
+Usage:
+  python src/python/sop_pipeline.py build --sop-id TechMobile \\
+    --enh-upd inputs/raw/TechMobile_map_20260112_1450_READYBASE_ENH_UPD.csv \\
+    --images  docs/outputs/images/TechMobile \\
+    --story   docs/outputs/story/TechMobile/story.json \\
+    --player  docs/outputs/players/TechMobile_player.html
+
+  python src/python/sop_pipeline.py build-all --workers 4
+  python src/python/sop_pipeline.py build-all --only TechMobile PMA
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import build_catalog
+import build_events
+import build_faq_quiz
+import build_player
+import build_search_index
+import csv_to_story
+import enh_upd_to_ready
+import fs_index
+import image_store
+import optimize_images
+import precompress
+import synth_audio
+import text_normalize
+import validate_env_sop_build
+import validate_story_v1a
+
+
+NY_TZ = ZoneInfo("America/New_York")
+PIPELINE_VERSION = "SOP_BUILD_pipeline_v1.1"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_REGISTRY = Path("config/sop_registry.json")
+
+
+class StageError(Exception):
+    """Raised by a stage runner when the stage ran but its checks failed."""
+
+
+# -----------------------
+# Fingerprinting
+# -----------------------
+
+def _sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dir_listing(d: Path) -> List[List[Any]]:
+    """Cheap folder fingerprint: (name, size, mtime_ns) per file, sorted."""
+    if not d.is_dir():
+        return []
+    out = []
+    with os.scandir(d) as it:
+        for e in it:
+            if e.is_file():
+                st = e.stat()
+                out.append([e.name, st.st_size, st.st_mtime_ns])
+    out.sort()
+    return out
+
+
+_TOOL_FP_CACHE: Dict[str, str] = {}
+
+
+def tool_fingerprint(mod: ModuleType) -> str:
+    """VERSION/BUILD_VERSION of a tool module plus a hash of its source file."""
+    name = mod.__name__
+    if name not in _TOOL_FP_CACHE:
+        version = getattr(mod, "VERSION", None) or getattr(mod, "BUILD_VERSION", "")
+        src = Path(mod.__file__)
+        _TOOL_FP_CACHE[name] = f"{version}:{_sha256_file(src)}"
+    return _TOOL_FP_CACHE[name]
+
+
+# -----------------------
+# Graph model
+# -----------------------
+
+@dataclass
+class SopSpec:
+    sop_id: str
+    enh_upd: Path
+    images: Path
+    story: Path
+    player: Path
+    ready: Optional[Path] = None
+    template: Optional[Path] = None
+
+    def resolved(self, repo_root: Path) -> "SopSpec":
+        def r(p: Optional[Path]) -> Optional[Path]:
+            if p is None:
+                return None
+            return p if p.is_absolute() else repo_root / p
+
+        ready = self.ready or Path("outputs/build_in") / f"{self.sop_id}_mk_tw_in_READY.csv"
+        template = self.template or Path("src/templates/sop_player.html")
+        return SopSpec(
+            sop_id=self.sop_id,
+            enh_upd=r(self.enh_upd),
+            images=r(self.images),
+            story=r(self.story),
+            player=r(self.player),
+            ready=r(ready),
+            template=r(template),
+        )
+
+
+@dataclass
+class Stage:
+    name: str
+    tool: ModuleType
+    deps: List[str]
+    inputs: List[Path]
+    outputs: List[Path]
+    params: Dict[str, Any]
+    run: Callable[[], str]
+    input_dirs: List[Path] = field(default_factory=list)
+    # Filled by run() with rows/frames for the build event.
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    def fingerprint(self) -> str:
+        doc = {
+            "stage": self.name,
+            "tool": tool_fingerprint(self.tool),
+            "params": self.params,
+            "inputs": {str(p): _sha256_file(p) for p in self.inputs},
+            "input_dirs": {str(d): _dir_listing(d) for d in self.input_dirs},
+        }
+        blob = json.dumps(doc, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # ran | skipped | failed | blocked
+    seconds: float = 0.0
+    detail: str = ""
+
+
+@dataclass
+class SopResult:
+    sop_id: str
+    stages: List[StageResult]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return all(s.status in ("ran", "skipped") for s in self.stages)
+
+
+def _stamp() -> str:
+    # Log-name stamps are UTC, like the older Codespaces logs (build_history.py relies on it).
+    return datetime.now(timezone.utc).strftime("%m%d%y_%H%M")
+
+
+def build_stages(spec: SopSpec, log_dir: Path, params: Dict[str, Any], repo_root: Path = REPO_ROOT) -> List[Stage]:
+    """
+    Declare the per-SOP graph. Order is topological; deps name upstream stages.
+    `spec` must already be resolved against the repo root.
+    """
+    sop = spec.sop_id
+    outputs_root = spec.player.parent.parent
+    profile = params.get("output_profile", "pretty")
+    optimize = bool(params.get("optimize_images"))
+    fused = bool(params.get("fused"))
+    intern = bool(params.get("intern"))
+    tts = params.get("tts")
+    store = bool(params.get("image_store"))
+    store_params = ({"image_store": True, "image_store_perceptual": bool(params.get("image_store_perceptual"))}
+                    if store else {})
+    text_fix = params.get("text_fix") or text_normalize.DEFAULT_TEXT_FIX
+    # ready / story / audio all clean text through text_normalize; its source is part of their fingerprint.
+    text_params = {"text_fix": text_fix, "text_tool": tool_fingerprint(text_normalize)}
+    audio_dir = outputs_root / "audio"
+    audio_manifest = synth_audio.manifest_path(audio_dir, sop)
+    tts_settings = synth_audio.TtsSettings(
+        tts or "", params.get("tts_voice") or synth_audio.DEFAULT_VOICE,
+        int(params.get("tts_rate") or synth_audio.DEFAULT_RATE), "wav" if tts == "stub" else "mp3",
+    )
+    variants = spec.images / "opt" / optimize_images.MANIFEST_NAME
+    metrics: Dict[str, Dict[str, Any]] = defaultdict(dict)
+
+    def packed(p: Path) -> List[Path]:
+        if profile != "compact":
+            return [p]
+        return [p] + [Path(x) for x in precompress.sibling_paths(str(p)).values()]
+
+    def run_ready() -> str:
+        rows = enh_upd_to_ready.convert(spec.enh_upd, spec.ready, text_fix=text_fix)
+        metrics["ready"]["rows"] = rows
+        return f"{rows} rows"
+
+    def outputs_index() -> fs_index.FsIndex:
+        # One walk of docs/outputs per process, refreshed (changed folders only) per use.
+        return fs_index.shared_index([outputs_root])
+
+    def run_validate_env() -> str:
+        res = validate_env_sop_build.validate(
+            spec.ready, spec.images, log_dir / f"{sop}_validate_{_stamp()}.log", outputs_index()
+        )
+        metrics["validate_env"]["rows"] = res["rows"]
+        if res["missing_images"]:
+            raise StageError(f"{len(res['missing_images'])} image(s) missing in {spec.images}")
+        return f"{res['rows']} rows, {len(res['empty_images'])} without image"
+
+    def run_images() -> str:
+        m = optimize_images.optimize_dir(spec.images, cache_dir=repo_root / "outputs" / "image_cache")
+        t = m["totals"]
+        metrics["images"]["rows"] = t["images"]
+        return f"{t['images']} images, {m['cache_hits']} cached, {t['src_bytes']} -> {t['png_bytes']} png bytes"
+
+    def run_audio() -> str:
+        res = synth_audio.build_audio(str(spec.enh_upd if fused else spec.ready), sop, audio_dir, tts_settings,
+                                      fused=fused, text_fix=text_fix)
+        metrics["audio"]["rows"] = res["texts"]
+        return f"{len(res['audio'])} clip(s), {res['synthesized']} synthesized, {res['cached']} cached"
+
+    def run_story() -> str:
+        info = csv_to_story.write_story(
+            str(spec.enh_upd if fused else spec.ready), sop, str(spec.story),
+            str(log_dir / f"csv_to_story_{sop}_{_stamp()}.log"),
+            stream=True, output_profile=profile, image_variants=str(variants) if optimize else None,
+            fused=fused, ready_out=str(spec.ready) if fused else None, intern=intern,
+            audio_manifest=str(audio_manifest) if tts else None, text_fix=text_fix,
+            image_store_dir=str(outputs_root / image_store.STORE_DIR_NAME) if store else None,
+            image_store_perceptual=bool(params.get("image_store_perceptual")),
+        )
+        metrics["story"]["frames"] = info["frames"]
+        if fused:
+            metrics["story"]["rows"] = info["frames"]
+        if profile == "compact":
+            return f"{info['frames']} frames, {precompress.format_sizes(info['sizes'])}"
+        return f"{info['frames']} frames"
+
+    def run_validate_story() -> str:
+        story = validate_story_v1a.load_json(str(spec.story))
+        metrics["validate_story"]["frames"] = metrics["player"]["frames"] = len(story.get("frames", []))
+        # Story asset paths are relative to the players folder.
+        errors, warns = validate_story_v1a.validate_story(
+            story, str(spec.player.parent), True, outputs_index()
+        )
+        if errors:
+            uniq = list(dict.fromkeys(errors))
+            raise StageError("; ".join(uniq[:5]) + (" ..." if len(uniq) > 5 else ""))
+        g = validate_story_v1a.analyze_graph(story)
+        return (f"{len(warns)} warning(s), graph: {len(g['unreachable'])} unreachable, "
+                f"{len(g['dead_ends'])} dead end(s), {len(g['traps'])} trap cycle(s)")
+
+    def run_player() -> str:
+        a = build_player.Args(
+            story=spec.story,
+            out=spec.player,
+            title=params.get("title"),
+            mode=params.get("mode", "dev"),
+            image_width=int(params.get("image_width", 65)),
+            exit_href=params.get("exit_href", "index.html"),
+            template=spec.template,
+            story_web=params.get("story_web"),
+            log=log_dir / f"build_player_{sop}_{_stamp()}.log",
+            output_profile=profile,
+            preload_start_image=bool(params.get("preload_start_image")),
+            fingerprint_assets=bool(params.get("fingerprint_assets")),
+            image_store=store,
+            image_store_perceptual=bool(params.get("image_store_perceptual")),
+            lazy_narration=bool(params.get("lazy_narration")),
+            shard_frames=int(params.get("shard_frames") or build_player.DEFAULT_SHARD_FRAMES),
+        )
+        build_player.build(a)
+        detail = f"{spec.player.stat().st_size} bytes"
+        if profile == "compact":
+            detail += ", " + " ".join(f"{p.suffix[1:]}={p.stat().st_size}" for p in packed(spec.player)[1:])
+        return detail
+
+    # --lazy-narration shard names carry content hashes; the manifest is the stable output.
+    player_extra = ([build_player.lazy_dir_for(spec.player) / build_player.LAZY_MANIFEST]
+                    if params.get("lazy_narration") else [])
+
+    if fused:
+        # One pass ENH_UPD -> story.json; the READY CSV is its side output
+        # (validate_env still reads it).
+        head = [
+            Stage("story", csv_to_story, ["images"] if optimize else [],
+                  [spec.enh_upd] + ([variants] if optimize else []), packed(spec.story) + [spec.ready],
+                  {"sop_id": sop, "stream": True, "output_profile": profile, "fused": True, "intern": intern,
+                   "ready_tool": tool_fingerprint(enh_upd_to_ready), **text_params, **store_params}, run_story),
+            Stage("validate_env", validate_env_sop_build, ["story"], [spec.ready], [], {},
+                  run_validate_env, input_dirs=[spec.images]),
+        ]
+    else:
+        head = [
+            Stage("ready", enh_upd_to_ready, [], [spec.enh_upd], [spec.ready], dict(text_params), run_ready),
+            Stage("validate_env", validate_env_sop_build, ["ready"], [spec.ready], [], {},
+                  run_validate_env, input_dirs=[spec.images]),
+            Stage("story", csv_to_story, ["ready"] + (["images"] if optimize else []),
+                  [spec.ready] + ([variants] if optimize else []), packed(spec.story),
+                  {"sop_id": sop, "stream": True, "output_profile": profile, "intern": intern, **text_params,
+                   **store_params},
+                  run_story),
+        ]
+    if store:
+        # Store URLs are content hashes of the slides: a re-exported image changes story.json.
+        story_stage = next(st for st in head if st.name == "story")
+        story_stage.input_dirs.append(spec.images)
+    if tts:
+        # Audio files are shared across SOPs; the folder listing brings back deleted clips.
+        story_stage = next(st for st in head if st.name == "story")
+        story_stage.deps.append("audio")
+        story_stage.inputs.append(audio_manifest)
+        head.insert(head.index(story_stage), Stage(
+            "audio", synth_audio, [] if fused else ["ready"], [spec.enh_upd if fused else spec.ready],
+            [audio_manifest], {"sop_id": sop, "fused": fused, "settings": asdict(tts_settings), **text_params},
+            run_audio,
+            input_dirs=[audio_dir]))
+
+    stages = head + [
+        Stage("validate_story", validate_story_v1a, ["story"], [spec.story], [], {"check_files": True},
+              run_validate_story,
+              input_dirs=[spec.images, outputs_root / "faq", outputs_root / "quiz"] + ([audio_dir] if tts else [])
+              + ([outputs_root / image_store.STORE_DIR_NAME] if store else [])),
+        Stage("player", build_player, ["validate_story"], [spec.story, spec.template],
+              packed(spec.player) + player_extra, dict(params), run_player),
+    ]
+    if optimize:
+        stages.insert(0, Stage("images", optimize_images, [], [], [variants], {}, run_images,
+                               input_dirs=[spec.images]))
+    for st in stages:
+        st.metrics = metrics[st.name]
+    return stages
+
+
+# -----------------------
+# State
+# -----------------------
+
+def _load_state(p: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(p: Path, state: Dict[str, Any]) -> None:
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, p)
+
+
+def _outputs_intact(recorded: Dict[str, str], outputs: List[Path]) -> bool:
+    for p in outputs:
+        if not p.is_file() or recorded.get(str(p)) != _sha256_file(p):
+            return False
+    return True
+
+
+# -----------------------
+# Runner
+# -----------------------
+
+def run_sop(
+    spec: SopSpec,
+    repo_root: Path = REPO_ROOT,
+    state_dir: Optional[Path] = None,
+    log_dir: Optional[Path] = None,
+    params: Optional[Dict[str, Any]] = None,
+    force: bool = False,
+    run_id: Optional[str] = None,
+    targets: Optional[List[str]] = None,
+) -> SopResult:
+    """
+    Run the SOP's stages in order. With `targets` (stage names, as sop_watch.py
+    passes them) only those stages and their downstream are considered; any
+    other stage that has a recorded run and existing outputs is reported
+    "skipped" without being fingerprinted.
+    """
+    t_sop = time.perf_counter()
+    spec = spec.resolved(repo_root)
+    state_dir = state_dir or repo_root / "outputs" / "pipeline_state"
+    log_dir = log_dir or repo_root / "logs"
+    state_path = state_dir / f"{spec.sop_id}.json"
+
+    state = _load_state(state_path)
+    stage_state: Dict[str, Any] = state.setdefault("stages", {})
+    state["sop_id"] = spec.sop_id
+    state["pipeline"] = PIPELINE_VERSION
+
+    results: Dict[str, StageResult] = {}
+    stages = build_stages(spec, log_dir, params or {}, repo_root)
+    affected = _downstream(stages, targets) if targets is not None else None
+    for st in stages:
+        t0 = time.perf_counter()
+        bad_deps = [d for d in st.deps if results[d].status in ("failed", "blocked")]
+        if bad_deps:
+            results[st.name] = StageResult(st.name, "blocked", 0.0, f"upstream: {', '.join(bad_deps)}")
+            continue
+
+        prev = stage_state.get(st.name) or {}
+        if (
+            affected is not None
+            and st.name not in affected
+            and prev.get("fingerprint")
+            and all(p.is_file() for p in st.outputs)
+        ):
+            results[st.name] = StageResult(st.name, "skipped", time.perf_counter() - t0, prev.get("detail", ""))
+            continue
+
+        try:
+            fp = st.fingerprint()
+            if (
+                not force
+                and prev.get("fingerprint") == fp
+                and _outputs_intact(prev.get("outputs", {}), st.outputs)
+            ):
+                results[st.name] = StageResult(st.name, "skipped", time.perf_counter() - t0, prev.get("detail", ""))
+                continue
+
+            detail = st.run()
+            stage_state[st.name] = {
+                "fingerprint": fp,
+                "outputs": {str(p): _sha256_file(p) for p in st.outputs},
+                "detail": detail,
+                "finished": datetime.now(NY_TZ).isoformat(timespec="seconds"),
+            }
+            results[st.name] = StageResult(st.name, "ran", time.perf_counter() - t0, detail)
+        except (Exception, SystemExit) as e:  # tools signal bad input via SystemExit
+            stage_state.pop(st.name, None)
+            msg = str(e) or e.__class__.__name__
+            results[st.name] = StageResult(st.name, "failed", time.perf_counter() - t0, msg)
+
+    _save_state(state_path, state)
+    _emit_events(spec.sop_id, stages, results, run_id or build_events.new_run_id(), log_dir)
+    return SopResult(spec.sop_id, list(results.values()), time.perf_counter() - t_sop)
+
+
+def _downstream(stages: List[Stage], targets: List[str]) -> set:
+    """Names of `targets` plus every stage that depends on them (stages are in topological order)."""
+    out = set(targets)
+    for st in stages:
+        if any(d in out for d in st.deps):
+            out.add(st.name)
+    return out
+
+
+def _emit_events(sop_id: str, stages: List[Stage], results: Dict[str, StageResult],
+                 run_id: str, log_dir: Path) -> None:
+    """One build event per stage (see build_events.py); "ran" is recorded as "ok"."""
+    for st in stages:
+        r = results[st.name]
+        produced = r.status in ("ran", "skipped")
+        build_events.emit(
+            st.name, sop_id, "ok" if r.status == "ran" else r.status, r.seconds,
+            tool=st.tool.__name__,
+            tool_version=getattr(st.tool, "VERSION", None) or getattr(st.tool, "BUILD_VERSION", ""),
+            run_id=run_id,
+            log_dir=log_dir,
+            out=st.outputs[0] if st.outputs else None,
+            output_bytes=build_events.file_bytes(*st.outputs) if produced else None,
+            detail=r.detail,
+            **st.metrics,
+        )
+
+
+def _run_sop_quiet(
+    spec: SopSpec,
+    repo_root: Path,
+    state_dir: Optional[Path],
+    log_dir: Optional[Path],
+    params: Dict[str, Any],
+    force: bool,
+    run_id: Optional[str] = None,
+    targets: Optional[List[str]] = None,
+) -> SopResult:
+    """Pool worker: tool chatter goes to the per-stage log files, not stdout."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_sop(spec, repo_root, state_dir, log_dir, params, force, run_id, targets)
+
+
+def run_all(
+    specs: List[SopSpec],
+    repo_root: Path = REPO_ROOT,
+    state_dir: Optional[Path] = None,
+    log_dir: Optional[Path] = None,
+    params: Optional[Dict[str, Any]] = None,
+    force: bool = False,
+    workers: Optional[int] = None,
+) -> List[SopResult]:
+    """
+    Build every SOP in `specs`, up to `workers` at a time (default: CPU count).
+    Results come back in registry order whatever the completion order was.
+    """
+    params = params or {}
+    run_id = build_events.new_run_id()  # one id for every stage of every SOP in this run
+    workers = max(1, min(workers or os.cpu_count() or 1, len(specs) or 1))
+    by_id: Dict[str, SopResult] = {}
+
+    if workers == 1:
+        for spec in specs:
+            by_id[spec.sop_id] = _run_sop_quiet(spec, repo_root, state_dir, log_dir, params, force, run_id)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futs = {
+                pool.submit(_run_sop_quiet, spec, repo_root, state_dir, log_dir, params, force, run_id): spec
+                for spec in specs
+            }
+            for fut in as_completed(futs):
+                spec = futs[fut]
+                try:
+                    by_id[spec.sop_id] = fut.result()
+                except Exception as e:  # worker died; keep going with the rest
+                    by_id[spec.sop_id] = SopResult(
+                        spec.sop_id, [StageResult("worker", "failed", 0.0, str(e) or e.__class__.__name__)], 0.0
+                    )
+
+    return [by_id[s.sop_id] for s in specs]
+
+
+def load_registry(path: Path, repo_root: Path = REPO_ROOT) -> List[SopSpec]:
+    """
+    Read config/sop_registry.json:
+      { "defaults": {"template": ...}, "sops": [ {sop_id, enh_upd, images, story, player, [ready], [template]} ] }
+    Paths are repo-relative unless absolute.
+    """
+    p = path if path.is_absolute() else repo_root / path
+    if not p.exists():
+        raise FileNotFoundError(f"SOP registry not found: {p}")
+    reg = json.loads(p.read_text(encoding="utf-8"))
+    defaults = reg.get("defaults") or {}
+
+    specs: List[SopSpec] = []
+    for i, ent in enumerate(reg.get("sops") or []):
+        missing = [k for k in ("sop_id", "enh_upd", "images", "story", "player") if not ent.get(k)]
+        if missing:
+            raise ValueError(f"{p}: sops[{i}] missing {', '.join(missing)}")
+        ready = ent.get("ready") or defaults.get("ready")
+        template = ent.get("template") or defaults.get("template")
+        specs.append(SopSpec(
+            sop_id=ent["sop_id"],
+            enh_upd=Path(ent["enh_upd"]),
+            images=Path(ent["images"]),
+            story=Path(ent["story"]),
+            player=Path(ent["player"]),
+            ready=Path(ready.format(sop_id=ent["sop_id"])) if ready else None,
+            template=Path(template) if template else None,
+        ))
+    return specs
+
+
+def _outputs_roots(specs: List[SopSpec], repo_root: Path) -> List[Path]:
+    """Outputs trees (<outputs>/story/<SOP>/story.json) the specs write to."""
+    roots: List[Path] = []
+    for spec in specs:
+        story = spec.resolved(repo_root).story
+        if story.parent.parent.name == "story" and story.parent.parent.parent not in roots:
+            roots.append(story.parent.parent.parent)
+    return roots
+
+
+def refresh_catalogs(specs: List[SopSpec], repo_root: Path, state_dir: Optional[Path],
+                     compact: bool) -> List[Dict[str, Any]]:
+    """Update catalog.json in each outputs tree the specs write to."""
+    state_dir = state_dir or repo_root / "outputs" / "pipeline_state"
+    return [build_catalog.update_catalog(root, state_dir / build_catalog.STATE_NAME, compact)
+            for root in _outputs_roots(specs, repo_root)]
+
+
+def print_catalogs(summaries: List[Dict[str, Any]]) -> None:
+    for res in summaries:
+        state = "written" if res["written"] else "unchanged"
+        changed = f" (changed: {', '.join(res['changed'])})" if res["changed"] else ""
+        print(f"catalog: {res['out']} {state}, {res['sops']} SOP(s){changed}")
+
+
+def refresh_faq_quiz(specs: List[SopSpec], repo_root: Path, state_dir: Optional[Path]) -> List[Dict[str, Any]]:
+    """Compile the FAQ / quiz sources into each outputs tree the specs write to."""
+    state_dir = state_dir or repo_root / "outputs" / "pipeline_state"
+    docs_dir = repo_root / "inputs" / "Faq_QuizDocs"
+    template = repo_root / "src" / "templates" / build_faq_quiz.DEFAULT_TEMPLATE.name
+    if not template.is_file():
+        template = build_faq_quiz.DEFAULT_TEMPLATE
+    return [dict(build_faq_quiz.compile_all(docs_dir, root, template, state_dir / build_faq_quiz.STATE_NAME), root=root)
+            for root in _outputs_roots(specs, repo_root)]
+
+
+def print_faq_quiz(summaries: List[Dict[str, Any]]) -> None:
+    for res in summaries:
+        build_faq_quiz.print_result(res, label=f"faq/quiz: {res['root']} ")
+
+
+def refresh_search_indexes(specs: List[SopSpec], repo_root: Path) -> List[Dict[str, Any]]:
+    """Rebuild <outputs>/search in each outputs tree the specs write to."""
+    docs_dir = repo_root / "inputs" / "Faq_QuizDocs"
+    template = repo_root / "src" / "templates" / build_search_index.DEFAULT_TEMPLATE.name
+    if not template.is_file():
+        template = build_search_index.DEFAULT_TEMPLATE
+    return [build_search_index.build_index(root, docs_dir, template) for root in _outputs_roots(specs, repo_root)]
+
+
+def print_search_indexes(summaries: List[Dict[str, Any]]) -> None:
+    for res in summaries:
+        print(f"search: {res['out']} {res['docs']} docs, {res['shards']} shard(s), "
+              f"{res['written']} file(s) written, {res['removed']} removed")
+
+
+def print_summary(results: List[SopResult], wall: float) -> None:
+    print("")
+    print(f"{'SOP':<16} {'status':<6} {'ran':>3} {'skip':>4} {'seconds':>8}  note")
+    for r in results:
+        ran = sum(1 for s in r.stages if s.status == "ran")
+        skipped = sum(1 for s in r.stages if s.status == "skipped")
+        bad = next((s for s in r.stages if s.status == "failed"), None)
+        note = f"{bad.name}: {bad.detail}" if bad else ""
+        print(f"{r.sop_id:<16} {'OK' if r.ok else 'FAIL':<6} {ran:>3} {skipped:>4} {r.seconds:8.3f}  {note}")
+    n_ok = sum(1 for r in results if r.ok)
+    print(f"{n_ok}/{len(results)} SOP(s) OK in {wall:.3f}s wall")
+
+
+def print_result(res: SopResult) -> None:
+    flag = "OK  " if res.ok else "FAIL"
+    print(f"{flag} {res.sop_id} ({res.seconds:.3f}s)")
+    for s in res.stages:
+        tail = f"  {s.detail}" if s.detail else ""
+        print(f"     [{s.status:<7}] {s.name:<15} {s.seconds:7.3f}s{tail}")
+
+
+# -----------------------
+# CLI
+# -----------------------
+
+def _add_common(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--repo-root", default=str(REPO_ROOT), help="Repo root used to resolve relative paths.")
+    ap.add_argument("--state-dir", default=None, help="Fingerprint state folder (default: outputs/pipeline_state).")
+    ap.add_argument("--log-dir", default=None, help="Folder for per-stage logs (default: logs).")
+    ap.add_argument("--force", action="store_true", help="Ignore fingerprints and re-run every stage.")
+    ap.add_argument("--title", default=None, help="Passed to build_player --title.")
+    ap.add_argument("--mode", default="dev", help="Passed to build_player --mode.")
+    ap.add_argument("--image-width", type=int, default=65, help="Passed to build_player --image-width.")
+    ap.add_argument("--exit", dest="exit_href", default="index.html", help="Passed to build_player --exit.")
+    ap.add_argument("--story-web", default=None, help="Passed to build_player --story-web.")
+    ap.add_argument("--output-profile", choices=("pretty", "compact"), default="pretty",
+                    help="compact = minified story.json/player plus .gz/.br siblings.")
+    ap.add_argument("--optimize-images", action="store_true",
+                    help="Add the optimize_images stage and record srcset variants in story.json.")
+    ap.add_argument("--preload-start-image", action="store_true", help="Passed to build_player --preload-start-image.")
+    ap.add_argument("--fingerprint-assets", action="store_true", help="Passed to build_player --fingerprint-assets.")
+    ap.add_argument("--image-store", action="store_true",
+                    help="Point story/player images at the shared content-addressed docs/outputs/store (image_store.py).")
+    ap.add_argument("--image-store-perceptual", action="store_true",
+                    help="With --image-store: reuse visually identical slides too (needs Pillow).")
+    ap.add_argument("--fused", action="store_true",
+                    help="Build story.json straight from ENH_UPD in one pass (READY CSV kept as a side output).")
+    ap.add_argument("--tts", choices=sorted(synth_audio.BACKENDS), default=None,
+                    help="Add the audio stage: pre-synthesize narr1/narr3 with this backend (synth_audio.py).")
+    ap.add_argument("--tts-voice", default=synth_audio.DEFAULT_VOICE, help="Passed to synth_audio --voice.")
+    ap.add_argument("--tts-rate", type=int, default=synth_audio.DEFAULT_RATE, help="Passed to synth_audio --rate.")
+    ap.add_argument("--intern", action="store_true",
+                    help="Passed to csv_to_story --intern (string-table story.json).")
+    ap.add_argument("--text-fix", choices=text_normalize.TEXT_FIX_MODES, default=text_normalize.DEFAULT_TEXT_FIX,
+                    help="Text clean-up for ready / story / audio (text_normalize.py; default: repair).")
+    ap.add_argument("--lazy-narration", action="store_true", help="Passed to build_player --lazy-narration.")
+    ap.add_argument("--shard-frames", type=int, default=build_player.DEFAULT_SHARD_FRAMES,
+                    help="Passed to build_player --shard-frames.")
+    ap.add_argument("--no-faq-quiz", action="store_true",
+                    help="Do not compile inputs/Faq_QuizDocs into docs/outputs/faq|quiz (build_faq_quiz.py) afterwards.")
+    ap.add_argument("--no-catalog", action="store_true", help="Do not refresh docs/outputs/catalog.json afterwards.")
+    ap.add_argument("--no-search-index", action="store_true",
+                    help="Do not rebuild docs/outputs/search (build_search_index.py) afterwards.")
+
+
+def _player_params(ns: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "title": ns.title,
+        "mode": ns.mode,
+        "image_width": ns.image_width,
+        "exit_href": ns.exit_href,
+        "story_web": ns.story_web,
+        "output_profile": ns.output_profile,
+        "optimize_images": ns.optimize_images,
+        "preload_start_image": ns.preload_start_image,
+        "fingerprint_assets": ns.fingerprint_assets,
+        "image_store": ns.image_store,
+        "image_store_perceptual": ns.image_store_perceptual,
+        "fused": ns.fused,
+        "tts": ns.tts,
+        "tts_voice": ns.tts_voice,
+        "tts_rate": ns.tts_rate,
+        "intern": ns.intern,
+        "text_fix": ns.text_fix,
+        "lazy_narration": ns.lazy_narration,
+        "shard_frames": ns.shard_frames,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Incremental ENH_UPD -> READY -> story.json -> player runner.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="Build one SOP.")
+    b.add_argument("--sop-id", required=True)
+    b.add_argument("--enh-upd", required=True, help="ENH_UPD CSV (inputs/raw/*_READYBASE_ENH_UPD.csv).")
+    b.add_argument("--images", required=True, help="SOP image folder (docs/outputs/images/<SOP>).")
+    b.add_argument("--story", required=True, help="story.json output path.")
+    b.add_argument("--player", required=True, help="*_player.html output path.")
+    b.add_argument("--ready", default=None, help="READY CSV path (default: outputs/build_in/<SOP>_mk_tw_in_READY.csv).")
+    b.add_argument("--template", default=None, help="Player template (default: src/templates/sop_player.html).")
+    _add_common(b)
+
+    ba = sub.add_parser("build-all", help="Build every SOP in the registry in parallel.")
+    ba.add_argument("--registry", default=str(DEFAULT_REGISTRY), help="SOP registry JSON (default: config/sop_registry.json).")
+    ba.add_argument("--workers", type=int, default=None, help="Max parallel SOP builds (default: CPU count).")
+    ba.add_argument("--only", nargs="+", default=None, metavar="SOP_ID", help="Limit to these SOP ids.")
+    ba.add_argument("--verbose", action="store_true", help="Print per-stage detail for every SOP.")
+    _add_common(ba)
+
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ns = parse_args(argv)
+    repo_root = Path(ns.repo_root).resolve()
+    state_dir = Path(ns.state_dir) if ns.state_dir else None
+    log_dir = Path(ns.log_dir) if ns.log_dir else None
+
+    if ns.cmd == "build":
+        spec = SopSpec(
+            sop_id=ns.sop_id,
+            enh_upd=Path(ns.enh_upd),
+            images=Path(ns.images),
+            story=Path(ns.story),
+            player=Path(ns.player),
+            ready=Path(ns.ready) if ns.ready else None,
+            template=Path(ns.template) if ns.template else None,
+        )
+        res = run_sop(spec, repo_root, state_dir, log_dir, _player_params(ns), ns.force)
+        print_result(res)
+        if not ns.no_faq_quiz:
+            print_faq_quiz(refresh_faq_quiz([spec], repo_root, state_dir))
+        if not ns.no_catalog:
+            print_catalogs(refresh_catalogs([spec], repo_root, state_dir, ns.output_profile == "compact"))
+        if not ns.no_search_index:
+            print_search_indexes(refresh_search_indexes([spec], repo_root))
+        return 0 if res.ok else 1
+
+    if ns.cmd == "build-all":
+        specs = load_registry(Path(ns.registry), repo_root)
+        if ns.only:
+            wanted = set(ns.only)
+            unknown = wanted - {s.sop_id for s in specs}
+            if unknown:
+                raise SystemExit(f"Unknown SOP id(s) in --only: {', '.join(sorted(unknown))}")
+            specs = [s for s in specs if s.sop_id in wanted]
+
+        t0 = time.perf_counter()
+        results = run_all(specs, repo_root, state_dir, log_dir, _player_params(ns), ns.force, ns.workers)
+        wall = time.perf_counter() - t0
+        for r in results:
+            if ns.verbose or not r.ok:
+                print_result(r)
+        print_summary(results, wall)
+        if not ns.no_faq_quiz:
+            print_faq_quiz(refresh_faq_quiz(specs, repo_root, state_dir))
+        if not ns.no_catalog:
+            print_catalogs(refresh_catalogs(specs, repo_root, state_dir, ns.output_profile == "compact"))
+        if not ns.no_search_index:
+            print_search_indexes(refresh_search_indexes(specs, repo_root))
+        return 0 if all(r.ok for r in results) else 1
+
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
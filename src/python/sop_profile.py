@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+sop_profile.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Shared --profile support for the pipeline scripts (enh_upd_to_ready.py,
+csv_to_story.py, validate_story_v1a.py, validate_env.py, build_player.py).
+
+- Code marks phases with `with sop_profile.span("read"):`. Without an active
+  session that is a shared no-op context, so the scripts pay nothing when
+  --profile is off (and nothing when sop_pipeline.py calls them in-process).
+- `with sop_profile.session(tool, VERSION, args, log_path):` in main() turns
+  profiling on when args.profile is set. Every span records wall time, CPU
+  time (process_time), tracemalloc peak and net allocation. Spans with the
+  same name and parent are merged (count, summed times, max peak), so a span
+  can sit inside a per-row loop. tracemalloc slows Python code down, so
+  compare span times with each other, not with unprofiled runs (use
+  bench_pipeline.py for those).
+- On exit (including sys.exit) the spans are written as a JSON sidecar:
+    --profile-out PATH        if given
+    <log>.profile.json        next to --log when the tool has one
+    logs/<tool>_<MMDDYY_HHMM>.profile.json otherwise
+- --cprofile also runs cProfile for the whole session and dumps
+  <sidecar>.pstats (open with `python -m pstats`).
+
+Usage (from a script):
+  sop_profile.add_arguments(ap)
+  args = ap.parse_args()
+  with sop_profile.session("csv_to_story", VERSION, args, args.log):
+      ...
+"""
+
+import argparse
+import contextlib
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+VERSION = "v1_20261017"
+
+_NULL = contextlib.nullcontext()
+
+
+class Profiler:
+    """Collects named spans; nested spans are keyed by their parent path."""
+
+    def __init__(self, tool: str, tool_version: str = "", trace_memory: bool = True):
+        self.tool = tool
+        self.tool_version = tool_version
+        self.trace_memory = trace_memory
+        self.started = datetime.now(NY_TZ).isoformat(timespec="seconds")
+        self.counts: Dict[str, Any] = {}
+        self._spans: Dict[str, Dict[str, Any]] = {}
+        self._stack: List[Dict[str, Any]] = []
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+
+    def _mem(self):
+        return tracemalloc.get_traced_memory() if self.trace_memory and tracemalloc.is_tracing() else (0, 0)
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        path = f"{self._stack[-1]['path']}/{name}" if self._stack else name
+        cur0, peak_before = self._mem()
+        if self._stack:
+            # Keep the parent's peak: resetting below would otherwise lose it.
+            parent = self._stack[-1]
+            parent["child_peak"] = max(parent["child_peak"], peak_before)
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        frame = {"path": path, "child_peak": 0}
+        self._stack.append(frame)
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - c0
+            cur1, peak = self._mem()
+            self._stack.pop()
+            peak = max(peak, frame["child_peak"])
+            if self._stack:
+                self._stack[-1]["child_peak"] = max(self._stack[-1]["child_peak"], peak)
+            rec = self._spans.get(path)
+            if rec is None:
+                rec = self._spans[path] = {
+                    "name": path,
+                    "depth": path.count("/"),
+                    "count": 0,
+                    "wall_s": 0.0,
+                    "cpu_s": 0.0,
+                    "peak_bytes": 0,
+                    "alloc_bytes": 0,
+                }
+            rec["count"] += 1
+            rec["wall_s"] += wall
+            rec["cpu_s"] += cpu
+            rec["peak_bytes"] = max(rec["peak_bytes"], peak)
+            rec["alloc_bytes"] += cur1 - cur0
+
+    def count(self, **kw: Any) -> None:
+        """Attach result counts (rows, frames, bytes, ...) to the report."""
+        self.counts.update(kw)
+
+    def report(self) -> Dict[str, Any]:
+        spans = []
+        for rec in self._spans.values():
+            spans.append(dict(rec, wall_s=round(rec["wall_s"], 6), cpu_s=round(rec["cpu_s"], 6)))
+        _, peak = self._mem()
+        return {
+            "tool": self.tool,
+            "tool_version": self.tool_version,
+            "profile_version": VERSION,
+            "started": self.started,
+            "argv": sys.argv[1:],
+            "total": {
+                "wall_s": round(time.perf_counter() - self._t0, 6),
+                "cpu_s": round(time.process_time() - self._c0, 6),
+                "peak_bytes": max([peak] + [s["peak_bytes"] for s in spans]),
+            },
+            "counts": self.counts,
+            "spans": spans,
+        }
+
+
+_ACTIVE: Optional[Profiler] = None
+
+
+def span(name: str):
+    """Context manager for one phase; a no-op unless a session is active."""
+    if _ACTIVE is None:
+        return _NULL
+    return _ACTIVE.span(name)
+
+
+def count(**kw: Any) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.count(**kw)
+
+
+def active() -> Optional[Profiler]:
+    return _ACTIVE
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--profile", action="store_true",
+                    help="Write per-phase wall/CPU/tracemalloc spans to a JSON sidecar")
+    ap.add_argument("--profile-out", default=None,
+                    help="Sidecar path (default: next to --log as *.profile.json, else logs/)")
+    ap.add_argument("--cprofile", action="store_true",
+                    help="With --profile: also dump cProfile stats to <sidecar>.pstats")
+
+
+def sidecar_path(tool: str, log_path: Optional[str] = None, profile_out: Optional[str] = None) -> Path:
+    if profile_out:
+        return Path(profile_out)
+    if log_path:
+        return Path(log_path).with_suffix(".profile.json")
+    stamp = datetime.now(NY_TZ).strftime("%m%d%y_%H%M")
+    return Path("logs") / f"{tool}_{stamp}.profile.json"
+
+
+@contextlib.contextmanager
+def session(tool: str, tool_version: str, args: argparse.Namespace,
+            log_path: Optional[str] = None) -> Iterator[Optional[Profiler]]:
+    """Activate profiling for the body when args.profile is set; write the sidecar on exit."""
+    global _ACTIVE
+    if not getattr(args, "profile", False):
+        yield None
+        return
+
+    out = sidecar_path(tool, log_path, getattr(args, "profile_out", None))
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    prof = Profiler(tool, tool_version)
+    cprof = cProfile.Profile() if getattr(args, "cprofile", False) else None
+    _ACTIVE = prof
+    if cprof is not None:
+        cprof.enable()
+    try:
+        yield prof
+    finally:
+        if cprof is not None:
+            cprof.disable()
+        _ACTIVE = None
+        doc = prof.report()
+        if started_tracing:
+            tracemalloc.stop()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if cprof is not None:
+            pstats_path = out.with_suffix(".pstats")
+            cprof.dump_stats(str(pstats_path))
+            doc["cprofile"] = str(pstats_path)
+        out.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+        print(f"Profile: {out}", file=sys.stderr)
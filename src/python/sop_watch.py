@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sop_watch.py
+
+Purpose:
+  Long-running watch mode for authors: edit an ENH_UPD CSV, a READY CSV, the
+  player template or an image, and only the affected SOP stages are rebuilt.
+
+  Watched (polled by size + mtime, no extra dependencies):
+    inputs/raw/          ENH_UPD CSVs      -> ready (and everything downstream)
+    outputs/build_in/    READY CSVs        -> validate_env, story, ...
+    src/templates/       player template   -> player (every SOP using it)
+    <SOP images dir>     slide images      -> validate_env, validate_story
+                                              (+ images with --optimize-images,
+                                               + story with --image-store)
+    docs/outputs/faq|quiz                  -> validate_story (every SOP)
+    config/sop_registry.json               -> registry reloaded
+
+  Each change is mapped to (SOP, stage) pairs through the registry and handed
+  to sop_pipeline.run_sop(..., targets=...), which runs those stages and their
+  downstream and reports the rest "skipped" without fingerprinting them. The
+  process stays up, so the tool modules, the compiled player template
+  (build_player.load_template), the tool fingerprints and the docs/outputs
+  fs_index are all warm; a real SOP rebuilds in tens of milliseconds.
+
+  After a rebuild that ran something, docs/outputs/catalog.json is refreshed
+  (build_catalog.py re-reads only the stories that changed; --no-catalog
+  skips it), and so is docs/outputs/search (build_search_index.py;
+  --no-search-index skips it). The initial build also compiles the FAQ /
+  quiz markdown (build_faq_quiz.py; --no-faq-quiz skips it).
+
+  Files the rebuild itself writes (READY CSVs) are not reported back as
+  changes. Other edits made while a rebuild runs are picked up on the next
+  poll.
+
+  --serve PORT also serves docs/ on http://127.0.0.1:PORT/ with a live-reload
+  ping: HTML pages get a tiny EventSource script appended as they are served
+  (built files on disk are unchanged), and an open *_player.html tab reloads
+  when its SOP's player is rebuilt. Open e.g.
+    http://127.0.0.1:8765/outputs/players/LineEnt_player.html
+
+Version:
+  SOP_BUILD_watch_v1.0
+Date:
+  2026-10-17 America/New_York
+
+Usage:
+  python src/python/sop_watch.py
+  python src/python/sop_watch.py --only LineEnt --serve 8765
+  python src/python/sop_watch.py --interval 0.1 --output-profile compact
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+import sop_pipeline
+from sop_pipeline import DEFAULT_REGISTRY, SopSpec
+
+NY_TZ = ZoneInfo("America/New_York")
+VERSION = "SOP_BUILD_watch_v1.0"
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    "\n<script>/* sop_watch.py live reload */(function(){"
+    "var es=new EventSource('" + RELOAD_PATH + "');"
+    "es.onmessage=function(e){var page=location.pathname.split('/').pop();"
+    "if(e.data.split(',').some(function(id){return id==='*'||page===id+'_player.html';}))location.reload();};"
+    "})();</script>\n"
+)
+
+Snapshot = Dict[str, Tuple[int, int]]
+Targets = Dict[str, Set[str]]
+
+
+# -----------------------
+# Polling
+# -----------------------
+
+def snapshot(dirs: List[Path], files: List[Path]) -> Snapshot:
+    """(size, mtime_ns) of every file directly in `dirs`, plus the listed files."""
+    snap: Snapshot = {}
+    for d in dirs:
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_file():
+                        st = e.stat()
+                        snap[e.path] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            continue
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        snap[str(p)] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+def changed_paths(old: Snapshot, new: Snapshot) -> List[str]:
+    return sorted(p for p in old.keys() | new.keys() if old.get(p) != new.get(p))
+
+
+# -----------------------
+# Change -> (SOP, stage) map
+# -----------------------
+
+class WatchMap:
+    """Which SOP stages each watched file or folder feeds."""
+
+    def __init__(self, specs: List[SopSpec], repo_root: Path, registry: Path, optimize: bool,
+                 image_store: bool = False):
+        self.specs = {s.sop_id: s for s in specs}
+        self.registry = registry
+        self.files: Dict[str, Targets] = {}
+        self.dirs: Dict[str, Targets] = {}
+        image_stages = (["images"] if optimize else []) + ["validate_env", "validate_story"]
+        if image_store:
+            image_stages.append("story")  # store URLs are content hashes of the slides
+
+        def add(table: Dict[str, Targets], p: Path, sop_id: str, stages: List[str]) -> None:
+            table.setdefault(str(p), {}).setdefault(sop_id, set()).update(stages)
+
+        for s in specs:
+            add(self.files, s.enh_upd, s.sop_id, ["ready", "story"])  # "story" reads it with --fused
+            add(self.files, s.ready, s.sop_id, ["validate_env", "story"])
+            add(self.files, s.template, s.sop_id, ["player"])
+            add(self.dirs, s.images, s.sop_id, image_stages)
+            outputs_root = s.player.parent.parent
+            add(self.dirs, outputs_root / "faq", s.sop_id, ["validate_story"])
+            add(self.dirs, outputs_root / "quiz", s.sop_id, ["validate_story"])
+
+        # Plain folders watched only so a file outside the registry can be reported.
+        self.extra_dirs = [repo_root / "inputs" / "raw", repo_root / "outputs" / "build_in",
+                           repo_root / "src" / "templates"]
+
+    def watch_dirs(self) -> List[Path]:
+        seen = dict.fromkeys(str(d) for d in self.extra_dirs)
+        seen.update(dict.fromkeys(self.dirs))
+        return [Path(d) for d in seen]
+
+    def watch_files(self) -> List[Path]:
+        return [Path(p) for p in self.files] + [self.registry]
+
+    def own_outputs(self, sop_ids: List[str]) -> Set[str]:
+        """Watched files that a rebuild of these SOPs writes itself."""
+        return {str(self.specs[s].ready) for s in sop_ids}
+
+    def resolve(self, paths: List[str]) -> Tuple[Targets, List[str]]:
+        """Map changed paths to {sop_id: stages}; also return paths no SOP uses."""
+        out: Targets = {}
+        unmapped: List[str] = []
+        for p in paths:
+            hits = [self.files.get(p), self.dirs.get(str(Path(p).parent))]
+            hits = [h for h in hits if h]
+            if not hits:
+                unmapped.append(p)
+            for h in hits:
+                for sop_id, stages in h.items():
+                    out.setdefault(sop_id, set()).update(stages)
+        return out, unmapped
+
+
+# -----------------------
+# Live reload server
+# -----------------------
+
+class ReloadHub:
+    """Hands the latest rebuilt SOP ids to every open EventSource stream."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._data = ""
+        self.closed = False
+
+    def publish(self, sop_ids: List[str]) -> None:
+        with self._cond:
+            self._seq += 1
+            self._data = ",".join(sop_ids)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def wait(self, seq: int, timeout: float) -> Tuple[int, Optional[str]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != seq or self.closed, timeout)
+            return self._seq, (self._data if self._seq != seq else None)
+
+    @property
+    def seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    hub: ReloadHub
+
+    def log_message(self, fmt, *args):  # keep the watch console readable
+        pass
+
+    def end_headers(self):
+        if self.path != RELOAD_PATH:
+            self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self._events()
+        path = self.translate_path(self.path)
+        if path.endswith(".html") and os.path.isfile(path):
+            return self._html(path)
+        return super().do_GET()
+
+    def _html(self, path: str) -> None:
+        with open(path, "rb") as f:
+            body = f.read()
+        tag = RELOAD_SCRIPT.encode("utf-8")
+        i = body.rfind(b"</body>")
+        body = body[:i] + tag + body[i:] if i >= 0 else body + tag
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _events(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        seq = self.hub.seq
+        try:
+            while not self.hub.closed:
+                seq, data = self.hub.wait(seq, 15.0)
+                msg = f"data: {data}\n\n" if data is not None else ": ping\n\n"
+                self.wfile.write(msg.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_server(root: Path, host: str, port: int, hub: ReloadHub) -> ThreadingHTTPServer:
+    handler = type("WatchHandler", (_Handler,), {"hub": hub})
+    httpd = ThreadingHTTPServer((host, port), partial(handler, directory=str(root)))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="sop_watch_http", daemon=True).start()
+    return httpd
+
+
+# -----------------------
+# Watch loop
+# -----------------------
+
+def _now() -> str:
+    return datetime.now(NY_TZ).strftime("%H:%M:%S")
+
+
+def _short(p: str, repo_root: Path) -> str:
+    try:
+        return str(Path(p).relative_to(repo_root))
+    except ValueError:
+        return p
+
+
+def _load(ns: argparse.Namespace, repo_root: Path, registry: Path) -> Tuple[List[SopSpec], WatchMap]:
+    specs = sop_pipeline.load_registry(registry, repo_root)
+    if ns.only:
+        wanted = set(ns.only)
+        unknown = wanted - {s.sop_id for s in specs}
+        if unknown:
+            raise SystemExit(f"Unknown SOP id(s) in --only: {', '.join(sorted(unknown))}")
+        specs = [s for s in specs if s.sop_id in wanted]
+    specs = [s.resolved(repo_root) for s in specs]
+    return specs, WatchMap(specs, repo_root, registry, bool(ns.optimize_images), bool(ns.image_store))
+
+
+def rebuild(targets: Targets, wmap: WatchMap, ns: argparse.Namespace, repo_root: Path,
+            params: Dict[str, object]) -> List[sop_pipeline.SopResult]:
+    state_dir = Path(ns.state_dir) if ns.state_dir else None
+    log_dir = Path(ns.log_dir) if ns.log_dir else None
+    results = []
+    for sop_id in sorted(targets):
+        res = sop_pipeline._run_sop_quiet(wmap.specs[sop_id], repo_root, state_dir, log_dir, params,
+                                          ns.force, None, sorted(targets[sop_id]))
+        results.append(res)
+        if ns.verbose or not res.ok:
+            sop_pipeline.print_result(res)
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Rebuild only the affected SOP stages when inputs change.")
+    ap.add_argument("--registry", default=str(DEFAULT_REGISTRY), help="SOP registry JSON (default: config/sop_registry.json).")
+    ap.add_argument("--only", nargs="+", default=None, metavar="SOP_ID", help="Watch only these SOP ids.")
+    ap.add_argument("--interval", type=float, default=0.2, help="Poll interval in seconds (default: 0.2).")
+    ap.add_argument("--settle", type=float, default=0.05,
+                    help="Wait this long after a change for the writer to finish (default: 0.05).")
+    ap.add_argument("--no-initial-build", action="store_true",
+                    help="Skip the fingerprinted build of every watched SOP at start-up.")
+    ap.add_argument("--serve", type=int, default=0, metavar="PORT",
+                    help="Serve docs/ on this port with live reload (default: off).")
+    ap.add_argument("--host", default="127.0.0.1", help="Bind address for --serve.")
+    ap.add_argument("--serve-root", default=None, help="Folder to serve (default: <repo>/docs).")
+    ap.add_argument("--verbose", action="store_true", help="Print per-stage detail for every rebuild.")
+    sop_pipeline._add_common(ap)
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ns = parse_args(argv)
+    repo_root = Path(ns.repo_root).resolve()
+    registry = Path(ns.registry)
+    registry = registry if registry.is_absolute() else repo_root / registry
+    params = sop_pipeline._player_params(ns)
+
+    specs, wmap = _load(ns, repo_root, registry)
+    print(f"{VERSION}: watching {len(specs)} SOP(s) every {ns.interval}s (Ctrl+C to stop)")
+
+    if not ns.no_initial_build:
+        # Plain fingerprinted pass: brings every watched SOP up to date once.
+        t0 = time.perf_counter()
+        results = sop_pipeline.run_all(specs, repo_root, Path(ns.state_dir) if ns.state_dir else None,
+                                       Path(ns.log_dir) if ns.log_dir else None, params, ns.force, 1)
+        sop_pipeline.print_summary(results, time.perf_counter() - t0)
+        if not ns.no_faq_quiz:
+            sop_pipeline.print_faq_quiz(sop_pipeline.refresh_faq_quiz(
+                specs, repo_root, Path(ns.state_dir) if ns.state_dir else None))
+        if not ns.no_catalog:
+            sop_pipeline.print_catalogs(sop_pipeline.refresh_catalogs(
+                specs, repo_root, Path(ns.state_dir) if ns.state_dir else None, ns.output_profile == "compact"))
+        if not ns.no_search_index:
+            sop_pipeline.print_search_indexes(sop_pipeline.refresh_search_indexes(specs, repo_root))
+
+    hub: Optional[ReloadHub] = None
+    httpd: Optional[ThreadingHTTPServer] = None
+    if ns.serve:
+        hub = ReloadHub()
+        root = Path(ns.serve_root) if ns.serve_root else repo_root / "docs"
+        httpd = start_server(root, ns.host, ns.serve, hub)
+        print(f"Serving {root} on http://{ns.host}:{ns.serve}/ (live reload on)")
+
+    prev = snapshot(wmap.watch_dirs(), wmap.watch_files())
+    try:
+        while True:
+            time.sleep(ns.interval)
+            cur = snapshot(wmap.watch_dirs(), wmap.watch_files())
+            paths = changed_paths(prev, cur)
+            if not paths:
+                continue
+            t_detect = time.perf_counter()
+            if ns.settle > 0:  # let editors / Excel finish writing
+                time.sleep(ns.settle)
+                cur = snapshot(wmap.watch_dirs(), wmap.watch_files())
+                paths = changed_paths(prev, cur)
+            newest = max((cur.get(p, (0, 0))[1] for p in paths), default=0) / 1e9
+
+            targets: Dict[str, Set[str]] = {}
+            if str(registry) in paths:
+                paths = [p for p in paths if p != str(registry)]
+                try:
+                    specs, wmap = _load(ns, repo_root, registry)
+                except (OSError, ValueError, SystemExit) as e:
+                    # Keep the old map; the next edit of the registry is tried again.
+                    print(f"[{_now()}] registry not reloaded: {e}")
+                else:
+                    print(f"[{_now()}] registry reloaded: {len(specs)} SOP(s)")
+                    targets = {s.sop_id: {"ready", "story"} for s in specs}
+                    cur = snapshot(wmap.watch_dirs(), wmap.watch_files())
+
+            mapped, unmapped = wmap.resolve(paths)
+            for sop_id, stages in mapped.items():
+                targets.setdefault(sop_id, set()).update(stages)
+            for p in unmapped:
+                print(f"[{_now()}] {_short(p, repo_root)}: not used by any watched SOP")
+            if not targets:
+                prev = cur
+                continue
+
+            for p in paths:
+                if p not in unmapped:
+                    print(f"[{_now()}] changed: {_short(p, repo_root)}")
+            results = rebuild(targets, wmap, ns, repo_root, params)
+            wall = time.perf_counter() - t_detect
+            lag = time.time() - newest if newest else wall
+
+            # Absorb what the rebuild wrote itself; keep any other edit made meanwhile
+            # at its pre-build value so the next poll still sees it.
+            after = snapshot(wmap.watch_dirs(), wmap.watch_files())
+            own = wmap.own_outputs(list(targets))
+            for p in changed_paths(cur, after):
+                if p in own:
+                    continue
+                if p in cur:
+                    after[p] = cur[p]
+                else:
+                    after.pop(p, None)
+            prev = after
+
+            ran = sum(1 for r in results for s in r.stages if s.status == "ran")
+            # Only tabs whose player actually changed need a reload (a bare touch skips).
+            reload_ids = [r.sop_id for r in results if r.ok and any(s.status == "ran" for s in r.stages)]
+            print(f"[{_now()}] rebuilt {', '.join(r.sop_id + ('' if r.ok else ' (FAIL)') for r in results)}: "
+                  f"{ran} stage(s) in {wall:.3f}s (change -> player {lag:.3f}s)")
+            if ran and not ns.no_catalog:
+                cats = sop_pipeline.refresh_catalogs([wmap.specs[i] for i in sorted(targets)], repo_root,
+                                                     Path(ns.state_dir) if ns.state_dir else None,
+                                                     ns.output_profile == "compact")
+                sop_pipeline.print_catalogs([c for c in cats if c["written"]])
+            if ran and not ns.no_search_index:
+                idx = sop_pipeline.refresh_search_indexes([wmap.specs[i] for i in sorted(targets)], repo_root)
+                sop_pipeline.print_search_indexes([x for x in idx if x["written"]])
+            if hub is not None and reload_ids:
+                hub.publish(reload_ids)
+    except KeyboardInterrupt:
+        print("")
+    finally:
+        if hub is not None:
+            hub.close()
+        if httpd is not None:
+            httpd.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
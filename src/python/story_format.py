@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+story_format.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+The interned story.json layout (csv_to_story.py --intern) and its expansion
+back to the plain layout every other tool works on.
+
+  {"sop_id": "LineEnt", "start_code": "S000", "format": "interned-1",
+   "strings": ["S001", "Palco Power Systems ...", "FAQ & Tips", ...],
+   "meta": {"entity": "SE", "function": "Distro", "subentity": "Sales"},
+   "frames": [{"sop_id": "LineEnt", "frame_code": 0, "title": "Opening",
+               "narr1": 1, ..., "choices": [{"to": 5, "label": 7}]}, ...]}
+
+- A frame string that occurs 2+ times (anywhere in the frames, at least
+  MIN_INTERN_LEN characters) is stored once in "strings"; each occurrence
+  becomes its integer index. The most frequent strings get the smallest
+  indexes. Unique strings and "" stay inline.
+- The most common per-frame meta is stored once as the top-level "meta";
+  frames whose meta equals it omit theirs, the others keep their own.
+- So inside frames of an interned story, an integer is always a string-table
+  index. Plain stories never carry numbers in frames; intern_story() refuses
+  one that does.
+- expand_story(intern_story(s)) == s for csv_to_story output (meta goes back
+  as the last frame key, where csv_to_story writes it).
+
+Readers call expand_story() (a no-op on plain stories): build_player.py,
+validate_story_v1a.py, build_catalog.py, fingerprint_assets.py. The player
+template expands frames one at a time, on first use.
+
+Usage (CLI, convert an existing story either way):
+  python src/python/story_format.py --story docs/outputs/story/LineEnt/story.json --intern --out /tmp/s.json
+  python src/python/story_format.py --story /tmp/s.json --expand --out /tmp/plain.json
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from typing import Any, Dict, List
+
+VERSION = "v1_20261017"
+
+INTERNED_FORMAT = "interned-1"
+MIN_INTERN_LEN = 3
+COMPACT_SEPARATORS = (",", ":")
+
+
+def is_interned(story: Dict[str, Any]) -> bool:
+    return isinstance(story, dict) and story.get("format") == INTERNED_FORMAT
+
+
+def _count_strings(v: Any, counts: Counter) -> None:
+    if isinstance(v, str):
+        if len(v) >= MIN_INTERN_LEN:
+            counts[v] += 1
+    elif isinstance(v, dict):
+        for x in v.values():
+            _count_strings(x, counts)
+    elif isinstance(v, list):
+        for x in v:
+            _count_strings(x, counts)
+    elif v is not None and not isinstance(v, bool):
+        raise ValueError(f"interned stories cannot carry numbers in frames (found {v!r})")
+
+
+def _intern_value(v: Any, index: Dict[str, int]) -> Any:
+    if isinstance(v, str):
+        return index.get(v, v)
+    if isinstance(v, dict):
+        return {k: _intern_value(x, index) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_intern_value(x, index) for x in v]
+    return v
+
+
+def intern_story(story: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain story -> interned story (a new dict; the input is not modified)."""
+    if is_interned(story):
+        return story
+    frames = story.get("frames") or []
+
+    metas = Counter(json.dumps(f["meta"], sort_keys=True) for f in frames
+                    if isinstance(f, dict) and isinstance(f.get("meta"), dict))
+    shared_meta = json.loads(metas.most_common(1)[0][0]) if metas else None
+
+    slim: List[Any] = []
+    for fr in frames:
+        if isinstance(fr, dict) and shared_meta is not None and fr.get("meta") == shared_meta:
+            fr = {k: v for k, v in fr.items() if k != "meta"}
+        slim.append(fr)
+
+    counts: Counter = Counter()
+    _count_strings(slim, counts)
+    order = [s for s, n in counts.most_common() if n >= 2]  # ties keep first-seen order
+    index = {s: i for i, s in enumerate(order)}
+
+    out = {k: v for k, v in story.items() if k != "frames"}
+    out["format"] = INTERNED_FORMAT
+    out["strings"] = order
+    if shared_meta is not None:
+        out["meta"] = shared_meta
+    out["frames"] = [_intern_value(fr, index) for fr in slim]
+    return out
+
+
+def _expand_value(v: Any, strings: List[str]) -> Any:
+    if isinstance(v, bool):
+        return v
+    if isinstance(v, int):
+        return strings[v]
+    if isinstance(v, dict):
+        return {k: _expand_value(x, strings) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_expand_value(x, strings) for x in v]
+    return v
+
+
+def expand_frame(frame: Any, strings: List[str], shared_meta: Any = None) -> Any:
+    if not isinstance(frame, dict):
+        return frame
+    out = _expand_value(frame, strings)
+    if "meta" not in out and shared_meta is not None:
+        out["meta"] = dict(shared_meta)
+    return out
+
+
+def expand_story(story: Dict[str, Any]) -> Dict[str, Any]:
+    """Interned story -> plain story; plain stories are returned unchanged."""
+    if not is_interned(story):
+        return story
+    strings = story.get("strings") or []
+    shared_meta = story.get("meta")
+    out = {k: v for k, v in story.items() if k not in ("format", "strings", "meta", "frames")}
+    out["frames"] = [expand_frame(fr, strings, shared_meta) for fr in story.get("frames") or []]
+    return out
+
+
+def dumps(story: Dict[str, Any], compact: bool) -> str:
+    if compact:
+        return json.dumps(story, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    return json.dumps(story, ensure_ascii=False, indent=2)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Convert story.json between the plain and interned layouts")
+    ap.add_argument("--story", required=True)
+    ap.add_argument("--out", required=True)
+    mode = ap.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--intern", action="store_true")
+    mode.add_argument("--expand", action="store_true")
+    ap.add_argument("--compact", action="store_true", help="Minified JSON (default: indent=2)")
+    args = ap.parse_args()
+
+    with open(args.story, "r", encoding="utf-8") as f:
+        story = json.load(f)
+    out = intern_story(story) if args.intern else expand_story(story)
+    text = dumps(out, args.compact)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(text)
+    print(f"[OK] {args.out}: {len(text.encode('utf-8'))} bytes"
+          + (f", {len(out.get('strings') or [])} interned string(s)" if args.intern else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
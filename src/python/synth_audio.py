@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+synth_audio.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+Pre-synthesize the "Hear me" (narr1) and "Hear more" (narr3) narration of a
+SOP into audio files, so the player starts playback at once instead of
+waiting on the device's speechSynthesis voice.
+
+- Backends (--backend):
+    espeak-ng   espeak-ng (or espeak) on PATH -> WAV, then ffmpeg encodes
+                mp3 (default) or ogg; --codec wav skips ffmpeg
+    stub        no external tools: a short silent WAV sized to the text.
+                For tests and for trying the pipeline on a bare machine.
+- Files are content-addressed: tts.<h>.<ext>, where <h> is a sha256 prefix
+  of (backend, voice, rate, codec, text). Unchanged narration is never
+  re-synthesized, identical text is shared across frames and SOPs, and the
+  names match fingerprint_assets.FINGERPRINT_RE, so serve_outputs.py sends
+  them as immutable.
+- The text is taken from csv_to_story.frame_from_row(), i.e. exactly what
+  the story (and the browser TTS fallback) will carry.
+- Writes a per-SOP manifest, docs/outputs/audio/<SOP>.audio.json:
+    {"settings": {...}, "url_base": "../audio/", "audio": {"<h>": "tts.<h>.mp3"}}
+  csv_to_story.py --audio-manifest reads it and adds narr1_audio /
+  narr3_audio URLs to the frames whose text has a file. The player plays
+  those, and falls back to browser TTS when a file is missing or blocked.
+- --prune deletes tts.* files that no manifest in the folder references.
+
+sop_pipeline.py --tts <backend> runs this as the "audio" stage ahead of
+"story".
+
+Usage:
+  python src/python/synth_audio.py --csv outputs/build_in/LineEnt_mk_tw_in_READY.csv --sop-id LineEnt
+  python src/python/synth_audio.py --csv ... --sop-id LineEnt --backend stub
+  python src/python/synth_audio.py --audio-dir docs/outputs/audio --prune
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import build_events
+import text_normalize
+
+VERSION = "v1_20261017"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+FIELDS = ("narr1", "narr3")
+MANIFEST_SUFFIX = ".audio.json"
+URL_BASE = "../audio/"  # from docs/outputs/players/
+HASH_LEN = 10
+CODECS = ("mp3", "ogg", "wav")
+DEFAULT_VOICE = "en-us"
+DEFAULT_RATE = 160  # words per minute (espeak-ng -s)
+
+
+@dataclass(frozen=True)
+class TtsSettings:
+    backend: str = "espeak-ng"
+    voice: str = DEFAULT_VOICE
+    rate: int = DEFAULT_RATE
+    codec: str = "mp3"
+
+
+def audio_key(text: str, settings: TtsSettings) -> str:
+    """Cache key for one narration text under the given voice settings."""
+    material = json.dumps([settings.backend, settings.voice, settings.rate, settings.codec, text],
+                          ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:HASH_LEN]
+
+
+def audio_name(key: str, codec: str) -> str:
+    return f"tts.{key}.{codec}"
+
+
+# -----------------------
+# Backends
+# -----------------------
+
+class StubBackend:
+    """Silent 8 kHz mono WAV, 50 ms per word; deterministic for a given text."""
+
+    name = "stub"
+
+    def synth(self, text: str, settings: TtsSettings, wav_path: str) -> None:
+        rate = 8000
+        seconds = max(0.2, 0.05 * len(text.split()) * DEFAULT_RATE / max(1, settings.rate))
+        with wave.open(wav_path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(rate)
+            w.writeframes(b"\x80" * int(rate * seconds))
+
+
+class EspeakBackend:
+    name = "espeak-ng"
+
+    def __init__(self):
+        self.exe = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.exe:
+            raise RuntimeError("espeak-ng not found on PATH (install espeak-ng, or use --backend stub)")
+
+    def synth(self, text: str, settings: TtsSettings, wav_path: str) -> None:
+        subprocess.run([self.exe, "-v", settings.voice, "-s", str(settings.rate), "-w", wav_path, "--stdin"],
+                       input=text.encode("utf-8"), check=True, capture_output=True)
+
+
+BACKENDS = {"espeak-ng": EspeakBackend, "stub": StubBackend}
+
+
+def encode(wav_path: str, out_path: str, codec: str) -> None:
+    """WAV -> codec (ffmpeg for mp3/ogg). Writes out_path atomically."""
+    tmp = out_path + ".tmp"
+    if codec == "wav":
+        shutil.copyfile(wav_path, tmp)
+    else:
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise RuntimeError(f"ffmpeg not found on PATH (needed for --codec {codec}; or use --codec wav)")
+        args = ["-c:a", "libmp3lame", "-b:a", "48k"] if codec == "mp3" else ["-c:a", "libopus", "-b:a", "32k"]
+        subprocess.run([ffmpeg, "-loglevel", "error", "-y", "-i", wav_path, "-ac", "1", *args, "-f", codec, tmp],
+                       check=True, capture_output=True)
+    os.replace(tmp, out_path)
+
+
+# -----------------------
+# Synthesis
+# -----------------------
+
+def synthesize(texts: Iterable[str], audio_dir: Path, settings: TtsSettings,
+               workers: Optional[int] = None) -> Dict[str, object]:
+    """
+    Make sure every non-empty text has its audio file in audio_dir.
+    Returns {"audio": {key: file name}, "synthesized": n, "cached": n}.
+    """
+    wanted: Dict[str, str] = {}
+    for t in texts:
+        t = (t or "").strip()
+        if t:
+            wanted.setdefault(audio_key(t, settings), t)
+
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    todo = {k: t for k, t in wanted.items() if not (audio_dir / audio_name(k, settings.codec)).is_file()}
+    if todo:
+        backend = BACKENDS[settings.backend]()
+
+        def one(item) -> None:
+            key, text = item
+            fd, wav = tempfile.mkstemp(suffix=".wav", dir=str(audio_dir))
+            os.close(fd)
+            try:
+                backend.synth(text, settings, wav)
+                encode(wav, str(audio_dir / audio_name(key, settings.codec)), settings.codec)
+            finally:
+                if os.path.exists(wav):
+                    os.remove(wav)
+
+        # The work is in the TTS / encoder subprocesses, so threads are enough.
+        with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+            list(pool.map(one, sorted(todo.items())))
+
+    return {
+        "audio": {k: audio_name(k, settings.codec) for k in sorted(wanted)},
+        "synthesized": len(todo),
+        "cached": len(wanted) - len(todo),
+    }
+
+
+def narration_texts(rows: Iterable[Dict[str, str]], sop_id: str,
+                    text_fix: str = text_normalize.DEFAULT_TEXT_FIX) -> List[str]:
+    """narr1/narr3 of every frame, as csv_to_story will write them (same text_fix mode)."""
+    import csv_to_story  # csv_to_story imports this module for audio_key()
+
+    out: List[str] = []
+    for row in rows:
+        frame = csv_to_story.frame_from_row(row, sop_id, text_fix=text_fix)
+        out.extend(frame.get(f) or "" for f in FIELDS)
+    return out
+
+
+def manifest_path(audio_dir: Path, sop_id: str) -> Path:
+    return audio_dir / f"{sop_id}{MANIFEST_SUFFIX}"
+
+
+def build_audio(source: str, sop_id: str, audio_dir: Path, settings: TtsSettings, fused: bool = False,
+                sheet: Optional[str] = None, workers: Optional[int] = None,
+                text_fix: str = text_normalize.DEFAULT_TEXT_FIX) -> Dict[str, object]:
+    """
+    Synthesize a SOP's narration from its READY CSV (or ENH_UPD CSV/xlsx when
+    fused=True) and write its manifest. `text_fix` must match the story
+    build's, or the texts (and so the keys) differ. Returns the synthesize()
+    summary plus "manifest" and "texts".
+    """
+    import csv_to_story
+    import enh_upd_to_ready
+
+    if fused:
+        rows = enh_upd_to_ready.iter_ready_rows(Path(source), sheet, text_fix=text_fix)
+    else:
+        rows = csv_to_story.iter_rows(source)
+    texts = narration_texts(rows, sop_id, text_fix)
+    res = synthesize(texts, audio_dir, settings, workers)
+
+    mp = manifest_path(audio_dir, sop_id)
+    doc = {"version": VERSION, "sop_id": sop_id, "settings": asdict(settings),
+           "url_base": URL_BASE, "audio": res["audio"]}
+    text = json.dumps(doc, ensure_ascii=False, indent=1) + "\n"
+    if not mp.is_file() or mp.read_text(encoding="utf-8") != text:
+        tmp = mp.with_name(mp.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, mp)
+    res.update(manifest=mp, texts=sum(1 for t in texts if t.strip()))
+    return res
+
+
+def load_manifest(path: Optional[str]) -> Optional[Dict[str, object]]:
+    """Read a <SOP>.audio.json manifest; None if no path."""
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    doc["settings"] = TtsSettings(**doc["settings"])
+    return doc
+
+
+def audio_url(text: str, manifest: Dict[str, object]) -> str:
+    """URL (relative to the players folder) of the audio for `text`, or ""."""
+    text = (text or "").strip()
+    if not text:
+        return ""
+    name = manifest["audio"].get(audio_key(text, manifest["settings"]))  # type: ignore[union-attr]
+    return (manifest.get("url_base") or URL_BASE) + name if name else ""  # type: ignore[operator]
+
+
+def prune(audio_dir: Path) -> List[str]:
+    """Delete tts.* files no manifest in audio_dir references; returns their names."""
+    keep = set()
+    for mp in audio_dir.glob("*" + MANIFEST_SUFFIX):
+        keep.update(json.loads(mp.read_text(encoding="utf-8")).get("audio", {}).values())
+    gone = []
+    for p in sorted(audio_dir.glob("tts.*")):
+        if p.name not in keep:
+            p.unlink()
+            gone.append(p.name)
+    return gone
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pre-synthesize narr1/narr3 narration audio for a SOP")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--csv", help="READY CSV")
+    src.add_argument("--enh-upd", help="ENH_UPD CSV/xlsx (converted in memory)")
+    ap.add_argument("--sheet", default=None, help="With an .xlsx --enh-upd: worksheet name")
+    ap.add_argument("--sop-id")
+    ap.add_argument("--audio-dir", default=str(REPO_ROOT / "docs" / "outputs" / "audio"),
+                    help="Audio folder (default: docs/outputs/audio)")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), default="espeak-ng")
+    ap.add_argument("--voice", default=DEFAULT_VOICE, help=f"espeak-ng voice (default: {DEFAULT_VOICE})")
+    ap.add_argument("--rate", type=int, default=DEFAULT_RATE, help=f"Words per minute (default: {DEFAULT_RATE})")
+    ap.add_argument("--codec", choices=CODECS, default=None,
+                    help="Audio format (default: mp3; wav for the stub backend)")
+    ap.add_argument("--workers", type=int, default=None, help="Parallel syntheses (default: CPU count)")
+    ap.add_argument("--prune", action="store_true", help="Delete audio files no manifest references")
+    ap.add_argument("--text-fix", choices=text_normalize.TEXT_FIX_MODES, default=text_normalize.DEFAULT_TEXT_FIX,
+                    help="Same as csv_to_story --text-fix (the narration must match the story's)")
+    args = ap.parse_args()
+
+    audio_dir = Path(args.audio_dir)
+    if args.csv or args.enh_upd:
+        if not args.sop_id:
+            ap.error("--sop-id is required with --csv / --enh-upd")
+        settings = TtsSettings(args.backend, args.voice, args.rate,
+                               args.codec or ("wav" if args.backend == "stub" else "mp3"))
+        with build_events.stage_event("audio", "synth_audio", VERSION, args.sop_id) as ev:
+            t0 = time.perf_counter()
+            res = build_audio(args.enh_upd or args.csv, args.sop_id, audio_dir, settings,
+                              fused=bool(args.enh_upd), sheet=args.sheet, workers=args.workers,
+                              text_fix=args.text_fix)
+            print(f"[OK] {res['manifest']}: {len(res['audio'])} clip(s) for {res['texts']} narration(s), "
+                  f"{res['synthesized']} synthesized, {res['cached']} cached "
+                  f"in {time.perf_counter() - t0:.3f}s")
+            ev.update(rows=res["texts"], out=res["manifest"], detail=f"{res['synthesized']} synthesized")
+    elif not args.prune:
+        ap.error("give --csv / --enh-upd (and --sop-id), or --prune")
+
+    if args.prune:
+        gone = prune(audio_dir)
+        print(f"Pruned {len(gone)} unreferenced file(s) from {audio_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
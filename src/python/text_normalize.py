@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+text_normalize.py
+Version: v1_20261017 (America/New_York)
+
+Purpose:
+One text clean-up pass for everything that ends up narrated or displayed,
+shared by enh_upd_to_ready.py (READY CSV cells) and csv_to_story.py (frame
+text), so the two-step and the fused (--enh-upd) builds agree.
+
+fix_text(text) runs ONE compiled scan over the text and fixes, in place:
+  mojibake     UTF-8 that was decoded as cp1252 / latin-1 ("â€™" -> "’",
+               "Ã¢â‚¬Å“" -> "“"). Each lead + continuation sequence is mapped
+               back to its bytes and re-decoded. The result is only used when
+               it is a character the decks plausibly contain (Latin-1 /
+               Latin Extended-A, punctuation, currency, ™, arrows, shapes,
+               dingbats, emoji); valid text such as "“CAFÉ”" or "2×½" also
+               forms UTF-8 byte sequences and stays as it is. A sequence that
+               would decode to a lone "â" before a space is a truncated
+               double-encoded quote ("Ã¢  "), not "â": it is left for
+               validate_story to warn about. Repeated (up to MAX_PASSES) so
+               text that went through the round trip twice is repaired too.
+  line_break   PowerPoint line breaks: "_x000B_" (the OOXML escape), vertical
+               tab, U+2028/2029, CR / CRLF. Multi-line fields (narration) get
+               "\n"; single-line fields (title, labels, question) get " ".
+  invisible    no-break / narrow spaces -> " "; zero-width space, word
+               joiner, BOM and soft hyphen are dropped.
+  punctuation  (text_fix="ascii" only) smart quotes, dashes, ellipsis and
+               bullets folded to ASCII. The default keeps them: the decks use
+               them on purpose.
+  nfc          Unicode NFC (only when the text is not already NFC).
+
+ASCII text without "_x000B_" / VT / CR is returned untouched after one
+isascii() check, so a large clean narration column costs next to nothing.
+REGRESSION_CASES pins known inputs to their output; --self-check runs them.
+
+Modes (text_fix=): "repair" (default), "ascii" (repair + punctuation),
+"off" (no clean-up; csv_to_story still turns "_x000B_" in titles into a
+space, as it always did).
+
+FixReport collects what was fixed, per frame (READY row Code) and field:
+  S004: narr1 (mojibake), title (line_break)
+
+Usage (CLI, report on a READY / ENH_UPD CSV; --out writes the fixed copy):
+  python src/python/text_normalize.py --csv outputs/build_in/LineEnt_mk_tw_in_READY_121325_2034.csv
+  python src/python/text_normalize.py --csv in.csv --out fixed.csv --text-fix ascii
+  python src/python/text_normalize.py --self-check
+"""
+
+import argparse
+import csv
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+VERSION = "v1_20261017"
+
+TEXT_FIX_MODES = ("repair", "ascii", "off")
+DEFAULT_TEXT_FIX = "repair"
+MAX_PASSES = 3
+
+# Fields whose line breaks are kept (as "\n"); every other text field is one line.
+MULTILINE_FIELDS = frozenset({
+    "narr1", "narr2", "narr3",
+    "Narr1", "Narr2", "Narr3", "Narr1_seed", "Narr2_seed", "Narr3_seed",
+})
+FRAME_TEXT_FIELDS = ("title", "decision_question", "narr1", "narr2", "narr3",
+                     "uap_label", "FAQ_Label", "Quiz_Label")
+
+
+def _cp1252_char(b: int) -> str:
+    # The five bytes cp1252 leaves undefined survive as C1 controls (latin-1).
+    try:
+        return bytes([b]).decode("cp1252")
+    except UnicodeDecodeError:
+        return chr(b)
+
+
+_BYTE_OF = {_cp1252_char(b): b for b in range(0x80, 0x100)}
+
+
+def _char_class(lo: int, hi: int) -> str:
+    return "[" + "".join(re.escape(_cp1252_char(b)) for b in range(lo, hi + 1)) + "]"
+
+
+_CONT = _char_class(0x80, 0xBF)
+_MOJIBAKE = (f"{_char_class(0xC2, 0xDF)}{_CONT}"
+             f"|{_char_class(0xE0, 0xEF)}{_CONT}{{2}}"
+             f"|{_char_class(0xF0, 0xF4)}{_CONT}{{3}}")
+
+# What a repaired sequence may decode to. Anything else (IPA, Hebrew, CJK, ...)
+# means the "mojibake" was real text, e.g. "É”" or "×½".
+_PLAUSIBLE_RE = re.compile("[\u00a0-\u017f\u2000-\u206f\u20a0-\u20cf\u2100-\u214f"
+                           "\u2190-\u21ff\u25a0-\u25ff\u2600-\u27bf\U0001f300-\U0001faff]")
+
+_LINE_BREAK = r"_x000B_|\r\n|[\x0b\r\u2028\u2029]"
+_INVISIBLE = {"\u00a0": " ", "\u202f": " ", "\u2007": " ",   # no-break / narrow / figure space
+              "\u200b": "", "\u2060": "", "\ufeff": "", "\u00ad": ""}  # zero-width, joiner, BOM, soft hyphen
+_ASCII_PUNCT = {"‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+                "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+                "–": "-", "—": "-", "‒": "-", "―": "-", "−": "-",
+                "…": "...", "•": "-", "·": "-"}
+
+
+def _scan_re(punct: bool) -> "re.Pattern[str]":
+    parts = [f"(?P<moj>{_MOJIBAKE})", f"(?P<brk>{_LINE_BREAK})",
+             "(?P<inv>[" + "".join(_INVISIBLE) + "])"]
+    if punct:
+        parts.append("(?P<pun>[" + "".join(_ASCII_PUNCT) + "])")
+    return re.compile("|".join(parts))
+
+
+def _trigger_re(punct: bool) -> "re.Pattern[str]":
+    # Any character a _scan_re() match can start with: a plain character-class
+    # search, far cheaper than the alternation on text that needs nothing.
+    chars = (_char_class(0xC2, 0xF4)[1:-1] + "_\\x0b\\r\\u2028\\u2029" + "".join(_INVISIBLE)
+             + ("".join(_ASCII_PUNCT) if punct else ""))
+    return re.compile("[" + chars + "]")
+
+
+_SCAN = {False: _scan_re(False), True: _scan_re(True)}
+_TRIGGER = {False: _trigger_re(False), True: _trigger_re(True)}
+_ASCII_ARTIFACT_RE = re.compile(r"_x000B_|[\x0b\r]")
+# validate_story: leftovers worth a warning (broken sequences that could not be repaired, too).
+# A lone "â" before a space is the leftover of a truncated "â€x" sequence.
+SUSPICIOUS_RE = re.compile(f"(?:{_char_class(0xC2, 0xF4)}{_CONT}+)|â(?=[ \u00a0])|_x000B_|\x0b|\ufffd")
+
+
+def _unmojibake(seq: str) -> Optional[str]:
+    try:
+        out = bytes(_BYTE_OF[c] for c in seq).decode("utf-8")
+    except (KeyError, UnicodeDecodeError):
+        return None
+    return out if _PLAUSIBLE_RE.fullmatch(out) else None
+
+
+def fix_text(text: str, multiline: bool = True, text_fix: str = DEFAULT_TEXT_FIX) -> Tuple[str, Tuple[str, ...]]:
+    """(fixed text, sorted fix kinds applied). Unchanged text comes back as the same object."""
+    if not text or text_fix == "off":
+        return text, ()
+    if text.isascii() and not _ASCII_ARTIFACT_RE.search(text):
+        return text, ()
+
+    kinds = set()
+    punct = text_fix == "ascii"
+    if not _TRIGGER[punct].search(text):
+        if unicodedata.is_normalized("NFC", text):
+            return text, ()
+        return unicodedata.normalize("NFC", text).strip(), ("nfc",)
+    brk = "\n" if multiline else " "
+    scan = _SCAN[punct]
+    repaired = [0]
+
+    def repl(m: "re.Match[str]") -> str:
+        g = m.lastgroup
+        s = m.group()
+        if g == "moj":
+            fixed = _unmojibake(s)
+            if fixed is None or (fixed == "â" and m.string[m.end():m.end() + 1] in ("", " ", "\u00a0")):
+                return s  # not valid, or a lone "â" nothing follows up on
+            repaired[0] += 1
+            return fixed
+        if g == "brk":
+            kinds.add("line_break")
+            return brk
+        if g == "inv":
+            kinds.add("invisible")
+            return _INVISIBLE[s]
+        kinds.add("punctuation")
+        return _ASCII_PUNCT[s]
+
+    out = text
+    for _ in range(MAX_PASSES):
+        n = repaired[0]
+        out = scan.sub(repl, out)
+        if repaired[0] == n:  # another pass only helps when this one re-decoded something
+            break
+    if repaired[0]:
+        kinds.add("mojibake")
+
+    if not out.isascii() and not unicodedata.is_normalized("NFC", out):
+        out = unicodedata.normalize("NFC", out)
+        kinds.add("nfc")
+    if not kinds:
+        return text, ()
+    return out.strip(), tuple(sorted(kinds))
+
+
+# (text, multiline, text_fix) -> expected fix_text() output.
+REGRESSION_CASES = (
+    ("Donâ€™t", True, "repair", "Don’t"),
+    ("Ã¢â‚¬Å“Startâ€\x9d", True, "repair", "“Start”"),
+    ("Â© 2025 â€“ Palco", True, "repair", "© 2025 – Palco"),
+    ("Step 1_x000B_Step 2", True, "repair", "Step 1\nStep 2"),
+    ("Step 1_x000B_Step 2", False, "repair", "Step 1 Step 2"),
+    ("“Quote” — done…", True, "ascii", '"Quote" - done...'),
+    # Valid text whose characters also form UTF-8 byte sequences: never touched.
+    ("“CAFÉ”", True, "repair", "“CAFÉ”"),
+    ("Size 2×½ in", True, "repair", "Size 2×½ in"),
+    ("NAÏVE™ café", True, "repair", "NAÏVE™ café"),
+    ("ÉCOLE•", True, "repair", "ÉCOLE•"),
+    # Truncated double encoding (LineEnt N2): the lone "Ã¢" stays, so validate_story still warns.
+    ("Ã¢â‚¬Å“Shopping ListÃ¢  Entry", True, "repair", "“Shopping ListÃ¢  Entry"),
+    ("gÃ¢teau", True, "repair", "gâteau"),
+)
+
+
+def self_check() -> List[str]:
+    """Failures of REGRESSION_CASES (empty when all pass)."""
+    bad = []
+    for text, multiline, mode, want in REGRESSION_CASES:
+        got = fix_text(text, multiline, mode)[0]
+        if got != want:
+            bad.append(f"{text!r} ({mode}): got {got!r}, want {want!r}")
+    return bad
+
+
+def suspicious(text: str) -> List[str]:
+    """Distinct mojibake-looking / PowerPoint-artifact sequences left in `text` (validate_story warnings)."""
+    if not text or (text.isascii() and "_x000B_" not in text and "\x0b" not in text):
+        return []
+    return list(dict.fromkeys(m.group() for m in SUSPICIOUS_RE.finditer(text)))
+
+
+class FixReport:
+    """What fix_text() changed, per frame code (or READY row Code) and field."""
+
+    def __init__(self):
+        self.frames: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+
+    def add(self, key: str, field: str, kinds: Tuple[str, ...]) -> None:
+        if kinds:
+            self.frames.setdefault(key, {})[field] = kinds
+
+    def counts(self) -> Counter:
+        c: Counter = Counter()
+        for fields in self.frames.values():
+            for kinds in fields.values():
+                c.update(kinds)
+        return c
+
+    def summary(self) -> str:
+        n_fields = sum(len(f) for f in self.frames.values())
+        if not n_fields:
+            return "none"
+        kinds = ", ".join(f"{k} {n}" for k, n in sorted(self.counts().items()))
+        return f"{n_fields} field(s) in {len(self.frames)} frame(s) ({kinds})"
+
+    def lines(self) -> List[str]:
+        return [f"{key}: " + ", ".join(f"{f} ({'+'.join(k)})" for f, k in fields.items())
+                for key, fields in self.frames.items()]
+
+
+def fix_fields(record: Dict[str, str], fields: Iterable[str], key: str, text_fix: str = DEFAULT_TEXT_FIX,
+               report: Optional[FixReport] = None) -> None:
+    """fix_text() the given fields of `record` in place (missing fields are skipped)."""
+    for field in fields:
+        v = record.get(field)
+        if not v:
+            continue
+        fixed, kinds = fix_text(v, field in MULTILINE_FIELDS, text_fix)
+        if kinds:
+            record[field] = fixed
+            if report is not None:
+                report.add(key, field, kinds)
+
+
+def fix_frame(frame: Dict[str, object], text_fix: str = DEFAULT_TEXT_FIX,
+              report: Optional[FixReport] = None) -> None:
+    """fix_text() a story frame's text fields and choice labels in place."""
+    key = str(frame.get("frame_code") or "")
+    fix_fields(frame, FRAME_TEXT_FIELDS, key, text_fix, report)  # type: ignore[arg-type]
+    for i, ch in enumerate(frame.get("choices") or []):  # type: ignore[union-attr]
+        label = ch.get("label")
+        if label:
+            fixed, kinds = fix_text(label, False, text_fix)
+            if kinds:
+                ch["label"] = fixed
+                if report is not None:
+                    report.add(key, f"choices[{i}].label", kinds)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Report (and optionally fix) mojibake / PowerPoint text artifacts in a CSV")
+    ap.add_argument("--csv", default=None, help="READY or ENH_UPD CSV")
+    ap.add_argument("--out", default=None, help="Write the fixed CSV here")
+    ap.add_argument("--text-fix", choices=("repair", "ascii"), default=DEFAULT_TEXT_FIX)
+    ap.add_argument("--self-check", action="store_true", help="Run REGRESSION_CASES and exit")
+    args = ap.parse_args()
+
+    if args.self_check:
+        bad = self_check()
+        for line in bad:
+            print(f"  FAIL {line}")
+        print(f"[{'FAIL' if bad else 'OK'}] {len(REGRESSION_CASES) - len(bad)}/{len(REGRESSION_CASES)} case(s)")
+        return 1 if bad else 0
+    if not args.csv:
+        ap.error("--csv is required (unless --self-check)")
+
+    t0 = time.perf_counter()
+    report = FixReport()
+    with open(args.csv, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        rows = [r for r in reader if r]
+    n_bytes = 0
+    code_i = header.index("Code") if "Code" in header else None
+    for n, r in enumerate(rows, start=2):
+        key = (r[code_i] if code_i is not None and code_i < len(r) and r[code_i] else f"line {n}")
+        for i, v in enumerate(r):
+            n_bytes += len(v)
+            field = header[i] if i < len(header) else f"col{i}"
+            fixed, kinds = fix_text(v, field in MULTILINE_FIELDS, args.text_fix)
+            if kinds:
+                r[i] = fixed
+                report.add(key, field, kinds)
+    dt = time.perf_counter() - t0
+
+    for line in report.lines():
+        print(f"  {line}")
+    print(f"[OK] {args.csv}: text fixes: {report.summary()}; {len(rows)} row(s), {n_bytes} chars in {dt:.3f}s")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
+        print(f"     wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,11 @@ import csv
 import os
 import sys
 
+import build_events
+import sop_profile
+from fs_index import FsIndex
+
+VERSION = "v1"
 
 # Columns we expect to exist in the mk_tw_in_READY CSV
 REQUIRED_HEADERS = [
@@ -51,7 +56,7 @@ def check_csv_headers(csv_path, required_headers):
     return missing, headers
 
 
-def list_missing_images(csv_path, base_dir):
+def list_missing_images(csv_path, base_dir, index=None):
     """
     Walk the CSV rows and verify that each Image_sub_url points
     to a real file.
@@ -62,8 +67,12 @@ def list_missing_images(csv_path, base_dir):
     - Otherwise, we assume it's just a filename (e.g. "D4.png") and we
       join it under base_dir from --images.
     - We report missing files with the CSV line number (2 = first data row).
+    - Existence is answered by an fs_index.FsIndex (pass a shared one in, or
+      base_dir is listed once here); paths outside it fall back to os.path.
     """
     missing = []
+    if index is None:
+        index = FsIndex([base_dir] if base_dir else [], recursive=False)
 
     with open(csv_path, newline='', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
@@ -86,7 +95,7 @@ def list_missing_images(csv_path, base_dir):
             # Normalize slashes for display and existence check
             fs_path_norm = os.path.normpath(fs_path)
 
-            if not os.path.exists(fs_path_norm):
+            if not index.exists(fs_path_norm):
                 # Keep what we *checked*, not the normalized one with backslashes,
                 # so output matches what user expects to see.
                 missing.append((i, fs_path))
@@ -126,12 +135,21 @@ def main():
         help="Optional path to write a validation log file.",
     )
 
+    sop_profile.add_arguments(parser)
     args = parser.parse_args()
 
+    with sop_profile.session("validate_env", VERSION, args, args.log), \
+            build_events.stage_event("validate_env", "validate_env", VERSION,
+                                     build_events.sop_from_filename(args.csv)):
+        _run(args)
+
+
+def _run(args):
     lines = []
 
     # 1. CSV header validation
-    missing_headers, headers = check_csv_headers(args.csv, REQUIRED_HEADERS)
+    with sop_profile.span("read"):
+        missing_headers, headers = check_csv_headers(args.csv, REQUIRED_HEADERS)
 
     lines.append(f"CSV: {args.csv}")
     lines.append(f"Headers: {headers}")
@@ -153,7 +171,9 @@ def main():
 
     # 2. Image existence validation (optional)
     if args.check_images:
-        bad = list_missing_images(args.csv, args.images)
+        with sop_profile.span("check_images"):
+            bad = list_missing_images(args.csv, args.images)
+        sop_profile.count(missing_images=len(bad))
 
         if bad:
             lines.append("Missing images:")
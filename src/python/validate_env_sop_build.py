@@ -17,6 +17,12 @@ Usage:
 import argparse
 import csv
 from pathlib import Path
+from typing import Optional
+
+import build_events
+from fs_index import FsIndex
+
+VERSION = "v1"
 
 
 def parse_args() -> argparse.Namespace:
@@ -27,12 +33,14 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
-    csv_path = Path(args.csv)
-    img_dir = Path(args.images)
-    log_path = Path(args.log)
+def validate(csv_path: Path, img_dir: Path, log_path: Path, index: Optional[FsIndex] = None) -> dict:
+    """
+    Check one READY CSV against its images directory and write the log.
 
+    Returns a summary dict (rows, unique_codes, missing_images, empty_images)
+    so callers running in-process can act on the result. Pass a shared
+    fs_index.FsIndex to reuse one directory walk across SOPs.
+    """
     if not csv_path.exists():
         raise SystemExit(f"CSV not found: {csv_path}")
     if not img_dir.exists():
@@ -50,7 +58,9 @@ def main() -> None:
     if "Image_sub_url" not in headers:
         raise SystemExit("CSV is missing required column: Image_sub_url")
 
-    existing_imgs = {p.name for p in img_dir.glob("*.png")}
+    if index is None:
+        index = FsIndex([img_dir], recursive=False)
+    existing_imgs = index.names(str(img_dir), ".png")
 
     missing_images = []
     empty_images = []
@@ -97,11 +107,31 @@ def main() -> None:
         else:
             lf.write("All Image_sub_url entries resolved to existing PNG files.\n")
 
+    return {
+        "rows": len(rows),
+        "unique_codes": len(seen_codes),
+        "missing_images": missing_images,
+        "empty_images": empty_images,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    csv_path = Path(args.csv)
+    img_dir = Path(args.images)
+    log_path = Path(args.log)
+
+    with build_events.stage_event("validate_env", "validate_env_sop_build", VERSION,
+                                  build_events.sop_from_filename(csv_path)) as ev:
+        result = validate(csv_path, img_dir, log_path)
+        ev.update(rows=result["rows"], out=log_path,
+                  detail=f"{len(result['missing_images'])} missing, {len(result['empty_images'])} empty")
+
     print(f"CSV : {csv_path}")
     print(f"Imgs: {img_dir}")
-    print(f"Rows: {len(rows)}")
+    print(f"Rows: {result['rows']}")
     print(f"Log : {log_path}")
-    if missing_images or empty_images:
+    if result["missing_images"] or result["empty_images"]:
         print("DONE with warnings. See log for details.")
     else:
         print("DONE: all images present and linked correctly.")
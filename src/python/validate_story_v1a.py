@@ -13,7 +13,22 @@ Checks:
 - all choices "to" targets exist
 - optional: referenced image files exist on disk
 - optional: FAQ/Quiz files exist on disk (if local paths)
-- warns on common mojibake sequences (â€œ â€ etc.)
+- optional: narr1_audio/narr3_audio files (synth_audio.py) exist on disk;
+  a missing clip is a warning, the player falls back to browser TTS
+- warns on mojibake and PowerPoint leftovers ("_x000B_", vertical tabs,
+  U+FFFD, any cp1252/latin-1 lead + continuation sequence): one compiled
+  scan per field (text_normalize.suspicious) instead of a fixed pattern
+  list. csv_to_story repairs these by default, so a warning means the story
+  was built with --text-fix off or the text is damaged beyond repair
+- optional (--graph): one O(V+E) pass over the choices graph:
+    frames unreachable from start_code, dead ends that are not terminal
+    (S998*/S999 by default), cycles with no way out, and click depth
+    from start to every frame / terminal (max + average)
+- interned stories (csv_to_story.py --intern) are expanded first
+  (story_format.expand_story), so every check sees the plain layout
+- file checks resolve against one fs_index.FsIndex (a single scandir walk of
+  the referenced folders, or the shared index passed in by sop_pipeline.py)
+  instead of one stat call per reference
 """
 
 import argparse
@@ -21,17 +36,27 @@ import json
 import os
 import re
 import sys
-from typing import Any, Dict, List, Tuple
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
 
+import build_events
+import sop_profile
+import story_format
+import text_normalize
+from fs_index import FsIndex
 
-MOJIBAKE_PATTERNS = [
-    "â€œ", "â€", "â€™", "â€“", "â€”", "â€¦", "Ã©", "_x000B_"
-]
+VERSION = "v1a"
+
+# Frames that may legitimately have no choices (end / restart slides).
+DEFAULT_TERMINAL_PATTERN = r"^S99[89]"
+
+AUDIO_FIELDS = ("narr1_audio", "narr3_audio")
 
 
 def load_json(path: str) -> Dict[str, Any]:
+    """story.json as the plain layout (interned stories are expanded)."""
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        return story_format.expand_story(json.load(f))
 
 
 def norm_repo_path(repo_root: str, p: str) -> str:
@@ -54,26 +79,241 @@ def norm_repo_path(repo_root: str, p: str) -> str:
     return os.path.normpath(os.path.join(repo_root, p2))
 
 
-def file_exists(repo_root: str, p: str) -> bool:
+def file_exists(repo_root: str, p: str, index: Optional[FsIndex] = None) -> bool:
     fs = norm_repo_path(repo_root, p)
     if not fs:
         return True  # treat URLs / empty as "ok"
+    if index is not None:
+        return index.is_file(fs)
     return os.path.isfile(fs)
 
 
+def _loc_href(loc: str, fname: str) -> str:
+    return loc.rstrip("/").lstrip("/") + "/" + fname.lstrip("/")
+
+
+def _index_for_frames(frames: List[Any], repo_root: str) -> FsIndex:
+    """Index every folder the frames point into (image, FAQ, quiz) in one walk."""
+    folders = set()
+    for fr in frames:
+        if not isinstance(fr, dict):
+            continue
+        refs = [(fr.get("image") or "").strip()]
+        refs += [(fr.get(k) or "").strip() for k in AUDIO_FIELDS]
+        for loc_key, file_key in (("FAQ_Loc", "FAQ_File"), ("Quiz_Loc", "Quiz_File")):
+            loc = (fr.get(loc_key) or "").strip()
+            fname = (fr.get(file_key) or "").strip()
+            if loc and fname:
+                refs.append("/" + _loc_href(loc, fname))
+        for ref in refs:
+            fs = norm_repo_path(repo_root, ref) if ref else ""
+            if fs:
+                folders.add(os.path.dirname(fs))
+    return FsIndex(folders, recursive=False)
+
+
 def warn_mojibake(text: str) -> List[str]:
-    hits = []
-    if not text:
-        return hits
-    for pat in MOJIBAKE_PATTERNS:
-        if pat in text:
-            hits.append(pat)
-    return hits
+    # Control characters (vertical tab, C1 bytes) are shown escaped.
+    return [h if h.isprintable() else ascii(h)[1:-1] for h in text_normalize.suspicious(text)]
 
 
-def validate_story(story: Dict[str, Any], repo_root: str, check_files: bool) -> Tuple[List[str], List[str]]:
+def _strongly_connected(adj: List[List[int]]) -> List[int]:
+    """
+    Iterative Tarjan SCC. Returns comp[v] = component id for every node.
+    No recursion, so deep chains in big decks cannot hit the recursion limit.
+    """
+    n = len(adj)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    comp = [-1] * n
+    stack: List[int] = []
+    counter = 0
+    n_comp = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            v, i = work[-1]
+            if i < len(adj[v]):
+                work[-1] = (v, i + 1)
+                w = adj[v][i]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, 0))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = n_comp
+                    if w == v:
+                        break
+                n_comp += 1
+    return comp
+
+
+def analyze_graph(story: Dict[str, Any], terminal_pattern: str = DEFAULT_TERMINAL_PATTERN) -> Dict[str, Any]:
+    """
+    Build the choices adjacency index once and run every check in O(V+E):
+      - BFS from start_code: click depth per frame, unreachable frames
+      - dead ends: no valid outgoing choice and not a terminal code
+      - trap cycles: strongly connected groups with no edge leaving them and
+        no terminal inside (the learner can only leave via Back/Restart)
+      - depth from start to each reachable terminal (max / average)
+    Returns {"frames": [per-frame dict], "unreachable", "dead_ends",
+             "traps", "terminal_depth_max", "terminal_depth_avg"}.
+    """
+    story = story_format.expand_story(story)
+    frames = [fr for fr in story.get("frames", []) if isinstance(fr, dict)]
+    codes: List[str] = []
+    idx: Dict[str, int] = {}
+    by_code: List[Dict[str, Any]] = []
+    for fr in frames:
+        code = (fr.get("frame_code") or "").strip()
+        if not code:
+            continue
+        if code in idx:
+            by_code[idx[code]] = fr  # duplicate: the player keeps the last one (validate_story flags it)
+        else:
+            idx[code] = len(codes)
+            codes.append(code)
+            by_code.append(fr)
+
+    n = len(codes)
+    adj: List[List[int]] = [[] for _ in range(n)]
+    for v, fr in enumerate(by_code):
+        seen_to = set()
+        for ch in fr.get("choices") or []:
+            w = idx.get((ch.get("to") or "").strip())
+            if w is not None and w not in seen_to:
+                seen_to.add(w)
+                adj[v].append(w)
+
+    is_terminal_re = re.compile(terminal_pattern)
+    terminal = [bool(is_terminal_re.search(c)) for c in codes]
+
+    indeg = [0] * n
+    for v in range(n):
+        for w in adj[v]:
+            indeg[w] += 1
+
+    depth: List[Optional[int]] = [None] * n
+    start = idx.get((story.get("start_code") or "").strip())
+    if start is not None:
+        depth[start] = 0
+        q = deque([start])
+        while q:
+            v = q.popleft()
+            for w in adj[v]:
+                if depth[w] is None:
+                    depth[w] = depth[v] + 1
+                    q.append(w)
+
+    comp = _strongly_connected(adj)
+    n_comp = max(comp) + 1 if n else 0
+    comp_size = [0] * n_comp
+    comp_exits = [False] * n_comp
+    comp_terminal = [False] * n_comp
+    comp_selfloop = [False] * n_comp
+    for v in range(n):
+        c = comp[v]
+        comp_size[c] += 1
+        if terminal[v]:
+            comp_terminal[c] = True
+        for w in adj[v]:
+            if comp[w] != c:
+                comp_exits[c] = True
+            elif w == v:
+                comp_selfloop[c] = True
+    trap_comp = [
+        (comp_size[c] > 1 or comp_selfloop[c]) and not comp_exits[c] and not comp_terminal[c]
+        for c in range(n_comp)
+    ]
+
+    report = []
+    for v, code in enumerate(codes):
+        report.append({
+            "frame_code": code,
+            "reachable": depth[v] is not None,
+            "depth": depth[v],
+            "out_degree": len(adj[v]),
+            "in_degree": indeg[v],
+            "terminal": terminal[v],
+            "dead_end": not adj[v] and not terminal[v],
+            "in_trap_cycle": trap_comp[comp[v]],
+        })
+
+    traps: Dict[int, List[str]] = {}
+    for v in range(n):
+        if trap_comp[comp[v]]:
+            traps.setdefault(comp[v], []).append(codes[v])
+
+    term_depths = [depth[v] for v in range(n) if terminal[v] and depth[v] is not None]
+    return {
+        "frames": report,
+        "unreachable": [r["frame_code"] for r in report if not r["reachable"]],
+        "dead_ends": [r["frame_code"] for r in report if r["dead_end"]],
+        "traps": list(traps.values()),
+        "terminal_depth_max": max(term_depths) if term_depths else None,
+        "terminal_depth_avg": (sum(term_depths) / len(term_depths)) if term_depths else None,
+    }
+
+
+def graph_warnings(g: Dict[str, Any]) -> List[str]:
+    warns = []
+    if g["unreachable"]:
+        warns.append(f"Graph: {len(g['unreachable'])} frame(s) unreachable from start: {', '.join(g['unreachable'])}")
+    for code in g["dead_ends"]:
+        warns.append(f"Frame {code}: dead end (no choices) and not a terminal frame")
+    for group in g["traps"]:
+        warns.append(f"Graph: cycle with no exit or terminal: {', '.join(group)}")
+    return warns
+
+
+def format_graph_report(g: Dict[str, Any]) -> List[str]:
+    lines = [f"{'Frame':<10} {'depth':>5} {'in':>3} {'out':>3}  flags"]
+    for r in g["frames"]:
+        flags = []
+        if not r["reachable"]:
+            flags.append("UNREACHABLE")
+        if r["terminal"]:
+            flags.append("terminal")
+        if r["dead_end"]:
+            flags.append("DEAD-END")
+        if r["in_trap_cycle"]:
+            flags.append("TRAP-CYCLE")
+        d = "-" if r["depth"] is None else str(r["depth"])
+        lines.append(f"{r['frame_code']:<10} {d:>5} {r['in_degree']:>3} {r['out_degree']:>3}  {' '.join(flags)}")
+    if g["terminal_depth_max"] is None:
+        lines.append("Click depth start->terminal: no terminal reachable")
+    else:
+        lines.append(
+            f"Click depth start->terminal: max {g['terminal_depth_max']}, avg {g['terminal_depth_avg']:.2f}"
+        )
+    return lines
+
+
+def validate_story(story: Dict[str, Any], repo_root: str, check_files: bool,
+                   index: Optional[FsIndex] = None) -> Tuple[List[str], List[str]]:
     errors: List[str] = []
     warns: List[str] = []
+    story = story_format.expand_story(story)
 
     # top-level keys
     for k in ["sop_id", "start_code", "frames"]:
@@ -88,6 +328,10 @@ def validate_story(story: Dict[str, Any], repo_root: str, check_files: bool) ->
         errors.append("frames must be a non-empty list")
         return errors, warns
 
+    if check_files and index is None:
+        with sop_profile.span("file_index"):
+            index = _index_for_frames(frames, repo_root)
+
     start_code = story.get("start_code")
     codes = []
     seen = set()
@@ -115,22 +359,27 @@ def validate_story(story: Dict[str, Any], repo_root: str, check_files: bool) ->
         # file checks
         if check_files:
             img = (fr.get("image") or "").strip()
-            if img and not file_exists(repo_root, img):
+            if img and not file_exists(repo_root, img, index):
                 errors.append(f"Frame {code}: image file not found on disk: {img}")
 
             faq_loc = (fr.get("FAQ_Loc") or "").strip()
             faq_file = (fr.get("FAQ_File") or "").strip()
             if faq_loc and faq_file:
-                faq_href = faq_loc.rstrip("/").lstrip("/") + "/" + faq_file.lstrip("/")
+                faq_href = _loc_href(faq_loc, faq_file)
                 # store as "/<path>" so norm_repo_path works
-                if not file_exists(repo_root, "/" + faq_href):
+                if not file_exists(repo_root, "/" + faq_href, index):
                     warns.append(f"Frame {code}: FAQ file not found on disk: {faq_href}")
 
+            for fld in AUDIO_FIELDS:
+                clip = (fr.get(fld) or "").strip()
+                if clip and not file_exists(repo_root, clip, index):
+                    warns.append(f"Frame {code}: {fld} file not found on disk: {clip}")
+
             quiz_loc = (fr.get("Quiz_Loc") or "").strip()
             quiz_file = (fr.get("Quiz_File") or "").strip()
             if quiz_loc and quiz_file:
-                quiz_href = quiz_loc.rstrip("/").lstrip("/") + "/" + quiz_file.lstrip("/")
-                if not file_exists(repo_root, "/" + quiz_href):
+                quiz_href = _loc_href(quiz_loc, quiz_file)
+                if not file_exists(repo_root, "/" + quiz_href, index):
                     warns.append(f"Frame {code}: Quiz file not found on disk: {quiz_href}")
 
     # start_code must exist
@@ -153,21 +402,46 @@ def main():
     ap.add_argument("--story", required=True, help="Path to story.json")
     ap.add_argument("--repo-root", default=".", help="Repo root (default: current dir)")
     ap.add_argument("--check-files", action="store_true", help="Verify images/faq/quiz exist on disk under repo-root")
+    ap.add_argument("--graph", action="store_true",
+                    help="Reachability / dead-end / cycle / click-depth analysis with a per-frame report")
+    ap.add_argument("--terminal-pattern", default=DEFAULT_TERMINAL_PATTERN,
+                    help=f"Regex for frame codes allowed to have no choices (default: {DEFAULT_TERMINAL_PATTERN})")
+    sop_profile.add_arguments(ap)
     args = ap.parse_args()
 
+    with sop_profile.session("validate_story", VERSION, args), \
+            build_events.stage_event("validate_story", "validate_story_v1a", VERSION) as ev:
+        _run(args, ev)
+
+
+def _run(args: argparse.Namespace, ev: Dict[str, Any]) -> None:
     story_path = args.story
     if not os.path.isfile(story_path):
         print(f"ERROR: story.json not found: {story_path}")
         sys.exit(2)
 
-    story = load_json(story_path)
-    errors, warns = validate_story(story, args.repo_root, args.check_files)
+    with sop_profile.span("read"):
+        story = load_json(story_path)
+    with sop_profile.span("validate"):
+        errors, warns = validate_story(story, args.repo_root, args.check_files)
+    sop_profile.count(frames=len(story.get("frames", [])), errors=len(errors), warnings=len(warns))
+    ev.update(sop_id=story.get("sop_id"), frames=len(story.get("frames", [])))
 
     print(f"SOP_ID: {story.get('sop_id')}")
     print(f"Start:  {story.get('start_code')}")
     print(f"Frames: {len(story.get('frames', []))}")
     print("")
 
+    if args.graph and not errors:
+        with sop_profile.span("graph"):
+            g = analyze_graph(story, args.terminal_pattern)
+        warns.extend(graph_warnings(g))
+        print("GRAPH:")
+        for line in format_graph_report(g):
+            print("  " + line)
+        print("")
+
+    ev["detail"] = f"{len(errors)} error(s), {len(warns)} warning(s)"
     if warns:
         print("WARNINGS:")
         for w in warns: